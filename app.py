@@ -1,22 +1,98 @@
+import atexit
 from flask import Flask
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import selected_env
-from src.routes.predict_routes import predict_bp
-from src.routes.auth_routes import auth
-from src.routes.dog_routes import dog_bp
-from src.routes.user_routes import profile_bp
-
-app = Flask(__name__)
-app.config.from_object(selected_env)
-FRONTEND_URL="FRONTEND_URL"
-CORS(app, resources={r"/*": {"origins": FRONTEND_URL}})
-jwt = JWTManager(app)
-
-app.register_blueprint(auth)  
-app.register_blueprint(predict_bp)  
-app.register_blueprint(dog_bp)     
-app.register_blueprint(profile_bp)  
+from src.utils.instrumentation import configure_logging, instrument_app
+from src.utils.startup import startup_timer
+from src.utils.upload_spool import SpoolingRequest
+
+PROCESS_ROLES = ('all', 'api', 'inference')
+
+
+def create_app(config_object=selected_env) -> Flask:
+    """
+    Creates the Flask app for the configured PROCESS_ROLE.
+
+    'api' serves authentication, dogs and profiles without importing the prediction stack,
+    'inference' serves only the prediction routes and 'all' serves everything. Blueprints are
+    imported here rather than at module level so each role only pays for what it serves, and
+    every import and initialization phase is timed in the startup report shown on /status.
+
+    Raises:
+        ValueError: If PROCESS_ROLE is not one of 'all', 'api' or 'inference'.
+    """
+    app = Flask(__name__)
+    app.request_class = SpoolingRequest
+    app.config.from_object(config_object)
+    role = app.config.get('PROCESS_ROLE', 'all')
+    if role not in PROCESS_ROLES:
+        raise ValueError(f"Unsupported PROCESS_ROLE: {role}")
+
+    configure_logging(app.config)
+
+    proxy_hops = app.config.get('PROXY_FIX_X_FOR', 0)
+    if proxy_hops > 0:
+        # Take the client address (which the per-IP login limits key on) from X-Forwarded-For,
+        # trusting only the values added by that many proxies in front of the app.
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+
+    FRONTEND_URL="FRONTEND_URL"
+    CORS(app, resources={r"/*": {"origins": FRONTEND_URL}})
+    jwt = JWTManager(app)
+    instrument_app(app, jwt)
+
+    if role in ('all', 'api'):
+        with startup_timer.phase('import:api_routes'):
+            from src.routes.auth_routes import auth
+            from src.routes.dog_routes import dog_bp
+            from src.routes.user_routes import profile_bp
+            from src.services.image_derivatives import shutdown_derivative_pipeline
+        app.register_blueprint(auth)
+        app.register_blueprint(dog_bp)
+        app.register_blueprint(profile_bp)
+        atexit.register(shutdown_derivative_pipeline)
+        if app.config.get('BLOB_STORAGE_BACKEND') == 'local':
+            from src.routes.local_blob_routes import local_blob_bp
+            app.register_blueprint(local_blob_bp)
+
+    if role in ('all', 'inference'):
+        with startup_timer.phase('import:predict_routes'):
+            from src.routes.predict_routes import predict_bp
+            from src.models.prediction_models import get_inference_pool, model_registry, shutdown_inference_pool
+            from src.services.upload_queue import shutdown_uploader
+        app.register_blueprint(predict_bp)
+        atexit.register(shutdown_uploader)
+
+        if app.config['DEBUG'] and app.config.get('INFERENCE_POOL_WORKERS', 0) > 0:
+            with startup_timer.phase('init:inference_pool'):
+                get_inference_pool(app.config)
+            atexit.register(shutdown_inference_pool)
+        elif app.config['DEBUG']:
+            model_registry.configure(app.config.get('INFERENCE_BACKEND', 'auto'), app.config.get('INFERENCE_NUM_THREADS') or None)
+            if app.config.get('MODEL_PRELOAD'):
+                with startup_timer.phase('init:model_load'):
+                    model_registry.load(app.config['MODEL_PATH'])
+
+    with startup_timer.phase('init:blob_storage'):
+        from src.services.blob_storage import get_blob_storage
+        get_blob_storage(app.config)
+
+    with startup_timer.phase('import:status_routes'):
+        from src.routes.status_routes import status_bp
+    app.register_blueprint(status_bp)
+
+    startup_timer.finish(role)
+    return app
+
+
+# Supported entry points: 'gunicorn app:app' (a single web worker when INFERENCE_POOL_WORKERS > 0)
+# and 'python app.py' for the development server. When run as a script, the spawned inference
+# workers import this module again as '__mp_main__'; they must not build an app and start a pool
+# of their own while they bootstrap.
+if __name__ != '__mp_main__':
+    app = create_app()
 
 if __name__ == '__main__':
     app.run()
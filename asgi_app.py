@@ -0,0 +1,59 @@
+import httpx
+from contextlib import asynccontextmanager
+from azure.storage.blob.aio import BlobServiceClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from config import selected_env
+from src.database.async_database import AsyncDatabase
+from src.models.prediction_models import get_inference_pool, model_registry, shutdown_inference_pool
+from src.routes.async_routes import routes
+
+FRONTEND_URL="FRONTEND_URL"
+
+
+def create_asgi_app(config_object=selected_env) -> Starlette:
+    """
+    Builds the asyncio serving mode of the API.
+
+    The Azure ML call goes through a pooled async HTTP client, blob uploads through the async
+    blob client and database reads through an async driver pool, all created once at startup,
+    so a single worker can keep many predictions in flight.
+
+    Run with: uvicorn asgi_app:app
+    """
+    config = {key: getattr(config_object, key) for key in dir(config_object) if key.isupper()}
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        app.state.config = config
+        if config['DEBUG']:
+            model_registry.configure(config.get('INFERENCE_BACKEND', 'auto'), config.get('INFERENCE_NUM_THREADS') or None)
+            get_inference_pool(config)
+        app.state.http = httpx.AsyncClient(
+            timeout=config.get('AZURE_ML_TIMEOUT', 30),
+            limits=httpx.Limits(
+                max_connections=config.get('ASYNC_HTTP_MAX_CONNECTIONS', 100),
+                max_keepalive_connections=config.get('ASYNC_HTTP_MAX_CONNECTIONS', 100)
+            )
+        )
+        app.state.blob_service_client = BlobServiceClient.from_connection_string(
+            config['AZURE_STORAGE_CONNECTION_STRING']
+        )
+        app.state.db = await AsyncDatabase.create(config)
+        try:
+            yield
+        finally:
+            await app.state.db.close()
+            await app.state.blob_service_client.close()
+            await app.state.http.aclose()
+            shutdown_inference_pool()
+
+    return Starlette(
+        routes=routes,
+        middleware=[Middleware(CORSMiddleware, allow_origins=[FRONTEND_URL])],
+        lifespan=lifespan
+    )
+
+
+app = create_asgi_app()
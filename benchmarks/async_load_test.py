@@ -0,0 +1,165 @@
+"""
+Load-test comparison of the synchronous Flask app and the asyncio (ASGI) app on /predict.
+
+Both apps run in production mode against the local stub Azure ML scorer, so every request
+spends most of its time waiting on the network, which is where the two serving modes differ.
+The stub answers with a confidence below 95, so no blob upload is attempted.
+
+    sync:  gunicorn -w 1 --threads <threads> app:app
+    async: uvicorn asgi_app:app (one worker)
+
+Usage:
+    python -m benchmarks.async_load_test [--requests 500] [--concurrency 100] [--latency-ms 100]
+"""
+import argparse
+import asyncio
+import io
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+import httpx
+import jwt
+import numpy as np
+from PIL import Image
+from typing import Dict, List
+from benchmarks.stub_scoring_server import start_stub_server
+
+JWT_SECRET_KEY = "load-test-secret"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_token() -> str:
+    now = int(time.time())
+    claims = {"sub": "load-test-user", "type": "access", "fresh": False, "jti": str(uuid.uuid4()),
+              "iat": now, "nbf": now, "exp": now + 3600}
+    return jwt.encode(claims, JWT_SECRET_KEY, algorithm="HS256")
+
+
+def make_image() -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(np.full((480, 640, 3), 127, dtype=np.uint8)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def server_env(scoring_url: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "FLASK_ENV": "production",
+        "SECRET_KEY": "load-test",
+        "JWT_SECRET_KEY": JWT_SECRET_KEY,
+        "CONTAINER_NAME": "images",
+        "AZURE_STORAGE_CONNECTION_STRING": (
+            "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+            "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+            "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+        ),
+        "DB_ENGINE": "postgresql",
+        "DB_HOST": "127.0.0.1",
+        "DB_NAME": "dogs",
+        "DB_USER": "dogs",
+        "DB_PASSWORD": "dogs",
+        "DB_POOL_MIN_SIZE": "0",
+        "AZURE_ML_URL": scoring_url,
+        "AZURE_ML_TOKEN": "stub",
+    })
+    return env
+
+
+def wait_for_port(port: int, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"Server did not start listening on port {port}")
+
+
+async def run_load(url: str, total: int, concurrency: int, token: str, image: bytes) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(timeout=120, limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def worker() -> None:
+            nonlocal errors
+            for _ in counter:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(
+                        url,
+                        headers={"Authorization": f"Bearer {token}"},
+                        files={"file": ("dog.jpg", image, "image/jpeg")}
+                    )
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {"throughput_rps": total / elapsed, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "errors": errors}
+
+
+def run_mode(name: str, command: List[str], port: int, env: Dict[str, str], args, token: str, image: bytes):
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        url = f"http://127.0.0.1:{port}/predict"
+        asyncio.run(run_load(url, min(args.concurrency, args.requests), args.concurrency, token, image))
+        result = asyncio.run(run_load(url, args.requests, args.concurrency, token, image))
+    finally:
+        process.terminate()
+        process.wait()
+
+    print(f"{name:<6} {result['throughput_rps']:8.1f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+          f"p95 {result['p95_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=100, help="Artificial latency of the stub scorer")
+    parser.add_argument('--threads', type=int, default=8, help="gunicorn threads for the sync app")
+    args = parser.parse_args()
+
+    stub, scoring_url = start_stub_server(latency_ms=args.latency_ms)
+    env = server_env(scoring_url)
+    token = make_token()
+    image = make_image()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, scorer latency {args.latency_ms} ms\n")
+    try:
+        sync_port, async_port = free_port(), free_port()
+        sync_result = run_mode(
+            "sync", [sys.executable, "-m", "gunicorn", "-w", "1", "--threads", str(args.threads),
+                     "-b", f"127.0.0.1:{sync_port}", "app:app"],
+            sync_port, env, args, token, image
+        )
+        async_result = run_mode(
+            "async", [sys.executable, "-m", "uvicorn", "asgi_app:app", "--port", str(async_port),
+                      "--no-access-log"],
+            async_port, env, args, token, image
+        )
+    finally:
+        stub.shutdown()
+
+    print(f"\nasync/sync throughput: {async_result['throughput_rps'] / sync_result['throughput_rps']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Throughput of the thumbnail rendering stage (decode, resize, WebP/JPEG encode) on 12MP
+phone-sized JPEGs, run on a thread pool versus a process pool of the same size.
+
+Pillow releases the GIL while decoding, resizing and encoding, so threads mostly scale;
+processes avoid the remaining contention but pay for pickling every photo and thumbnail.
+
+Usage:
+    python -m benchmarks.derivative_benchmark [--images 16] [--workers 1 2 4] [--sizes 128 512]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import List, Sequence
+from benchmarks.preprocess_benchmark import PHONE_PHOTO_SIZE, make_phone_photo
+from src.services.image_derivatives import render_derivatives
+
+
+def run(executor: Executor, photos: List[bytes], sizes: Sequence[int], formats: Sequence[str]) -> float:
+    render = partial(render_derivatives, sizes=sizes, formats=formats)
+    start = time.perf_counter()
+    results = list(executor.map(render, photos))
+    elapsed = time.perf_counter() - start
+    assert all(len(r) == len(sizes) * len(formats) for r in results)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=16, help="Number of 12MP photos rendered per run")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="Pool sizes to compare")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[128, 512], help="Thumbnail sizes")
+    parser.add_argument('--formats', nargs='+', default=['webp', 'jpeg'], help="Thumbnail formats")
+    args = parser.parse_args()
+
+    photos = [make_phone_photo(seed) for seed in range(args.images)]
+    original_bytes = sum(map(len, photos))
+    thumbnail_bytes = sum(len(encoded) for photo in photos[:2]
+                          for _, _, encoded in render_derivatives(photo, args.sizes, args.formats))
+    print(f"{os.cpu_count()} CPUs, {args.images} x {PHONE_PHOTO_SIZE[0]}x{PHONE_PHOTO_SIZE[1]} JPEG "
+          f"({original_bytes / len(photos) / 1e6:.1f} MB average), sizes {args.sizes}, formats {args.formats}")
+    print(f"thumbnails are {thumbnail_bytes / 2 / 1e3:.0f} KB per photo in total\n")
+
+    for workers in args.workers:
+        for label, pool in (("threads", ThreadPoolExecutor), ("processes", ProcessPoolExecutor)):
+            with pool(max_workers=workers) as executor:
+                # Warm up the workers (process start-up, imports) outside the timed run.
+                list(executor.map(partial(render_derivatives, sizes=args.sizes, formats=args.formats), photos[:workers]))
+                elapsed = run(executor, photos, args.sizes, args.formats)
+            print(f"workers={workers:<2} {label:<10} {args.images / elapsed:6.1f} images/s "
+                  f"({elapsed * 1000 / args.images:6.1f} ms/image)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,431 @@
+"""
+End-to-end load test of the Flask app under gunicorn, with a local stand-in for every
+external service, so the results can be compared from one commit to the next:
+
+- a tiny Keras model with seeded weights and its label mapping, served in development mode
+  (or, with --mode production, the stub Azure ML scorer from stub_scoring_server);
+- a SQLite database (DB_ENGINE=sqlite), created, migrated and seeded like scripts.seed_users;
+- the filesystem blob storage (BLOB_STORAGE_BACKEND=local) in place of Azure Blob Storage.
+
+Profiles:
+    burst_predict  every client POSTs a distinct photo to /predict, back to back
+    dog_crud       80% GET /get_dog, 10% PUT /edit_dog and 10% direct image uploads
+                   (upload URL, PUT to the local blob route, completion)
+    login_storm    POST /login for the seeded users, one in ten with a wrong password
+
+Each profile reports throughput, p50/p95/p99 latency, errors and the resident memory of the
+gunicorn master and workers (read from /proc, sampled during the run). Results are written as
+JSON together with the commit they were measured on; --compare prints the change against an
+earlier results file.
+
+Usage:
+    python -m benchmarks.load_suite [--profiles burst_predict dog_crud login_storm] [--requests 300]
+                                    [--concurrency 16] [--workers 2] [--threads 4] [--output load.json]
+    python -m benchmarks.load_suite --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import httpx
+import jwt
+import numpy as np
+from PIL import Image
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from benchmarks.async_load_test import free_port, wait_for_port
+from benchmarks.stub_scoring_server import start_stub_server
+from scripts.seed_users import CREATE_TABLES, EMAIL_FORMAT, SEED_PASSWORD, seed
+from src.database.database_connection import DatabaseConnection
+from src.database.schema import migrate
+
+JWT_SECRET_KEY = "load-suite-secret-not-for-production"
+PROFILES = ("burst_predict", "dog_crud", "login_storm")
+MODEL_INPUT = (224, 224, 3)
+NUM_CLASSES = 120
+
+# A profile operation sends one logical request (possibly several HTTP calls) and returns
+# the name it is reported under and whether it got the expected answer.
+Operation = Callable[[httpx.AsyncClient, int], Awaitable[Tuple[str, bool]]]
+
+
+def build_model(directory: str, seed_value: int = 0) -> Tuple[str, str]:
+    """
+    Saves a small convolutional classifier with seeded weights, and its label mapping.
+
+    It has the input and output shapes of the real model, so preprocessing, batching and
+    postprocessing do the same work, while inference itself stays cheap and repeatable.
+    """
+    import tensorflow as tf
+    tf.keras.utils.set_random_seed(seed_value)
+    model = tf.keras.Sequential([
+        tf.keras.Input(MODEL_INPUT),
+        tf.keras.layers.Conv2D(8, 3, strides=4, activation='relu'),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(NUM_CLASSES, activation='softmax'),
+    ])
+    model_path = os.path.join(directory, 'model.keras')
+    model.save(model_path)
+    labels_path = os.path.join(directory, 'labels.json')
+    with open(labels_path, 'w') as f:
+        json.dump({str(i): f"breed_{i}" for i in range(NUM_CLASSES)}, f)
+    return model_path, labels_path
+
+
+def build_database(path: str, users: int) -> None:
+    """
+    Creates the tables, applies the migrations and seeds one dog per user.
+    """
+    connection = DatabaseConnection("sqlite", "", "", "", path).connect()
+    try:
+        for statement in CREATE_TABLES["sqlite"]:
+            connection.execute(statement)
+        connection.commit()
+        migrate(connection, "sqlite")
+        seed(connection, "sqlite", users, users)
+    finally:
+        connection.close()
+
+
+def seeded_userid(i: int) -> str:
+    return str(uuid.UUID(int=i + 1))
+
+
+def seeded_dogid(i: int) -> str:
+    return str(uuid.UUID(int=(1 << 64) + i))
+
+
+def make_token(userid: str) -> str:
+    now = int(time.time())
+    claims = {"sub": userid, "type": "access", "fresh": False, "jti": str(uuid.uuid4()),
+              "iat": now, "nbf": now, "exp": now + 3600}
+    return jwt.encode(claims, JWT_SECRET_KEY, algorithm="HS256")
+
+
+def make_photo(seed_value: int, size: Tuple[int, int] = (640, 480)) -> bytes:
+    """
+    Returns a distinct, smooth JPEG per seed, so predictions are not served from the cache.
+    """
+    rng = np.random.default_rng(seed_value)
+    blocks = Image.fromarray(rng.integers(0, 256, (12, 16, 3), dtype=np.uint8))
+    buffer = io.BytesIO()
+    blocks.resize(size, Image.Resampling.BILINEAR).save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def server_env(args: argparse.Namespace, directory: str, port: int, model_path: str, labels_path: str,
+               scoring_url: Optional[str]) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "FLASK_ENV": args.mode,
+        "SECRET_KEY": "load-suite",
+        "JWT_SECRET_KEY": JWT_SECRET_KEY,
+        "CONTAINER_NAME": "images",
+        "AZURE_STORAGE_CONNECTION_STRING": "",
+        "BLOB_STORAGE_BACKEND": "local",
+        "LOCAL_BLOB_ROOT": os.path.join(directory, "blobs"),
+        "LOCAL_BLOB_BASE_URL": f"http://127.0.0.1:{port}",
+        "UPLOAD_SPILL_DIR": os.path.join(directory, "spill"),
+        "DB_ENGINE": "sqlite",
+        "DB_HOST": "",
+        "DB_NAME": os.path.join(directory, "dogs.db"),
+        "DB_USER": "",
+        "DB_PASSWORD": "",
+        "MODEL_PATH": model_path,
+        "LABEL_MAPPING_PATH": labels_path,
+        # Every client comes from 127.0.0.1; the storm measures hashing, not the limiter.
+        "LOGIN_RATE_LIMIT_IP": "0",
+        "LOGIN_RATE_LIMIT_EMAIL": "0",
+        "LOG_LEVEL": "WARNING",
+        # The production config is loaded in either mode; nothing listens here in development.
+        "AZURE_ML_URL": scoring_url or "http://127.0.0.1:9/score",
+        "AZURE_ML_TOKEN": "stub",
+    })
+    return env
+
+
+def process_tree_rss(pid: int) -> int:
+    """
+    Returns the resident memory of a process and all its descendants, in bytes.
+    """
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; the fields after it are fixed.
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class RssSampler:
+    """
+    Samples the server's resident memory in the background and keeps the peak.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.2) -> None:
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process_tree_rss(self.pid))
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+async def run_load(base_url: str, operation: Operation, total: int, concurrency: int) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = {}
+    errors = 0
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def worker() -> None:
+            nonlocal errors
+            for i in counter:
+                start = time.perf_counter()
+                try:
+                    name, ok = await operation(client, i)
+                except httpx.HTTPError:
+                    name, ok = "error", False
+                latencies.setdefault(name, []).append(time.perf_counter() - start)
+                errors += not ok
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    every = [latency for values in latencies.values() for latency in values]
+    result = {"requests": total, "errors": errors, "throughput_rps": total / elapsed, **percentiles(every)}
+    result["operations"] = {name: {"count": len(values), **percentiles(values)} for name, values in latencies.items()}
+    return result
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def burst_predict(args: argparse.Namespace) -> Operation:
+    photos = [make_photo(i) for i in range(args.requests + args.concurrency)]
+    tokens = [make_token(seeded_userid(i)) for i in range(args.users)]
+
+    async def operation(client: httpx.AsyncClient, i: int) -> Tuple[str, bool]:
+        response = await client.post("/predict", headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"},
+                                     files={"file": ("dog.jpg", photos[i % len(photos)], "image/jpeg")})
+        return "predict", response.status_code == 200
+
+    return operation
+
+
+def dog_crud(args: argparse.Namespace) -> Operation:
+    rng = random.Random(args.seed)
+    tokens = [make_token(seeded_userid(i)) for i in range(args.users)]
+    photos = [make_photo(10 ** 6 + i) for i in range(8)]
+
+    async def operation(client: httpx.AsyncClient, i: int) -> Tuple[str, bool]:
+        user = rng.randrange(args.users)
+        headers = {"Authorization": f"Bearer {tokens[user]}"}
+        dogid = seeded_dogid(user)
+        roll = rng.random()
+        if roll < 0.8:
+            response = await client.get("/get_dog", headers=headers)
+            return "get_dog", response.status_code == 200
+        if roll < 0.9:
+            response = await client.put(f"/edit_dog/{dogid}", headers=headers,
+                                        data={"name": f"Dog {i}", "breed": "beagle", "age": str(i % 15)})
+            return "edit_dog", response.status_code == 200
+
+        response = await client.post(f"/upload_dog_image_url/{dogid}", headers=headers,
+                                     data={"filename": "dog.jpg", "content_type": "image/jpeg"})
+        if response.status_code != 200:
+            return "image_upload", False
+        grant = response.json()["data"]
+        response = await client.request(grant["method"], grant["upload_url"], headers=grant["headers"],
+                                        content=photos[i % len(photos)])
+        if response.status_code not in (200, 201):
+            return "image_upload", False
+        response = await client.post(f"/complete_dog_image/{dogid}", headers=headers,
+                                     data={"upload_token": grant["upload_token"]})
+        return "image_upload", response.status_code == 200
+
+    return operation
+
+
+def login_storm(args: argparse.Namespace) -> Operation:
+    async def operation(client: httpx.AsyncClient, i: int) -> Tuple[str, bool]:
+        email = EMAIL_FORMAT.format(i % args.users)
+        if i % 10 == 9:
+            response = await client.post("/login", data={"email": email, "password": "wrong password"})
+            return "login_failed", response.status_code == 401
+        response = await client.post("/login", data={"email": email, "password": SEED_PASSWORD})
+        return "login", response.status_code == 200
+
+    return operation
+
+
+PROFILE_BUILDERS = {"burst_predict": burst_predict, "dog_crud": dog_crud, "login_storm": login_storm}
+
+
+def wait_until_ready(base_url: str, timeout: float = 120) -> None:
+    """
+    Waits for a worker to answer; gunicorn binds the port before the app is loaded.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            # /status needs a token; any answer from the app means a worker is up.
+            if httpx.get(f"{base_url}/status", timeout=5).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{base_url} did not become ready")
+
+
+def run_profile(name: str, args: argparse.Namespace, base_url: str, server_pid: int) -> Dict[str, Any]:
+    operation = PROFILE_BUILDERS[name](args)
+    # Warm up every worker (model, caches, pools) outside the measured run.
+    asyncio.run(run_load(base_url, operation, args.concurrency * 2, args.concurrency))
+    with RssSampler(server_pid) as sampler:
+        result = asyncio.run(run_load(base_url, operation, args.requests, args.concurrency))
+    result["rss_mb"] = process_tree_rss(server_pid) / 2 ** 20
+    result["peak_rss_mb"] = sampler.peak / 2 ** 20
+    print(f"{name:<14} {result['throughput_rps']:8.1f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+          f"p95 {result['p95_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms  errors {result['errors']:<4} "
+          f"RSS {result['rss_mb']:6.1f} MB (peak {result['peak_rss_mb']:.1f})")
+    for operation_name, stats in sorted(result["operations"].items()):
+        print(f"  {operation_name:<12} {stats['count']:6d}  p50 {stats['p50_ms']:7.1f} ms  "
+              f"p95 {stats['p95_ms']:7.1f} ms  p99 {stats['p99_ms']:7.1f} ms")
+    return result
+
+
+def git_commit() -> Dict[str, Any]:
+    def git(*command: str) -> str:
+        return subprocess.run(["git", *command], capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD"), "subject": git("log", "-1", "--format=%s"),
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print(f"\nChange against {baseline['git']['commit'][:10]} ({baseline['git']['subject']}):")
+    differing = {key: (baseline["config"].get(key), value) for key, value in results["config"].items()
+                 if baseline["config"].get(key) != value}
+    if differing or baseline["host"]["cpus"] != results["host"]["cpus"]:
+        print(f"  (not like for like: config {differing}, CPUs {baseline['host']['cpus']} -> {results['host']['cpus']})")
+    for name, result in results["profiles"].items():
+        before = baseline["profiles"].get(name)
+        if before is None:
+            continue
+        changes = []
+        for key, label in (("throughput_rps", "throughput"), ("p50_ms", "p50"), ("p95_ms", "p95"),
+                           ("p99_ms", "p99"), ("peak_rss_mb", "peak RSS")):
+            if before.get(key):
+                changes.append(f"{label} {100.0 * (result[key] - before[key]) / before[key]:+6.1f}%")
+        print(f"{name:<14} " + "  ".join(changes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+    parser.add_argument('--requests', type=int, default=300, help="Measured requests per profile")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent clients")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument('--threads', type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument('--users', type=int, default=200, help="Seeded users, each with one dog")
+    parser.add_argument('--mode', choices=('development', 'production'), default='development',
+                        help="development serves the local Keras model, production the stub Azure ML scorer")
+    parser.add_argument('--scorer-latency-ms', type=float, default=50, help="Latency of the stub scorer")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="load-suite-") as directory:
+        print(f"Seeding {args.users} users and dogs in SQLite")
+        build_database(os.path.join(directory, "dogs.db"), args.users)
+        model_path, labels_path = build_model(directory, args.seed)
+
+        stub, scoring_url = (start_stub_server(latency_ms=args.scorer_latency_ms) if args.mode == 'production'
+                             else (None, None))
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        env = server_env(args, directory, port, model_path, labels_path, scoring_url)
+        log_path = os.path.join(directory, "server.log")
+        command = [sys.executable, "-m", "gunicorn", "-w", str(args.workers), "--threads", str(args.threads),
+                   "-b", f"127.0.0.1:{port}", "app:app"]
+        with open(log_path, "wb") as log:
+            server = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+        profiles: Dict[str, Any] = {}
+        try:
+            wait_for_port(port)
+            wait_until_ready(base_url)
+            print(f"{os.cpu_count()} CPUs, {args.workers} workers x {args.threads} threads, mode {args.mode}, "
+                  f"{args.requests} requests per profile, concurrency {args.concurrency}\n")
+            for name in args.profiles:
+                profiles[name] = run_profile(name, args, base_url, server.pid)
+        except Exception:
+            with open(log_path, errors="replace") as log:
+                print(log.read()[-4000:], file=sys.stderr)
+            raise
+        finally:
+            server.terminate()
+            server.wait()
+            if stub is not None:
+                stub.shutdown()
+
+    results = {
+        "git": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "host": {"cpus": os.cpu_count(), "python": platform.python_version(), "platform": platform.platform()},
+        "config": {key: getattr(args, key) for key in ("mode", "requests", "concurrency", "workers", "threads",
+                                                        "users", "scorer_latency_ms", "seed")},
+        "profiles": profiles,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
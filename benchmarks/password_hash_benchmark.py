@@ -0,0 +1,112 @@
+"""
+Login throughput and latency of password verification across hash costs and executor sizes.
+
+A storm of concurrent logins (one thread per client, as in a threaded WSGI server) verifies
+passwords either inline, the way UserModel.login used to, or through the bounded
+PasswordHasher. Alongside the storm a probe thread does a short piece of CPU work every
+10 ms, standing in for a /predict request, and its latency shows how much the hashes
+starve the rest of the process.
+
+Usage:
+    python -m benchmarks.password_hash_benchmark [--clients 32] [--logins 64] [--workers 1 2 4]
+"""
+import argparse
+import os
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from werkzeug.security import check_password_hash, generate_password_hash
+from src.services.password_hasher import HasherBusy, PasswordHasher
+
+PASSWORD = "correct horse battery staple"
+COSTS: List[Tuple[str, Dict[str, int]]] = [
+    ("scrypt N=2^14", {"method": "scrypt", "scrypt_n": 2 ** 14}),
+    ("scrypt N=2^15", {"method": "scrypt", "scrypt_n": 2 ** 15}),
+    ("pbkdf2 300k", {"method": "pbkdf2", "pbkdf2_iterations": 300000}),
+    ("pbkdf2 600k", {"method": "pbkdf2", "pbkdf2_iterations": 600000}),
+]
+
+
+def probe(stop: threading.Event, latencies: List[float]) -> None:
+    """
+    Times a small matrix product every 10 ms until stopped.
+    """
+    matrix = np.random.default_rng(0).random((96, 96))
+    while not stop.is_set():
+        start = time.perf_counter()
+        for _ in range(20):
+            matrix @ matrix
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.01)
+
+
+def storm(verify: Callable[[], bool], clients: int, logins: int) -> Dict[str, float]:
+    """
+    Runs `logins` verifications from `clients` concurrent threads.
+    """
+    def login() -> Optional[float]:
+        start = time.perf_counter()
+        try:
+            verify()
+        except HasherBusy:
+            return None
+        return time.perf_counter() - start
+
+    stop, probe_latencies = threading.Event(), []
+    prober = threading.Thread(target=probe, args=(stop, probe_latencies))
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(lambda _: login(), range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+
+    latencies = np.array([r for r in results if r is not None]) * 1000
+    probes = np.array(probe_latencies) * 1000
+    return {
+        "logins_per_s": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+        "rejected": sum(r is None for r in results),
+        "probe_p99_ms": float(np.percentile(probes, 99)) if len(probes) else 0.0,
+    }
+
+
+def report(label: str, result: Dict[str, float]) -> None:
+    print(f"  {label:<12} {result['logins_per_s']:8.1f} logins/s  p50 {result['p50_ms']:7.1f} ms  "
+          f"p99 {result['p99_ms']:7.1f} ms  rejected {result['rejected']:4d}  "
+          f"probe p99 {result['probe_p99_ms']:6.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=32, help="Number of concurrent login clients")
+    parser.add_argument('--logins', type=int, default=64, help="Number of logins per run")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="Hasher worker counts to compare")
+    parser.add_argument('--queue-size', type=int, default=1024, help="Hasher queue size (lower it to see rejections)")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} clients, {args.logins} logins per run\n")
+    for label, cost in COSTS:
+        hasher = PasswordHasher(**cost, workers=1)
+        stored = hasher.hash(PASSWORD)
+        start = time.perf_counter()
+        check_password_hash(stored, PASSWORD)
+        print(f"{label} ({hasher.method}, {(time.perf_counter() - start) * 1000:.1f} ms per hash)")
+
+        report("inline", storm(lambda: check_password_hash(stored, PASSWORD), args.clients, args.logins))
+        for workers in args.workers:
+            pooled = PasswordHasher(**cost, workers=workers, queue_size=args.queue_size)
+            report(f"workers={workers}", storm(lambda: pooled.verify(stored, PASSWORD), args.clients, args.logins))
+        print()
+
+    legacy = generate_password_hash(PASSWORD)
+    print(f"rehash-on-login: a '{legacy.split('$', 1)[0]}' hash needs rehash under the default settings: "
+          f"{PasswordHasher().needs_rehash(legacy)}")
+
+
+if __name__ == '__main__':
+    main()
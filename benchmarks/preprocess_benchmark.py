@@ -0,0 +1,92 @@
+"""
+Microbenchmark comparing the original preprocess_image implementation with the
+draft-decode / float32 batch buffer pipeline on 12MP phone-sized JPEGs.
+
+Usage:
+    python -m benchmarks.preprocess_benchmark [--images 8] [--repeat 5]
+"""
+import argparse
+import io
+import time
+import numpy as np
+from PIL import Image
+from src.services.preprocess_model import get_batch_buffer, preprocess_batch
+
+PHONE_PHOTO_SIZE = (4032, 3024)
+
+
+def legacy_preprocess_image(image: Image.Image) -> np.ndarray:
+    """
+    The preprocessing used before the batched pipeline: full decode, float64 normalization.
+    """
+    img = image.resize((224, 224))
+    img_array = np.array(img)
+    img_array = np.expand_dims(img_array, axis=0)
+    img_array = img_array / 255.0
+    return img_array
+
+
+def make_phone_photo(seed: int) -> bytes:
+    """
+    Builds a 12MP JPEG with smooth gradients and noise, so it compresses like a real photo.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = PHONE_PHOTO_SIZE
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[..., 0] = (x + y) / 2
+    pixels[..., 1] = np.abs(x - y)
+    pixels[..., 2] = np.clip(rng.normal(128, 40, (height, width)), 0, 255)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def bench(label: str, fn, photos, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(photos)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{label:<28} best {best * 1000:8.1f} ms  ({best * 1000 / len(photos):6.1f} ms/image)")
+    return best
+
+
+def run_legacy(photos):
+    return np.concatenate([legacy_preprocess_image(Image.open(io.BytesIO(p))) for p in photos])
+
+
+def run_batched(photos):
+    return preprocess_batch([Image.open(io.BytesIO(p)) for p in photos])
+
+
+def run_batched_reused_buffer(photos):
+    return preprocess_batch([Image.open(io.BytesIO(p)) for p in photos], get_batch_buffer(len(photos)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=8, help="Number of 12MP photos per batch")
+    parser.add_argument('--repeat', type=int, default=5, help="Number of timed runs (best is reported)")
+    args = parser.parse_args()
+
+    photos = [make_phone_photo(seed) for seed in range(args.images)]
+    print(f"{args.images} x {PHONE_PHOTO_SIZE[0]}x{PHONE_PHOTO_SIZE[1]} JPEG, "
+          f"{sum(map(len, photos)) / len(photos) / 1e6:.1f} MB average\n")
+
+    legacy = bench("legacy preprocess_image", run_legacy, photos, args.repeat)
+    batched = bench("preprocess_batch", run_batched, photos, args.repeat)
+    reused = bench("preprocess_batch (reused)", run_batched_reused_buffer, photos, args.repeat)
+
+    legacy_out = run_legacy(photos)
+    batched_out = run_batched(photos)
+    print(f"\nspeedup: {legacy / batched:.1f}x (new buffer), {legacy / reused:.1f}x (reused buffer)")
+    print(f"output bytes: legacy {legacy_out.nbytes:,} ({legacy_out.dtype}), "
+          f"batched {batched_out.nbytes:,} ({batched_out.dtype})")
+    print(f"max abs difference vs legacy: {np.abs(legacy_out - batched_out).max():.4f}")
+
+
+if __name__ == '__main__':
+    main()
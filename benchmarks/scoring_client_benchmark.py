@@ -0,0 +1,70 @@
+"""
+Benchmark of the Azure ML scoring client against the local stub scoring server.
+
+Compares the previous per-request requests.post call with the pooled keep-alive client,
+single-image calls with one batched call, and payload sizes with and without client-side
+resizing of a 12MP photo. The stub speaks plain HTTP, so the TLS handshakes saved by
+connection reuse in production are not part of these numbers.
+
+Usage:
+    python -m benchmarks.scoring_client_benchmark [--requests 200] [--latency-ms 5]
+"""
+import argparse
+import base64
+import json
+import time
+import requests
+from benchmarks.preprocess_benchmark import make_phone_photo
+from benchmarks.stub_scoring_server import start_stub_server
+from src.services.scoring_client import AzureMLScoringClient
+
+
+def legacy_score(url: str, data: bytes):
+    headers = {"Content-Type": "application/json", "Authorization": "Bearer stub"}
+    response = requests.post(url, json={"data": base64.b64encode(data).decode('utf-8')}, headers=headers)
+    prediction = json.loads(response.json())
+    return prediction.get('breed'), prediction.get('confidence')
+
+
+def timed(label: str, fn, count: int) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed * 1000:8.1f} ms total  {elapsed * 1000 / count:6.2f} ms/image")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=5, help="Artificial latency of the stub scorer")
+    parser.add_argument('--batch-size', type=int, default=16)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(latency_ms=args.latency_ms)
+    small_image = make_phone_photo(0)[:50_000]
+    photo = make_phone_photo(1)
+    try:
+        client = AzureMLScoringClient(url, "stub")
+        resizing_client = AzureMLScoringClient(url, "stub", resize=True)
+
+        print(f"{args.requests} images, stub latency {args.latency_ms} ms\n")
+        timed("requests.post per image", lambda: [legacy_score(url, small_image) for _ in range(args.requests)],
+              args.requests)
+        timed("pooled session per image", lambda: [client.score(small_image) for _ in range(args.requests)],
+              args.requests)
+        batches = range(0, args.requests, args.batch_size)
+        timed(f"pooled session, batches of {args.batch_size}",
+              lambda: [client.score_batch([small_image] * len(range(i, min(i + args.batch_size, args.requests))))
+                       for i in batches],
+              args.requests)
+
+        print(f"\n12MP photo payload: {len(client.encode_image(photo)):,} bytes as-is, "
+              f"{len(resizing_client.encode_image(photo)):,} bytes resized to 224x224")
+        print(f"client stats: {client.stats()}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Local stand-in for the Azure ML scoring endpoint used by predict_azure.
+
+It answers every POST with a fixed breed after an artificial delay, using the same
+double-encoded JSON body as the real endpoint, so the production prediction path can be
+load-tested without network access or billing. A payload whose "data" is a list is
+answered with one prediction per image, like a batched scoring call.
+
+Usage:
+    python -m benchmarks.stub_scoring_server [--port 8500] [--latency-ms 50] [--confidence 90]
+"""
+import argparse
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+
+def make_handler(latency_ms: float, breed: str, confidence: float):
+    prediction = {"breed": breed, "confidence": confidence}
+
+    class StubScoringHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self) -> None:
+            super().setup()
+            # Headers and body are written separately; without this, Nagle's algorithm and
+            # delayed ACKs add ~40 ms to every response on a kept-alive connection.
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def do_POST(self) -> None:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            data = payload.get("data")
+            # A list of images is scored as a batch and answered with a list of predictions.
+            result = [prediction] * len(data) if isinstance(data, list) else prediction
+            body = json.dumps(json.dumps(result)).encode('utf-8')
+            time.sleep(latency_ms / 1000.0)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return StubScoringHandler
+
+
+def start_stub_server(port: int = 0, latency_ms: float = 50, breed: str = "stub_breed",
+                      confidence: float = 90.0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Starts the stub scorer on a background thread.
+
+    Returns:
+        tuple: The server (call shutdown() to stop it) and its scoring URL.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency_ms, breed, confidence))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/score"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8500)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--breed', default="stub_breed")
+    parser.add_argument('--confidence', type=float, default=90.0)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.port, args.latency_ms, args.breed, args.confidence)
+    print(f"Stub scoring server listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
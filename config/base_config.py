@@ -1,4 +1,6 @@
-from decouple import config
+import os
+import tempfile
+from decouple import Csv, config
 
 class Config:
     SECRET_KEY = config('SECRET_KEY')
@@ -9,4 +11,74 @@ class Config:
     DB_NAME = config('DB_NAME')
     DB_USER = config('DB_USER')
     DB_PASSWORD = config('DB_PASSWORD')
-    DB_ENGINE = config('DB_ENGINE')
\ No newline at end of file
+    DB_ENGINE = config('DB_ENGINE')
+    DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=1, cast=int)
+    DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+    DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=float)
+    DB_POOL_MAX_LIFETIME = config('DB_POOL_MAX_LIFETIME', default=1800, cast=float)
+    DB_POOL_MAX_IDLE = config('DB_POOL_MAX_IDLE', default=300, cast=float)
+    DB_POOL_HEALTH_CHECK_INTERVAL = config('DB_POOL_HEALTH_CHECK_INTERVAL', default=5, cast=float)
+    UPLOAD_WORKERS = config('UPLOAD_WORKERS', default=2, cast=int)
+    UPLOAD_QUEUE_SIZE = config('UPLOAD_QUEUE_SIZE', default=100, cast=int)
+    UPLOAD_MAX_RETRIES = config('UPLOAD_MAX_RETRIES', default=3, cast=int)
+    UPLOAD_SPILL_DIR = config('UPLOAD_SPILL_DIR', default=os.path.join(tempfile.gettempdir(), 'dog-breed-uploads'))
+    PREDICTION_CACHE = config('PREDICTION_CACHE', default=True, cast=bool)
+    PREDICTION_CACHE_MAX_ENTRIES = config('PREDICTION_CACHE_MAX_ENTRIES', default=10000, cast=int)
+    PREDICTION_CACHE_TTL = config('PREDICTION_CACHE_TTL', default=3600, cast=float)
+    PREDICTION_CACHE_SHARED_URL = config('PREDICTION_CACHE_SHARED_URL', default='')
+    ENTITY_CACHE = config('ENTITY_CACHE', default=True, cast=bool)
+    ENTITY_CACHE_MAX_ENTRIES = config('ENTITY_CACHE_MAX_ENTRIES', default=10000, cast=int)
+    # A write only invalidates the cache of the worker that made it, so by default the records are
+    # kept in ENTITY_CACHE_SQLITE_PATH, shared by every worker of this host however they were started
+    # (gunicorn -w, uvicorn --workers). Use a redis:// URL when running on several hosts, otherwise
+    # other hosts serve a record for up to its TTL after it changes. 'memory://' keeps them in an
+    # in-process LRU, which is only safe with a single web worker.
+    ENTITY_CACHE_SHARED_URL = config('ENTITY_CACHE_SHARED_URL', default='')
+    ENTITY_CACHE_SQLITE_PATH = config('ENTITY_CACHE_SQLITE_PATH', default=os.path.join(tempfile.gettempdir(), 'dog-breed-entity-cache.db'))
+    DOGS_CACHE_TTL = config('DOGS_CACHE_TTL', default=60, cast=float)
+    # Without a cache tier reaching every worker (see ENTITY_CACHE_SHARED_URL), an updated profile
+    # (and the 304s for it) can be served stale by the other workers for up to this long.
+    PROFILES_CACHE_TTL = config('PROFILES_CACHE_TTL', default=300, cast=float)
+    PREDICT_TOP_K = config('PREDICT_TOP_K', default=3, cast=int)
+    UPLOAD_CONFIDENCE_THRESHOLD = config('UPLOAD_CONFIDENCE_THRESHOLD', default=95, cast=float)
+    PREDICT_BATCH_MAX_IMAGES = config('PREDICT_BATCH_MAX_IMAGES', default=64, cast=int)
+    PREDICT_BATCH_WORKERS = config('PREDICT_BATCH_WORKERS', default=4, cast=int)
+    MAX_CONTENT_LENGTH = config('MAX_CONTENT_LENGTH', default=32 * 1024 * 1024, cast=int)
+    UPLOAD_MAX_BYTES = config('UPLOAD_MAX_BYTES', default=20 * 1024 * 1024, cast=int)
+    UPLOAD_SPOOL_MEMORY_LIMIT = config('UPLOAD_SPOOL_MEMORY_LIMIT', default=1024 * 1024, cast=int)
+    PREDICT_BATCH_MAX_BYTES = config('PREDICT_BATCH_MAX_BYTES', default=256 * 1024 * 1024, cast=int)
+    ASYNC_HTTP_MAX_CONNECTIONS = config('ASYNC_HTTP_MAX_CONNECTIONS', default=100, cast=int)
+    PROCESS_ROLE = config('PROCESS_ROLE', default='all')
+    # Number of web worker processes; gunicorn and uvicorn read it as their default worker count.
+    WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+    PASSWORD_HASH_METHOD = config('PASSWORD_HASH_METHOD', default='scrypt')
+    PASSWORD_SCRYPT_N = config('PASSWORD_SCRYPT_N', default=32768, cast=int)
+    PASSWORD_SCRYPT_R = config('PASSWORD_SCRYPT_R', default=8, cast=int)
+    PASSWORD_SCRYPT_P = config('PASSWORD_SCRYPT_P', default=1, cast=int)
+    PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=600000, cast=int)
+    PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=2, cast=int)
+    PASSWORD_HASH_QUEUE_SIZE = config('PASSWORD_HASH_QUEUE_SIZE', default=32, cast=int)
+    LOGIN_RATE_LIMIT_IP = config('LOGIN_RATE_LIMIT_IP', default=20, cast=int)
+    LOGIN_RATE_LIMIT_EMAIL = config('LOGIN_RATE_LIMIT_EMAIL', default=5, cast=int)
+    LOGIN_RATE_LIMIT_WINDOW = config('LOGIN_RATE_LIMIT_WINDOW', default=60, cast=float)
+    # Number of reverse proxies in front of the app. Without it, every client behind a proxy
+    # shares the proxy's address and LOGIN_RATE_LIMIT_IP becomes a global limit.
+    PROXY_FIX_X_FOR = config('PROXY_FIX_X_FOR', default=0, cast=int)
+    BLOB_STORAGE_BACKEND = config('BLOB_STORAGE_BACKEND', default='azure')
+    LOCAL_BLOB_ROOT = config('LOCAL_BLOB_ROOT', default=os.path.join(tempfile.gettempdir(), 'dog-breed-blobs'))
+    LOCAL_BLOB_BASE_URL = config('LOCAL_BLOB_BASE_URL', default='http://localhost:5000')
+    UPLOAD_URL_TTL = config('UPLOAD_URL_TTL', default=600, cast=float)
+    BLOB_MAX_BLOCK_SIZE = config('BLOB_MAX_BLOCK_SIZE', default=4 * 1024 * 1024, cast=int)
+    BLOB_MAX_SINGLE_PUT_SIZE = config('BLOB_MAX_SINGLE_PUT_SIZE', default=8 * 1024 * 1024, cast=int)
+    BLOB_MAX_CONCURRENCY = config('BLOB_MAX_CONCURRENCY', default=4, cast=int)
+    BLOB_POOL_CONNECTIONS = config('BLOB_POOL_CONNECTIONS', default=20, cast=int)
+    IMAGE_DERIVATIVE_SIZES = config('IMAGE_DERIVATIVE_SIZES', default='128,512', cast=Csv(int))
+    IMAGE_DERIVATIVE_FORMATS = config('IMAGE_DERIVATIVE_FORMATS', default='webp,jpeg', cast=Csv())
+    IMAGE_DERIVATIVE_QUALITY = config('IMAGE_DERIVATIVE_QUALITY', default=80, cast=int)
+    IMAGE_DERIVATIVE_WORKERS = config('IMAGE_DERIVATIVE_WORKERS', default=2, cast=int)
+    IMAGE_DERIVATIVE_QUEUE_SIZE = config('IMAGE_DERIVATIVE_QUEUE_SIZE', default=100, cast=int)
+    LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+    LOG_SAMPLE_RATE = config('LOG_SAMPLE_RATE', default=0.01, cast=float)
+    LOG_SLOW_REQUEST_MS = config('LOG_SLOW_REQUEST_MS', default=1000, cast=float)
+    # Bearer token /metrics requires; without one it is only served in DEBUG.
+    METRICS_TOKEN = config('METRICS_TOKEN', default='')
@@ -4,4 +4,23 @@ from decouple import config
 class DevelopmentConfig(Config):
     DEBUG = True
     MODEL_PATH = config('MODEL_PATH')
+    # 'keras', 'tflite', 'onnx' (served with onnxruntime), or 'auto' to pick one from MODEL_PATH's extension.
+    INFERENCE_BACKEND = config('INFERENCE_BACKEND', default='auto')
+    INFERENCE_NUM_THREADS = config('INFERENCE_NUM_THREADS', default=0, cast=int)
+    MODEL_PRELOAD = config('MODEL_PRELOAD', default=True, cast=bool)
+    MODEL_RELOAD_INTERVAL = config('MODEL_RELOAD_INTERVAL', default=30, cast=float)
+    INFERENCE_BATCHING = config('INFERENCE_BATCHING', default=True, cast=bool)
+    INFERENCE_MAX_BATCH_SIZE = config('INFERENCE_MAX_BATCH_SIZE', default=16, cast=int)
+    INFERENCE_MAX_WAIT_MS = config('INFERENCE_MAX_WAIT_MS', default=5, cast=float)
+    INFERENCE_POOL_WORKERS = config('INFERENCE_POOL_WORKERS', default=0, cast=int)
+    INFERENCE_POOL_INTRA_OP_THREADS = config('INFERENCE_POOL_INTRA_OP_THREADS', default=1, cast=int)
+    INFERENCE_POOL_INTER_OP_THREADS = config('INFERENCE_POOL_INTER_OP_THREADS', default=1, cast=int)
+    INFERENCE_POOL_PIN_CPUS = config('INFERENCE_POOL_PIN_CPUS', default=False, cast=bool)
+    INFERENCE_POOL_SLOTS = config('INFERENCE_POOL_SLOTS', default=0, cast=int)
+    INFERENCE_POOL_START_TIMEOUT = config('INFERENCE_POOL_START_TIMEOUT', default=120, cast=float)
+    # Seconds a request waits for a free slot and for its predictions before answering 503.
+    INFERENCE_TIMEOUT = config('INFERENCE_TIMEOUT', default=30, cast=float)
     LABEL_MAPPING_PATH = config('LABEL_MAPPING_PATH')
+    LABEL_MAPPING_TTL = config('LABEL_MAPPING_TTL', default=300, cast=float)
+    CALIBRATION_PATH = config('CALIBRATION_PATH', default='')
+    SERVER_TIMING = config('SERVER_TIMING', default=True, cast=bool)
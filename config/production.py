@@ -5,3 +5,13 @@ class ProductionConfig(Config):
     DEBUG = False
     AZURE_ML_URL = config('AZURE_ML_URL')
     AZURE_ML_TOKEN = config('AZURE_ML_TOKEN')
+    AZURE_ML_MODEL_VERSION = config('AZURE_ML_MODEL_VERSION', default='')
+    AZURE_ML_CONNECT_TIMEOUT = config('AZURE_ML_CONNECT_TIMEOUT', default=5, cast=float)
+    AZURE_ML_TIMEOUT = config('AZURE_ML_TIMEOUT', default=30, cast=float)
+    AZURE_ML_MAX_RETRIES = config('AZURE_ML_MAX_RETRIES', default=3, cast=int)
+    AZURE_ML_POOL_SIZE = config('AZURE_ML_POOL_SIZE', default=20, cast=int)
+    AZURE_ML_RESIZE = config('AZURE_ML_RESIZE', default=False, cast=bool)
+    AZURE_ML_BATCH = config('AZURE_ML_BATCH', default=False, cast=bool)
+    SERVER_TIMING = config('SERVER_TIMING', default=False, cast=bool)
+    # Served behind Azure's front end, which adds X-Forwarded-For.
+    PROXY_FIX_X_FOR = config('PROXY_FIX_X_FOR', default=1, cast=int)
@@ -0,0 +1,73 @@
+"""
+Exports the Keras breed classifier to TFLite or ONNX and checks that it still agrees with it.
+
+The exported file can be served by pointing MODEL_PATH at it (the backend is picked from
+the .tflite / .onnx extension, or forced with INFERENCE_BACKEND).
+
+Usage:
+    python -m scripts.export_model --model model.keras --format tflite --quantize int8 \\
+        --calibration-dir samples/ --validate-dir validation/ --output model_int8.tflite
+"""
+import argparse
+import os
+import time
+import tensorflow as tf
+from src.models.inference_backends import (
+    InferenceBackend, KerasBackend, export_onnx, export_tflite, iter_batches, list_images, load_backend,
+    top1_agreement
+)
+
+
+def latency_per_image(backend: InferenceBackend, paths, batch_size: int) -> float:
+    batches = list(iter_batches(paths, batch_size))
+    backend.predict(batches[0])
+    start = time.perf_counter()
+    for batch in batches:
+        backend.predict(batch)
+    return (time.perf_counter() - start) / len(paths)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', required=True, help="Path to the Keras model")
+    parser.add_argument('--format', choices=['tflite', 'onnx'], required=True)
+    parser.add_argument('--quantize', choices=['none', 'dynamic', 'int8'], default='none')
+    parser.add_argument('--calibration-dir', help="Sample images for int8 calibration")
+    parser.add_argument('--calibration-samples', type=int, default=200)
+    parser.add_argument('--validate-dir', help="Images used to check top-1 agreement with the Keras model")
+    parser.add_argument('--min-agreement', type=float, default=0.99,
+                        help="Exit with an error if top-1 agreement is below this ratio")
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model)
+    quantization = None if args.quantize == 'none' else args.quantize
+    export = export_tflite if args.format == 'tflite' else export_onnx
+    export(model, args.output, quantization, args.calibration_dir, args.calibration_samples)
+    print(f"Exported {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)")
+
+    if not args.validate_dir:
+        return
+
+    paths = list_images(args.validate_dir)
+    if not paths:
+        parser.error(f"No images found in {args.validate_dir}")
+
+    reference = KerasBackend(model)
+    candidate = load_backend(args.output)
+    result = top1_agreement(reference, candidate, paths, args.batch_size)
+    print(f"Top-1 agreement: {result['agreed']}/{result['images']} ({result['agreement']:.2%}), "
+          f"max abs difference {result['max_abs_difference']:.4f}")
+    print(f"Latency per image (batch {args.batch_size}): "
+          f"keras {latency_per_image(reference, paths, args.batch_size) * 1000:.2f} ms, "
+          f"{candidate.name} {latency_per_image(candidate, paths, args.batch_size) * 1000:.2f} ms")
+    print(f"Parameter memory: keras {reference.memory_bytes / 1e6:.1f} MB, "
+          f"{candidate.name} {candidate.memory_bytes / 1e6:.1f} MB")
+
+    if result['agreement'] < args.min_agreement:
+        raise SystemExit(f"Top-1 agreement {result['agreement']:.2%} is below {args.min_agreement:.2%}")
+
+
+if __name__ == '__main__':
+    main()
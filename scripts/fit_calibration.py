@@ -0,0 +1,85 @@
+"""
+Fits a temperature-scaling calibration for the breed classifier on a labeled image folder.
+
+The folder holds one sub-folder per breed, named like the breed in the label mapping (or by
+its class index). The fitted temperature is written to a JSON file; point CALIBRATION_PATH
+at it so the reported confidences (and the upload threshold) match the observed accuracy.
+
+Usage:
+    python -m scripts.fit_calibration --model model.keras --labels label_mapping.json \\
+        --data-dir validation/ --output calibration.json
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+from src.models.inference_backends import iter_batches, list_images, load_backend
+from src.services.postprocess_model import (
+    apply_temperature, expected_calibration_error, fit_temperature, negative_log_likelihood
+)
+
+
+def labeled_images(data_dir: str, labels: dict) -> tuple:
+    """
+    Returns the image paths under data_dir and the class index of each one.
+    """
+    class_index = {label: int(index) for index, label in labels.items()}
+    paths, targets = [], []
+    for folder in sorted(os.listdir(data_dir)):
+        if not os.path.isdir(os.path.join(data_dir, folder)):
+            continue
+        if folder in class_index:
+            target = class_index[folder]
+        elif folder.isdigit():
+            target = int(folder)
+        else:
+            print(f"Skipping {folder}: not a breed in the label mapping")
+            continue
+        folder_paths = list_images(os.path.join(data_dir, folder))
+        paths.extend(folder_paths)
+        targets.extend([target] * len(folder_paths))
+    return paths, np.array(targets)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', required=True, help="Path to the Keras, TFLite or ONNX model")
+    parser.add_argument('--labels', required=True, help="Path to the label mapping JSON")
+    parser.add_argument('--data-dir', required=True, help="Labeled images, one sub-folder per breed")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    with open(args.labels, 'r') as f:
+        labels = json.load(f)
+    paths, targets = labeled_images(args.data_dir, labels)
+    if not paths:
+        parser.error(f"No labeled images found in {args.data_dir}")
+
+    model = load_backend(args.model)
+    probabilities = np.concatenate([model.predict(batch) for batch in iter_batches(paths, args.batch_size)])
+    temperature = fit_temperature(probabilities, targets)
+    calibrated = apply_temperature(probabilities, temperature)
+
+    result = {
+        "temperature": temperature,
+        "model": os.path.abspath(args.model),
+        "images": len(paths),
+        "accuracy": float(np.mean(probabilities.argmax(axis=1) == targets)),
+        "nll_before": negative_log_likelihood(probabilities, targets),
+        "nll_after": negative_log_likelihood(calibrated, targets),
+        "ece_before": expected_calibration_error(probabilities, targets),
+        "ece_after": expected_calibration_error(calibrated, targets),
+        "fitted_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    print(f"Temperature {temperature:.3f} on {len(paths)} images (accuracy {result['accuracy']:.2%})")
+    print(f"NLL {result['nll_before']:.4f} -> {result['nll_after']:.4f}, "
+          f"ECE {result['ece_before']:.4f} -> {result['ece_after']:.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Applies (or reverts) the schema migrations in src/database/schema.py on the configured database.
+
+The connection settings are read from the same environment / .env as the app
+(DB_ENGINE, DB_HOST, DB_NAME, DB_USER, DB_PASSWORD).
+
+Usage:
+    python -m scripts.migrate [--target 2]
+    python -m scripts.migrate --rollback [--target 0]
+"""
+import argparse
+from decouple import config
+from typing import Any, Tuple
+from src.database.database_connection import DatabaseConnection
+from src.database.schema import MIGRATIONS, applied_versions, migrate, rollback
+
+
+def connect() -> Tuple[Any, str]:
+    """
+    Opens a connection to the database configured in the environment.
+    """
+    engine = config('DB_ENGINE')
+    db_connection = DatabaseConnection(
+        engine=engine,
+        host=config('DB_HOST'),
+        user=config('DB_USER'),
+        password=config('DB_PASSWORD'),
+        database=config('DB_NAME')
+    )
+    return db_connection.connect(), engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', type=int, help="Version to migrate up (or roll back) to")
+    parser.add_argument('--rollback', action='store_true', help="Revert migrations above --target (default 0)")
+    args = parser.parse_args()
+
+    connection, engine = connect()
+    try:
+        if args.rollback:
+            done = rollback(connection, engine, args.target or 0)
+            verb = "Reverted"
+        else:
+            done = migrate(connection, engine, args.target)
+            verb = "Applied"
+        for migration in done:
+            print(f"{verb} {migration.version}: {migration.name}")
+        applied = applied_versions(connection, engine)
+        print(f"Schema at version {max(applied, default=0)} of {MIGRATIONS[-1].version}")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+"""
+Re-scores the archive of uploaded images with a (new) model, offline.
+
+High-confidence predictions are archived as '<predicted label>/<uuid>_<label>.<ext>' blobs.
+This lists the blobs under a prefix that follow that naming, downloads them with bounded
+concurrency, decodes and resizes them in a process pool, and runs batched inference with the
+same backends, preprocessing and postprocessing as predict_local. Every image gets a row in
+the report: its current folder, the new breed and confidence, the top-k alternatives and, with
+--move, where it was moved to when the model now places it in another folder.
+
+Rows are appended to a checkpoint file after every batch, so an interrupted run picks up
+where it stopped when started again with the same arguments (--restart discards it). The
+report is written from the checkpoint at the end, as CSV or, for a .parquet path, Parquet
+(requires pyarrow).
+
+Dog images ('<breed>/<uuid>_<filename>') and their thumbnails share the '<breed>/' folders and
+are referenced by URL from the dogs table. They do not follow the archive naming, so they are
+neither scored nor moved.
+
+A move that fails is recorded in the row's error column and the run goes on; like a failed
+download, the blob is tried again when the run is resumed.
+
+The storage is configured like the app (BLOB_STORAGE_BACKEND, AZURE_STORAGE_CONNECTION_STRING
+or LOCAL_BLOB_ROOT, CONTAINER_NAME).
+
+Usage:
+    python -m scripts.reclassify_archive --model model.keras --labels label_mapping.json \\
+        --report relabel.csv [--prefix golden_retriever/] [--batch-size 32] [--download-concurrency 16] \\
+        [--preprocess-workers 4] [--move --min-confidence 95]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from decouple import config
+from itertools import islice
+from PIL import Image
+import numpy as np
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from src.models.inference_backends import load_backend
+from src.services.blob_storage import create_blob_storage
+from src.services.postprocess_model import format_predictions, load_temperature
+from src.services.preprocess_model import IMAGE_SIZE, normalize_into, prepare_image
+from src.utils.label_mapping import LabelMappingCache
+
+REPORT_COLUMNS = ["blob", "size", "folder", "breed", "confidence", "top_k", "relabeled", "moved_to", "error"]
+CONTENT_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}
+# '<label>/<uuid4>_<label>.<ext>' as written by AzureBlobStorage.image_blob_name for archived predictions.
+ARCHIVE_NAME = re.compile(
+    r"(?:^|/)(?P<label>[^/]+)/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_(?P=label)\.(?:jpeg|jpg|png)$")
+
+
+def open_storage() -> Any:
+    """
+    Creates the blob storage the app is configured with, from the environment / .env.
+    """
+    settings = {
+        'BLOB_STORAGE_BACKEND': config('BLOB_STORAGE_BACKEND', default='azure'),
+        'AZURE_STORAGE_CONNECTION_STRING': config('AZURE_STORAGE_CONNECTION_STRING', default=''),
+        'LOCAL_BLOB_ROOT': config('LOCAL_BLOB_ROOT', default=''),
+        'LOCAL_BLOB_BASE_URL': config('LOCAL_BLOB_BASE_URL', default='http://localhost:5000'),
+        'SECRET_KEY': config('SECRET_KEY', default=''),
+    }
+    return create_blob_storage(settings)
+
+
+def decode_blob(data: bytes) -> np.ndarray:
+    """
+    Decodes and resizes an image to the model's input size; run in the process pool.
+
+    Returns the uint8 pixels, a quarter of the size of the normalized float32 input, to keep
+    the transfer back to the parent process cheap.
+    """
+    return np.asarray(prepare_image(Image.open(io.BytesIO(data))), dtype=np.uint8)
+
+
+def bounded_map(executor: Executor, fn: Any, items: Iterable[Any], window: int) -> Iterator[Tuple[Any, Future]]:
+    """
+    Submits fn(item) for each item with at most `window` calls in flight, yielding
+    (item, future) in submission order.
+    """
+    items = iter(items)
+    pending: Deque[Tuple[Any, Future]] = deque((item, executor.submit(fn, item)) for item in islice(items, window))
+    while pending:
+        item, future = pending.popleft()
+        for next_item in islice(items, 1):
+            pending.append((next_item, executor.submit(fn, next_item)))
+        yield item, future
+
+
+def is_archived_prediction(blob_name: str) -> bool:
+    """
+    Tells whether a blob is an archived prediction, rather than a dog image or thumbnail.
+    """
+    return ARCHIVE_NAME.search(blob_name) is not None
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """
+    Returns the blobs already scored by an earlier run, including where moved blobs went.
+    Failed downloads and moves are not counted, so they are tried again.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            if row.get("moved_to"):
+                done.add(row["moved_to"])
+            if row["error"].startswith(("download failed", "move failed")):
+                continue
+            done.add(row["blob"])
+    return done
+
+
+def relabeled_name(blob_name: str, breed: str) -> str:
+    """
+    Returns the name of an archived blob moved to the folder of a new breed:
+    'beagle/<uuid>_beagle.jpg' -> 'basset/<uuid>_basset.jpg'.
+    """
+    folder, _, base = blob_name.rpartition('/')
+    stem, extension = os.path.splitext(base)
+    old_label = folder.rsplit('/', 1)[-1]
+    if old_label and stem.endswith(f"_{old_label}"):
+        base = f"{stem[:-len(old_label)]}{breed}{extension}"
+    parent = folder.rpartition('/')[0]
+    return f"{parent}/{breed}/{base}" if parent else f"{breed}/{base}"
+
+
+def write_report(checkpoint_path: str, report_path: str) -> None:
+    if report_path.endswith('.parquet'):
+        try:
+            from pyarrow import csv as pa_csv, parquet
+        except ImportError:
+            raise SystemExit(f"Writing {report_path} requires pyarrow; the CSV is in {checkpoint_path}")
+        # Read every column as text except the numbers and the flag, so empty cells are not guessed as nulls of another type.
+        column_types = {"size": "int64", "confidence": "float64", "relabeled": "bool"}
+        table = pa_csv.read_csv(checkpoint_path, convert_options=pa_csv.ConvertOptions(
+            column_types={name: column_types.get(name, "string") for name in REPORT_COLUMNS}))
+        parquet.write_table(table, report_path)
+    elif os.path.abspath(report_path) != os.path.abspath(checkpoint_path):
+        with open(checkpoint_path, 'rb') as source, open(report_path, 'wb') as target:
+            target.write(source.read())
+
+
+class Reclassifier:
+    """
+    Scores batches of archived images and records the results, moving relabeled blobs if asked.
+
+    Moved names are added to `done`, so a blob moved ahead of the listing is not scored twice.
+    """
+
+    def __init__(self, storage: Any, container: str, args: argparse.Namespace, writer: Any, report: Any,
+                 done: Set[str]) -> None:
+        self.storage = storage
+        self.done = done
+        self.container = container
+        self.args = args
+        self.writer = writer
+        self.report = report
+        self.model = load_backend(args.model, args.backend, args.num_threads or None)
+        self.labels = LabelMappingCache().get_labels(args.labels, float('inf'),
+                                                     config('AZURE_STORAGE_CONNECTION_STRING', default=''))
+        self.temperature = load_temperature(args.calibration)
+        self.batch = np.empty((args.batch_size, IMAGE_SIZE[1], IMAGE_SIZE[0], 3), dtype=np.float32)
+        self.pending: List[Tuple[Dict[str, Any], bytes]] = []
+        self.images = self.errors = self.relabeled = self.moved = self.bytes = 0
+        self.inference_seconds = 0.0
+
+    def add(self, blob: Dict[str, Any], data: Optional[bytes], pixels: Optional[np.ndarray],
+            error: Optional[str]) -> None:
+        if error is not None:
+            self.errors += 1
+            self.writer.writerow({"blob": blob["name"], "size": blob.get("size", ""),
+                                  "folder": blob["name"].rpartition('/')[0], "error": error})
+            return
+        normalize_into(pixels, self.batch[len(self.pending)])
+        self.pending.append((blob, data))
+        if len(self.pending) == self.args.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Runs inference on the pending images, writes their rows and saves the checkpoint.
+        """
+        if self.pending:
+            start = time.perf_counter()
+            predictions = self.model.predict(self.batch[:len(self.pending)])
+            self.inference_seconds += time.perf_counter() - start
+            results = format_predictions(predictions, self.labels, self.args.top_k, self.temperature)
+            for (blob, data), result in zip(self.pending, results):
+                self.writer.writerow(self.record(blob, data, result))
+            self.pending = []
+        self.report.flush()
+        os.fsync(self.report.fileno())
+
+    def record(self, blob: Dict[str, Any], data: bytes, result: Dict[str, Any]) -> Dict[str, Any]:
+        name = blob["name"]
+        folder = name.rpartition('/')[0]
+        relabeled = folder.rsplit('/', 1)[-1] != result['breed'] and result['confidence'] >= self.args.min_confidence
+        moved_to = error = ''
+        if relabeled and self.args.move:
+            target = relabeled_name(name, result['breed'])
+            content_type = CONTENT_TYPES.get(os.path.splitext(name)[1].lower(), 'application/octet-stream')
+            try:
+                self.storage.upload_blob(self.container, target, data, content_type)
+                moved_to = target
+                self.done.add(moved_to)
+                self.storage.delete_blob(self.container, name)
+                self.moved += 1
+            except Exception as e:
+                # Keep going; with moved_to set the copy exists and only the original was not deleted.
+                self.errors += 1
+                error = f"move failed: {e}"
+        self.images += 1
+        self.relabeled += relabeled
+        self.bytes += len(data)
+        return {
+            "blob": name,
+            "size": len(data),
+            "folder": folder,
+            "breed": result['breed'],
+            "confidence": result['confidence'],
+            "top_k": json.dumps(result['top_k']),
+            "relabeled": relabeled,
+            "moved_to": moved_to,
+            "error": error,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', required=True, help="Keras, .tflite or .onnx model to score with")
+    parser.add_argument('--backend', default='auto', choices=['auto', 'keras', 'tflite', 'onnx'])
+    parser.add_argument('--num-threads', type=int, default=0, help="Inference threads (0: backend default)")
+    parser.add_argument('--labels', required=True, help="Label mapping JSON, local path or blob URL")
+    parser.add_argument('--calibration', help="Temperature file from scripts.fit_calibration")
+    parser.add_argument('--container', default=config('CONTAINER_NAME', default=''))
+    parser.add_argument('--prefix', default='', help="Only score blobs whose names start with this")
+    parser.add_argument('--limit', type=int, help="Stop after this many blobs (checkpointed ones excluded)")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--download-concurrency', type=int, default=16, help="Blobs downloaded in parallel")
+    parser.add_argument('--preprocess-workers', type=int, default=os.cpu_count() or 1,
+                        help="Decoding processes (0: decode in the main process)")
+    parser.add_argument('--min-confidence', type=float, default=95,
+                        help="Confidence (percent) a new breed needs to count as a relabel")
+    parser.add_argument('--move', action='store_true', help="Move relabeled blobs to their new breed's folder")
+    parser.add_argument('--report', required=True, help="Report path, .csv or .parquet")
+    parser.add_argument('--checkpoint', help="Checkpoint CSV (default: <report>.checkpoint.csv)")
+    parser.add_argument('--restart', action='store_true', help="Ignore and overwrite an existing checkpoint")
+    parser.add_argument('--progress-every', type=float, default=10, help="Seconds between progress lines")
+    args = parser.parse_args()
+    if not args.container:
+        parser.error("--container is required when CONTAINER_NAME is not set")
+
+    checkpoint_path = args.checkpoint or f"{os.path.splitext(args.report)[0]}.checkpoint.csv"
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    done = load_checkpoint(checkpoint_path)
+
+    storage = open_storage()
+    blobs = (blob for blob in storage.list_blobs(args.container, args.prefix)
+             if is_archived_prediction(blob["name"]) and blob["name"] not in done)
+    if args.limit is not None:
+        blobs = islice(blobs, args.limit)
+    if done:
+        print(f"Resuming: {len(done)} blobs already in {checkpoint_path}")
+
+    new_checkpoint = not os.path.exists(checkpoint_path)
+    with open(checkpoint_path, 'a', newline='') as report:
+        writer = csv.DictWriter(report, fieldnames=REPORT_COLUMNS)
+        if new_checkpoint:
+            writer.writeheader()
+        reclassifier = Reclassifier(storage, args.container, args, writer, report, done)
+
+        def download(blob: Dict[str, Any]) -> bytes:
+            return storage.download_bytes(args.container, blob["name"])
+
+        decode_pool = ProcessPoolExecutor(args.preprocess_workers) if args.preprocess_workers > 0 else None
+        start = last_progress = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(args.download_concurrency, thread_name_prefix="archive-download") as downloads:
+                downloaded = bounded_map(downloads, download, blobs, args.download_concurrency * 2)
+
+                def decoded() -> Iterator[Tuple[Dict[str, Any], Optional[bytes], Any]]:
+                    for blob, future in downloaded:
+                        try:
+                            data = future.result()
+                        except Exception as e:
+                            yield blob, None, e
+                            continue
+                        yield blob, data, decode_pool.submit(decode_blob, data) if decode_pool else data
+
+                # Keep the decoders a few images ahead of inference without holding the whole archive.
+                window: Deque[Tuple[Dict[str, Any], Optional[bytes], Any]] = deque()
+                source = decoded()
+                lookahead = max(args.batch_size, 4 * max(args.preprocess_workers, 1))
+                while True:
+                    window.extend(islice(source, lookahead - len(window)))
+                    if not window:
+                        break
+                    blob, data, pending = window.popleft()
+                    if isinstance(pending, Exception):
+                        reclassifier.add(blob, None, None, f"download failed: {pending}")
+                        continue
+                    try:
+                        pixels = pending.result() if isinstance(pending, Future) else decode_blob(pending)
+                    except Exception as e:
+                        reclassifier.add(blob, data, None, f"decode failed: {e}")
+                        continue
+                    reclassifier.add(blob, data, pixels, None)
+
+                    now = time.perf_counter()
+                    if now - last_progress >= args.progress_every:
+                        last_progress = now
+                        print(f"  {reclassifier.images:,} images, {reclassifier.images / (now - start):.1f} images/s, "
+                              f"{reclassifier.relabeled:,} relabeled, {reclassifier.errors:,} errors", flush=True)
+            reclassifier.flush()
+        finally:
+            if decode_pool is not None:
+                decode_pool.shutdown(cancel_futures=True)
+        elapsed = time.perf_counter() - start
+
+    write_report(checkpoint_path, args.report)
+    images = reclassifier.images
+    print(f"Scored {images:,} images in {elapsed:.1f}s: {images / elapsed if elapsed else 0:.1f} images/s, "
+          f"{reclassifier.bytes / elapsed / 1e6 if elapsed else 0:.1f} MB/s downloaded, "
+          f"inference {1000 * reclassifier.inference_seconds / images if images else 0:.1f} ms/image")
+    print(f"{reclassifier.relabeled:,} relabeled, {reclassifier.moved:,} moved, {reclassifier.errors:,} errors; "
+          f"report in {args.report}")
+
+
+if __name__ == '__main__':
+    main()
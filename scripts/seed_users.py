@@ -0,0 +1,226 @@
+"""
+Seeds a large number of users and dogs, then times the lookups UserModel and DogModel run,
+without and with the indexes from src/database/schema.py.
+
+Only for a scratch database, which --scratch-database confirms: the index migrations (1 and 2)
+are rolled back for the "before" run and applied again for the "after" run. The other
+migrations, such as the dogs.thumbnails column, are left as they are. Every seeded user shares one precomputed password hash (hashing a million
+passwords would take hours and is not what is measured). Registration is timed both the old way
+(SELECT then INSERT) and as the single INSERT that relies on the unique email index.
+
+Usage:
+    python -m scripts.seed_users --scratch-database [--users 1000000] [--dogs 1000000] [--lookups 500] \
+        [--create-tables]
+    python -m scripts.seed_users --scratch-database --skip-seed --lookups 2000
+    python -m scripts.seed_users --scratch-database --skip-seed --cleanup --lookups 0
+"""
+import argparse
+import random
+import time
+import uuid
+import numpy as np
+from typing import Any, Callable, Dict, List
+from werkzeug.security import generate_password_hash
+from decouple import config
+from scripts.migrate import connect
+from src.database.database_connection import is_unique_violation
+from src.database.schema import migrate, rollback
+
+EMAIL_FORMAT = "seed{}@example.com"
+SEED_PASSWORD = "seed password"
+BATCH_SIZE = 10000
+# The migrations that only add indexes, which the before/after comparison toggles.
+INDEX_MIGRATIONS = (1, 2)
+
+# Only for scratch databases: the columns the models read and write.
+CREATE_TABLES = {
+    "postgresql": [
+        "CREATE TABLE IF NOT EXISTS users (userid VARCHAR(36) PRIMARY KEY, email VARCHAR(255) NOT NULL, "
+        "upassword VARCHAR(255) NOT NULL, firstname VARCHAR(100), lastname VARCHAR(100), birthdate DATE, "
+        "country VARCHAR(100))",
+        "CREATE TABLE IF NOT EXISTS dogs (dogid VARCHAR(36) NOT NULL, dogname VARCHAR(100), breed VARCHAR(100), "
+        "age INTEGER, userid VARCHAR(36), imageurl VARCHAR(500))",
+    ],
+    "sqlserver": [
+        "IF OBJECT_ID('users') IS NULL CREATE TABLE users (userid VARCHAR(36) PRIMARY KEY, "
+        "email NVARCHAR(255) NOT NULL, upassword NVARCHAR(255) NOT NULL, firstname NVARCHAR(100), "
+        "lastname NVARCHAR(100), birthdate DATE, country NVARCHAR(100))",
+        "IF OBJECT_ID('dogs') IS NULL CREATE TABLE dogs (dogid VARCHAR(36) NOT NULL, dogname NVARCHAR(100), "
+        "breed NVARCHAR(100), age INT, userid VARCHAR(36), imageurl NVARCHAR(500))",
+    ],
+    "sqlite": [
+        "CREATE TABLE IF NOT EXISTS users (userid TEXT PRIMARY KEY, email TEXT NOT NULL, upassword TEXT NOT NULL, "
+        "firstname TEXT, lastname TEXT, birthdate TEXT, country TEXT)",
+        "CREATE TABLE IF NOT EXISTS dogs (dogid TEXT NOT NULL, dogname TEXT, breed TEXT, age INTEGER, userid TEXT, "
+        "imageurl TEXT)",
+    ],
+}
+
+
+def insert_many(connection: Any, engine: str, query: str, rows: List[tuple]) -> None:
+    cursor = connection.cursor()
+    try:
+        if engine == "postgresql":
+            from psycopg2.extras import execute_values
+            execute_values(cursor, query.replace("({})", "%s"), rows, page_size=1000)
+        else:
+            if engine == "sqlserver":
+                cursor.fast_executemany = True
+            cursor.executemany(query.format(", ".join("?" * len(rows[0]))), rows)
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def seed(connection: Any, engine: str, users: int, dogs: int) -> None:
+    hashed_password = generate_password_hash(SEED_PASSWORD)
+    start = time.perf_counter()
+    userids = []
+    for offset in range(0, users, BATCH_SIZE):
+        rows = []
+        for i in range(offset, min(offset + BATCH_SIZE, users)):
+            userid = str(uuid.UUID(int=i + 1))
+            userids.append(userid)
+            rows.append((userid, EMAIL_FORMAT.format(i), hashed_password, "Seed", f"User {i}", "1990-01-01", "AR"))
+        insert_many(connection, engine, "INSERT INTO users (userid, email, upassword, firstname, lastname, "
+                                        "birthdate, country) VALUES ({})", rows)
+        print(f"\r  users: {min(offset + BATCH_SIZE, users):,}/{users:,}", end="", flush=True)
+    print()
+
+    for offset in range(0, dogs, BATCH_SIZE):
+        rows = [(str(uuid.UUID(int=(1 << 64) + i)), f"Dog {i}", "beagle", i % 15, userids[i % len(userids)],
+                 f"https://example.com/{i}.jpg") for i in range(offset, min(offset + BATCH_SIZE, dogs))]
+        insert_many(connection, engine, "INSERT INTO dogs (dogid, dogname, breed, age, userid, imageurl) VALUES ({})",
+                    rows)
+        print(f"\r  dogs: {min(offset + BATCH_SIZE, dogs):,}/{dogs:,}", end="", flush=True)
+    print(f"\nSeeded {users:,} users and {dogs:,} dogs in {time.perf_counter() - start:.1f}s")
+
+
+def time_queries(connection: Any, run: Callable[[Any, int], None], samples: List[int]) -> Dict[str, float]:
+    cursor = connection.cursor()
+    latencies = []
+    try:
+        for sample in samples:
+            start = time.perf_counter()
+            run(cursor, sample)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        connection.rollback()
+        cursor.close()
+    latencies = np.array(latencies) * 1000
+    return {"mean_ms": float(latencies.mean()), "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99))}
+
+
+def measure(connection: Any, engine: str, users: int, dogs: int, lookups: int) -> Dict[str, Dict[str, float]]:
+    p = "%s" if engine == "postgresql" else "?"
+    rng = random.Random(0)
+    user_samples = [rng.randrange(users) for _ in range(lookups)]
+    dog_samples = [rng.randrange(max(dogs, 1)) for _ in range(lookups)]
+
+    def login(cursor: Any, i: int) -> None:
+        cursor.execute(f"SELECT userid, upassword FROM users WHERE email = {p}", (EMAIL_FORMAT.format(i),))
+        cursor.fetchone()
+
+    def dogs_by_user(cursor: Any, i: int) -> None:
+        cursor.execute(f"SELECT dogid, dogname, breed, age, imageurl FROM dogs WHERE userid = {p}",
+                       (str(uuid.UUID(int=i + 1)),))
+        cursor.fetchall()
+
+    def dog_by_id(cursor: Any, i: int) -> None:
+        cursor.execute(f"SELECT * FROM dogs WHERE dogid = {p}", (str(uuid.UUID(int=(1 << 64) + i)),))
+        cursor.fetchone()
+
+    insert = (f"INSERT INTO users (userid, email, upassword, firstname, lastname, birthdate, country) "
+              f"VALUES ({p}, {p}, {p}, {p}, {p}, {p}, {p})")
+
+    def new_user(i: int) -> tuple:
+        return (str(uuid.uuid4()), f"new{i}-{uuid.uuid4().hex[:8]}@example.com", "x", "New", "User", "1990-01-01", "AR")
+
+    def register_select_then_insert(cursor: Any, i: int) -> None:
+        row = new_user(i)
+        cursor.execute(f"SELECT * FROM users WHERE email = {p}", (row[1],))
+        if cursor.fetchone() is None:
+            cursor.execute(insert, row)
+
+    def register_insert(cursor: Any, i: int) -> None:
+        cursor.execute(insert, new_user(i))
+
+    # The registrations are rolled back at the end of each run, so the seeded data is unchanged.
+    return {
+        "login lookup": time_queries(connection, login, user_samples),
+        "register (select+insert)": time_queries(connection, register_select_then_insert, list(range(lookups))),
+        "register (insert)": time_queries(connection, register_insert, list(range(lookups))),
+        "dogs by userid": time_queries(connection, dogs_by_user, user_samples),
+        "dog by dogid": time_queries(connection, dog_by_id, dog_samples),
+    }
+
+
+def check_duplicate_rejected(connection: Any, engine: str) -> bool:
+    p = "%s" if engine == "postgresql" else "?"
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"INSERT INTO users (userid, email, upassword) VALUES ({p}, {p}, {p})",
+                       (str(uuid.uuid4()), EMAIL_FORMAT.format(0), "x"))
+        return False
+    except Exception as ex:
+        return is_unique_violation(ex)
+    finally:
+        connection.rollback()
+        cursor.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000000, help="Number of users to seed")
+    parser.add_argument('--dogs', type=int, default=1000000, help="Number of dogs to seed")
+    parser.add_argument('--lookups', type=int, default=500, help="Number of timed queries per kind")
+    parser.add_argument('--create-tables', action='store_true', help="Create minimal users/dogs tables if missing")
+    parser.add_argument('--skip-seed', action='store_true', help="Reuse users and dogs seeded by a previous run")
+    parser.add_argument('--cleanup', action='store_true', help="Delete the seeded users and dogs at the end")
+    parser.add_argument('--scratch-database', action='store_true',
+                        help="Confirm DB_NAME is a scratch database; required to create tables, seed, "
+                             "roll back indexes or clean up")
+    args = parser.parse_args()
+    if not args.scratch_database:
+        parser.error(f"this seeds {config('DB_NAME')} and drops its indexes; pass --scratch-database if it is "
+                     "a scratch database")
+
+    connection, engine = connect()
+    try:
+        if args.create_tables:
+            cursor = connection.cursor()
+            for statement in CREATE_TABLES[engine]:
+                cursor.execute(statement)
+            connection.commit()
+            cursor.close()
+        if not args.skip_seed:
+            rollback(connection, engine, versions=INDEX_MIGRATIONS)
+            seed(connection, engine, args.users, args.dogs)
+
+        if args.lookups:
+            rollback(connection, engine, versions=INDEX_MIGRATIONS)
+            before = measure(connection, engine, args.users, args.dogs, args.lookups)
+            migrate(connection, engine, max(INDEX_MIGRATIONS))
+            after = measure(connection, engine, args.users, args.dogs, args.lookups)
+
+            print(f"\n{'query':<26}{'before p50':>12}{'before p99':>12}{'after p50':>12}{'after p99':>12}{'speedup':>9}")
+            for name in before:
+                b, a = before[name], after[name]
+                print(f"{name:<26}{b['p50_ms']:>10.2f}ms{b['p99_ms']:>10.2f}ms{a['p50_ms']:>10.2f}ms"
+                      f"{a['p99_ms']:>10.2f}ms{b['mean_ms'] / a['mean_ms']:>8.1f}x")
+            print(f"\nduplicate email rejected by the index: {check_duplicate_rejected(connection, engine)}")
+
+        if args.cleanup:
+            cursor = connection.cursor()
+            cursor.execute("DELETE FROM dogs WHERE imageurl LIKE 'https://example.com/%'")
+            cursor.execute("DELETE FROM users WHERE email LIKE 'seed%@example.com'")
+            connection.commit()
+            cursor.close()
+            print("Deleted the seeded users and dogs")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import re
+from typing import Any, Mapping, Optional, Sequence, Tuple
+from src.database.database_connection import DatabaseConnection
+
+_QMARK = re.compile(r"\?")
+
+
+def _to_numbered_params(query: str) -> str:
+    """
+    Rewrites '?' placeholders as '$1', '$2', ... for asyncpg.
+    """
+    counter = iter(range(1, query.count("?") + 1))
+    return _QMARK.sub(lambda _: f"${next(counter)}", query)
+
+
+class AsyncDatabase:
+    """
+    Class to run queries through a pool of asynchronous database connections.
+
+    PostgreSQL uses asyncpg and SQL Server uses aioodbc. Queries are written with '?'
+    placeholders, as in the synchronous models, and translated for the engine in use.
+    """
+
+    def __init__(self, engine: str, pool: Any) -> None:
+        """
+        :param engine: The type of database engine (e.g., 'postgresql', 'sqlserver').
+        :param pool: The asyncpg or aioodbc pool to run queries on.
+        """
+        self.engine = engine
+        self.pool = pool
+
+    @classmethod
+    async def create(cls, config: Mapping[str, Any]) -> "AsyncDatabase":
+        """
+        Create the connection pool for the configured database engine.
+
+        :param config: The application settings (DB_ENGINE, DB_HOST, DB_POOL_MAX_SIZE, ...).
+        :return: An AsyncDatabase bound to a new pool.
+        :raises ValueError: If an unsupported database engine is provided.
+        """
+        engine = config['DB_ENGINE']
+        min_size = config.get('DB_POOL_MIN_SIZE', 1)
+        max_size = config.get('DB_POOL_MAX_SIZE', 10)
+
+        if engine == "postgresql":
+            import asyncpg
+            pool = await asyncpg.create_pool(
+                host=config['DB_HOST'],
+                user=config['DB_USER'],
+                password=config['DB_PASSWORD'],
+                database=config['DB_NAME'],
+                min_size=min_size,
+                max_size=max_size,
+                max_inactive_connection_lifetime=config.get('DB_POOL_MAX_IDLE', 300)
+            )
+        elif engine == "sqlserver":
+            import aioodbc
+            db_connection = DatabaseConnection(
+                engine=engine,
+                host=config['DB_HOST'],
+                user=config['DB_USER'],
+                password=config['DB_PASSWORD'],
+                database=config['DB_NAME']
+            )
+            pool = await aioodbc.create_pool(
+                dsn=db_connection.sqlserver_connection_string(),
+                minsize=min_size,
+                maxsize=max_size,
+                pool_recycle=config.get('DB_POOL_MAX_LIFETIME', 1800)
+            )
+        else:
+            raise ValueError(f"Unsupported database engine: {engine}")
+
+        return cls(engine, pool)
+
+    async def fetchall(self, query: str, params: Sequence[Any] = ()) -> list:
+        """
+        Run a query and return every row as a tuple.
+        """
+        if self.engine == "postgresql":
+            async with self.pool.acquire() as connection:
+                rows = await connection.fetch(_to_numbered_params(query), *params)
+                return [tuple(row) for row in rows]
+
+        async with self.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(query, params)
+                return [tuple(row) for row in await cursor.fetchall()]
+
+    async def fetchone(self, query: str, params: Sequence[Any] = ()) -> Optional[Tuple]:
+        """
+        Run a query and return its first row as a tuple, or None if there is no row.
+        """
+        if self.engine == "postgresql":
+            async with self.pool.acquire() as connection:
+                row = await connection.fetchrow(_to_numbered_params(query), *params)
+                return tuple(row) if row is not None else None
+
+        async with self.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(query, params)
+                row = await cursor.fetchone()
+                return tuple(row) if row is not None else None
+
+    async def migration_applied(self, version: int) -> bool:
+        """
+        Tell whether a migration has been applied, like schema.migration_applied.
+
+        :param version: The migration version to look for.
+        :return: True if the version is recorded; False if not, or if there is no version table.
+        """
+        try:
+            return await self.fetchone("SELECT 1 FROM schema_migrations WHERE version = ?", (version,)) is not None
+        except Exception:
+            return False
+
+    async def close(self) -> None:
+        """
+        Close every connection in the pool.
+        """
+        if self.engine == "postgresql":
+            await self.pool.close()
+        else:
+            self.pool.close()
+            await self.pool.wait_closed()
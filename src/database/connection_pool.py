@@ -0,0 +1,237 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator
+
+
+class PoolTimeoutError(Exception):
+    """
+    Raised when no connection becomes available within the checkout timeout.
+    """
+
+
+class _PooledConnection:
+    """
+    A raw DB-API connection plus the bookkeeping the pool needs to recycle it.
+    """
+
+    __slots__ = ("connection", "created_at", "last_used")
+
+    def __init__(self, connection: Any) -> None:
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of DB-API connections.
+
+    Connections are created on demand up to max_size and returned to the pool after use
+    instead of being closed. Idle connections are checked before being handed out again,
+    connections older than max_lifetime are replaced, and idle connections above min_size
+    are closed once they have been unused for max_idle seconds.
+    """
+
+    def __init__(self, connect: Callable[[], Any], min_size: int = 1, max_size: int = 10,
+                 timeout: float = 10.0, max_lifetime: float = 1800.0, max_idle: float = 300.0,
+                 health_check_interval: float = 5.0) -> None:
+        """
+        :param connect: A callable returning a new DB-API connection.
+        :param min_size: Number of idle connections kept open even when unused.
+        :param max_size: Maximum number of open connections.
+        :param timeout: Seconds to wait for a free connection before raising PoolTimeoutError.
+        :param max_lifetime: Seconds after which a connection is closed and replaced.
+        :param max_idle: Seconds after which an idle connection above min_size is closed.
+        :param health_check_interval: Connections idle for longer than this are pinged before use.
+        """
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+        self._idle: Deque[_PooledConnection] = deque()
+        self._checked_out: Dict[int, _PooledConnection] = {}
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._checkouts = 0
+        self._created = 0
+        self._closed = 0
+        self._timeouts = 0
+        self._failed_health_checks = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _size(self) -> int:
+        return len(self._idle) + len(self._checked_out) + self._pending
+
+    def acquire(self) -> Any:
+        """
+        Borrows a connection, waiting up to the pool timeout for one to become available.
+
+        :return: A DB-API connection that must be given back with release().
+        :raises PoolTimeoutError: If the pool stays exhausted for longer than the timeout.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            with self._condition:
+                while not self._idle and self._size() >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"No database connection available after {self.timeout} seconds"
+                        )
+                    self._condition.wait(remaining)
+                pooled = self._idle.pop() if self._idle else None
+                self._pending += 1
+
+            # Connecting and health checks happen outside the lock so they don't block other borrowers.
+            try:
+                if pooled is None:
+                    pooled = _PooledConnection(self._connect())
+                    created = True
+                else:
+                    created = False
+                    if not self._is_usable(pooled):
+                        self._discard(pooled)
+                        with self._condition:
+                            self._pending -= 1
+                        continue
+            except Exception:
+                with self._condition:
+                    self._pending -= 1
+                    self._condition.notify()
+                raise
+
+            waited = time.monotonic() - started
+            with self._condition:
+                self._pending -= 1
+                self._checked_out[id(pooled.connection)] = pooled
+                self._checkouts += 1
+                self._created += created
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return pooled.connection
+
+    def release(self, connection: Any, discard: bool = False) -> None:
+        """
+        Returns a borrowed connection to the pool.
+
+        :param connection: A connection obtained from acquire().
+        :param discard: Close the connection instead of keeping it, e.g. after a fatal error.
+        """
+        with self._condition:
+            pooled = self._checked_out.pop(id(connection), None)
+            if pooled is None:
+                return
+            now = time.monotonic()
+            pooled.last_used = now
+            keep = not discard and now - pooled.created_at < self.max_lifetime
+            if keep:
+                self._idle.append(pooled)
+            expired = self._expire_idle(now)
+            self._condition.notify()
+
+        if not keep:
+            self._discard(pooled)
+        for stale in expired:
+            self._discard(stale)
+
+    def _expire_idle(self, now: float) -> list:
+        # The oldest idle connections sit at the left of the deque, since borrowers pop from the right.
+        expired = []
+        while len(self._idle) > self.min_size and now - self._idle[0].last_used >= self.max_idle:
+            expired.append(self._idle.popleft())
+        return expired
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Borrows a connection for the duration of a with block.
+
+        The transaction is rolled back if the block raises, and the connection always goes
+        back to the pool. Any transaction left open by read-only queries is also ended, so
+        idle connections never hold locks. Writes must be committed inside the block.
+        """
+        connection = self.acquire()
+        healthy = False
+        try:
+            yield connection
+        except Exception:
+            healthy = self._rollback(connection)
+            raise
+        else:
+            healthy = self._rollback(connection)
+        finally:
+            self.release(connection, discard=not healthy)
+
+    @staticmethod
+    def _rollback(connection: Any) -> bool:
+        try:
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _is_usable(self, pooled: _PooledConnection) -> bool:
+        now = time.monotonic()
+        if now - pooled.created_at >= self.max_lifetime:
+            return False
+        if now - pooled.last_used < self.health_check_interval:
+            return True
+        try:
+            cursor = pooled.connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            pooled.connection.rollback()
+            return True
+        except Exception:
+            with self._condition:
+                self._failed_health_checks += 1
+            return False
+
+    def _discard(self, pooled: _PooledConnection) -> None:
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._closed += 1
+
+    def close(self) -> None:
+        """
+        Closes every idle connection. Borrowed connections are closed when they are released.
+        """
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            self.min_size = 0
+            self.max_lifetime = 0
+        for pooled in idle:
+            self._discard(pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the pool occupancy and checkout wait statistics.
+        """
+        with self._condition:
+            return {
+                "in_use": len(self._checked_out),
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+                "checkouts": self._checkouts,
+                "created": self._created,
+                "closed": self._closed,
+                "timeouts": self._timeouts,
+                "failed_health_checks": self._failed_health_checks,
+                "avg_wait_ms": 1000.0 * self._wait_total / self._checkouts if self._checkouts else 0.0,
+                "max_wait_ms": 1000.0 * self._wait_max,
+            }
@@ -1,7 +1,72 @@
-import psycopg2
-import pyodbc
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
 from flask import current_app
-from typing import Optional
+from typing import Any, Dict, Iterator, Optional, Tuple
+from src.database.connection_pool import ConnectionPool
+from src.utils.metrics import record_query
+from src.utils.stats import register_stats_provider
+
+logger = logging.getLogger(__name__)
+
+_pools: Dict[Tuple[str, str, str, str], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+class _TimedCursor:
+    """
+    Wraps a DB-API cursor so every execute is timed into the database query histogram.
+    """
+
+    def __init__(self, cursor: Any) -> None:
+        self._cursor = cursor
+
+    def execute(self, query: str, *args: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(query, *args)
+        finally:
+            record_query(query, time.perf_counter() - start)
+
+    def executemany(self, query: str, *args: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, *args)
+        finally:
+            record_query(query, time.perf_counter() - start)
+
+    def __enter__(self) -> "_TimedCursor":
+        # sqlite3 cursors are not context managers; they are closed on exit instead.
+        if hasattr(self._cursor, '__enter__'):
+            self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> Any:
+        if hasattr(self._cursor, '__exit__'):
+            return self._cursor.__exit__(*exc_info)
+        self._cursor.close()
+        return None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+class _TimedConnection:
+    """
+    Wraps a pooled connection so the cursors it hands out are timed.
+    """
+
+    def __init__(self, connection: Any) -> None:
+        self._connection = connection
+
+    def cursor(self, *args: Any, **kwargs: Any) -> _TimedCursor:
+        return _TimedCursor(self._connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
 
 class DatabaseConnection:
     """
@@ -11,7 +76,7 @@ class DatabaseConnection:
         """
         Initialize the database connection parameters.
 
-        :param engine: The type of database engine (e.g., 'postgresql', 'sqlserver').
+        :param engine: The type of database engine ('postgresql', 'sqlserver', or 'sqlite' for local runs).
         :param host: The database host address.
         :param user: The username for the database.
         :param password: The password for the database.
@@ -34,15 +99,18 @@ class DatabaseConnection:
             return self._connect_postgresql()
         elif self.engine == "sqlserver":
             return self._connect_sqlserver()
+        elif self.engine == "sqlite":
+            return self._connect_sqlite()
         else:
             raise ValueError(f"Unsupported database engine: {self.engine}")
 
-    def _connect_postgresql(self) -> psycopg2.extensions.connection:
+    def _connect_postgresql(self) -> Any:
         """
         Connect to a PostgreSQL database.
 
         :return: A PostgreSQL connection object.
         """
+        import psycopg2
         return psycopg2.connect(
             host=self.host,
             user=self.user,
@@ -50,23 +118,44 @@ class DatabaseConnection:
             database=self.database
         )
 
-    def _connect_sqlserver(self) -> pyodbc.Connection:
+    def _connect_sqlserver(self) -> Any:
         """
         Connect to a SQL Server database.
 
         :return: A SQL Server connection object.
         """
-        host=self.host,
-        user=self.user,
-        password=self.password,
-        database=self.database
-        driver = "ODBC Driver 18 for SQL Server"
-        connection_string = f"Driver={driver};Server={host},1433;Database={database};Uid={user};Pwd={password};Encrypt=yes;TrustServerCertificate=no;Connection Timeout=30;"
-
+        import pyodbc
         return pyodbc.connect(
-            connection_string
+            self.sqlserver_connection_string()
         )
 
+    def _connect_sqlite(self) -> sqlite3.Connection:
+        """
+        Connect to a SQLite database file, the local stand-in used by the benchmarks.
+
+        The database name is the file path. The connection may be used from any thread
+        (the pool hands it to one at a time), and WAL mode lets readers run during a write.
+
+        :return: A SQLite connection object.
+        """
+        connection = sqlite3.connect(self.database, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def sqlserver_connection_string(self) -> str:
+        """
+        Build the ODBC connection string for a SQL Server database.
+
+        :return: The ODBC connection string.
+        """
+        host = self.host
+        user = self.user
+        password = self.password
+        database = self.database
+        driver = "ODBC Driver 18 for SQL Server"
+        return f"Driver={driver};Server={host},1433;Database={database};Uid={user};Pwd={password};Encrypt=yes;TrustServerCertificate=no;Connection Timeout=30;"
+
     @staticmethod
     def get_connection() -> Optional[object]:
         """
@@ -85,6 +174,93 @@ class DatabaseConnection:
 
         connection = db_connection.connect()
 
-        print("Connection successfuly")
+        logger.debug("Connected to %s database %s", db_connection.engine, db_connection.database)
+
+        return connection
+
+    @staticmethod
+    def get_engine() -> str:
+        """
+        Static method to obtain the database engine of the current application's configuration.
+
+        :return: The engine name ('postgresql', 'sqlserver' or 'sqlite').
+        """
+        return current_app.config['DB_ENGINE']
+
+    @staticmethod
+    def get_pool() -> ConnectionPool:
+        """
+        Static method to obtain the process-wide connection pool for the current application's database.
+
+        :return: The ConnectionPool for the configured engine, host, database and user.
+        """
+        config = current_app.config
+        key = (config['DB_ENGINE'], config['DB_HOST'], config['DB_NAME'], config['DB_USER'])
+        pool = _pools.get(key)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(key)
+                if pool is None:
+                    db_connection = DatabaseConnection(
+                        engine=config['DB_ENGINE'],
+                        host=config['DB_HOST'],
+                        user=config['DB_USER'],
+                        password=config['DB_PASSWORD'],
+                        database=config['DB_NAME']
+                    )
+                    pool = ConnectionPool(
+                        db_connection.connect,
+                        min_size=config.get('DB_POOL_MIN_SIZE', 1),
+                        max_size=config.get('DB_POOL_MAX_SIZE', 10),
+                        timeout=config.get('DB_POOL_TIMEOUT', 10),
+                        max_lifetime=config.get('DB_POOL_MAX_LIFETIME', 1800),
+                        max_idle=config.get('DB_POOL_MAX_IDLE', 300),
+                        health_check_interval=config.get('DB_POOL_HEALTH_CHECK_INTERVAL', 5)
+                    )
+                    _pools[key] = pool
+        return pool
+
+    @staticmethod
+    @contextmanager
+    def connection() -> Iterator[object]:
+        """
+        Static method to borrow a pooled connection for the duration of a with block.
+
+        The connection is rolled back if the block raises and is always returned to the pool.
+        Every query run on it is timed into the database query histogram on /metrics.
+
+        :return: A database connection object.
+        """
+        with DatabaseConnection.get_pool().connection() as connection:
+            yield _TimedConnection(connection)
+
+
+def is_unique_violation(error: BaseException) -> bool:
+    """
+    Tell whether a database error was raised by a unique index or constraint.
+
+    :param error: The exception raised by psycopg2, pyodbc or sqlite3.
+    :return: True for PostgreSQL's SQLSTATE 23505, SQL Server's errors 2601 and 2627 and
+        SQLite's UNIQUE constraint errors.
+    """
+    # The drivers are only imported when their engine is used, so only check loaded ones.
+    psycopg2 = sys.modules.get('psycopg2')
+    if psycopg2 is not None and isinstance(error, psycopg2.IntegrityError):
+        return getattr(error, 'pgcode', None) == '23505'
+    pyodbc = sys.modules.get('pyodbc')
+    if pyodbc is not None and isinstance(error, pyodbc.IntegrityError):
+        message = str(error)
+        return '(2601)' in message or '(2627)' in message
+    if isinstance(error, sqlite3.IntegrityError):
+        return str(error).startswith('UNIQUE constraint failed')
+    return False
+
+
+def database_pool_stats() -> Dict[str, Dict[str, object]]:
+    """
+    Returns the stats of every connection pool opened by this process, keyed by engine, host and database.
+    """
+    return {f"{engine}://{host}/{database}": pool.stats() for (engine, host, database, _), pool in _pools.items()}
+
 
-        return connection
\ No newline at end of file
+register_stats_provider('database', database_pool_stats)
@@ -0,0 +1,279 @@
+import logging
+import time
+from typing import Any, Collection, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Migration(NamedTuple):
+    """
+    A numbered schema change, with the statements that apply and revert it on each engine.
+    """
+    version: int
+    name: str
+    up: Dict[str, List[str]]
+    down: Dict[str, List[str]]
+
+
+def _sqlserver_create_index(name: str, table: str, definition: str) -> str:
+    return (f"IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{name}' AND object_id = OBJECT_ID('{table}')) "
+            f"CREATE {definition}")
+
+
+def _sqlserver_drop_index(name: str, table: str) -> str:
+    return (f"IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{name}' AND object_id = OBJECT_ID('{table}')) "
+            f"DROP INDEX {name} ON {table}")
+
+
+# The indexes the models' lookups rely on. The email index is unique, so UserModel.register can
+# insert without checking first, and it carries the login columns, so login is an index-only read.
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        name="unique users.email",
+        up={
+            "postgresql": ["CREATE UNIQUE INDEX IF NOT EXISTS ux_users_email ON users (email) INCLUDE (userid, upassword)"],
+            "sqlserver": [_sqlserver_create_index(
+                "ux_users_email", "users", "UNIQUE INDEX ux_users_email ON users (email) INCLUDE (userid, upassword)")],
+            # SQLite has no INCLUDE; a covering index lists the columns in the key instead.
+            "sqlite": [
+                "CREATE UNIQUE INDEX IF NOT EXISTS ux_users_email ON users (email)",
+                "CREATE INDEX IF NOT EXISTS ix_users_login ON users (email, userid, upassword)",
+            ],
+        },
+        down={
+            "postgresql": ["DROP INDEX IF EXISTS ux_users_email"],
+            "sqlserver": [_sqlserver_drop_index("ux_users_email", "users")],
+            "sqlite": ["DROP INDEX IF EXISTS ux_users_email", "DROP INDEX IF EXISTS ix_users_login"],
+        },
+    ),
+    Migration(
+        version=2,
+        name="dogs.userid and dogs.dogid",
+        up={
+            "postgresql": [
+                "CREATE INDEX IF NOT EXISTS ix_dogs_userid ON dogs (userid)",
+                "CREATE UNIQUE INDEX IF NOT EXISTS ux_dogs_dogid ON dogs (dogid)",
+            ],
+            "sqlserver": [
+                _sqlserver_create_index("ix_dogs_userid", "dogs", "INDEX ix_dogs_userid ON dogs (userid)"),
+                _sqlserver_create_index("ux_dogs_dogid", "dogs", "UNIQUE INDEX ux_dogs_dogid ON dogs (dogid)"),
+            ],
+            "sqlite": [
+                "CREATE INDEX IF NOT EXISTS ix_dogs_userid ON dogs (userid)",
+                "CREATE UNIQUE INDEX IF NOT EXISTS ux_dogs_dogid ON dogs (dogid)",
+            ],
+        },
+        down={
+            "postgresql": ["DROP INDEX IF EXISTS ix_dogs_userid", "DROP INDEX IF EXISTS ux_dogs_dogid"],
+            "sqlserver": [_sqlserver_drop_index("ix_dogs_userid", "dogs"), _sqlserver_drop_index("ux_dogs_dogid", "dogs")],
+            "sqlite": ["DROP INDEX IF EXISTS ix_dogs_userid", "DROP INDEX IF EXISTS ux_dogs_dogid"],
+        },
+    ),
+    Migration(
+        version=3,
+        name="dogs.thumbnails",
+        up={
+            "postgresql": ["ALTER TABLE dogs ADD COLUMN IF NOT EXISTS thumbnails VARCHAR(200)"],
+            "sqlserver": ["IF COL_LENGTH('dogs', 'thumbnails') IS NULL ALTER TABLE dogs ADD thumbnails VARCHAR(200) NULL"],
+            "sqlite": ["ALTER TABLE dogs ADD COLUMN thumbnails TEXT"],
+        },
+        down={
+            "postgresql": ["ALTER TABLE dogs DROP COLUMN IF EXISTS thumbnails"],
+            "sqlserver": ["IF COL_LENGTH('dogs', 'thumbnails') IS NOT NULL ALTER TABLE dogs DROP COLUMN thumbnails"],
+            "sqlite": ["ALTER TABLE dogs DROP COLUMN thumbnails"],
+        },
+    ),
+]
+
+_VERSION_TABLE = {
+    "postgresql": "CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, "
+                  "applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)",
+    "sqlserver": "IF OBJECT_ID('schema_migrations') IS NULL CREATE TABLE schema_migrations (version INT PRIMARY KEY, "
+                 "name NVARCHAR(200) NOT NULL, applied_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME())",
+    "sqlite": "CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+              "applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)",
+}
+
+# Rows that would make the unique indexes fail to build, reported before trying.
+_DUPLICATE_CHECKS = {
+    1: "SELECT email, COUNT(*) FROM users GROUP BY email HAVING COUNT(*) > 1",
+    2: "SELECT dogid, COUNT(*) FROM dogs GROUP BY dogid HAVING COUNT(*) > 1",
+}
+
+
+def _placeholder(engine: str) -> str:
+    return "%s" if engine == "postgresql" else "?"
+
+
+def _check_engine(engine: str) -> None:
+    if engine not in _VERSION_TABLE:
+        raise ValueError(f"Unsupported database engine: {engine}")
+
+
+def applied_versions(connection: Any, engine: str) -> List[int]:
+    """
+    Return the versions already applied to the database, creating the version table if needed.
+
+    :param connection: An open DB-API connection.
+    :param engine: The type of database engine ('postgresql', 'sqlserver' or 'sqlite').
+    :return: The applied versions, in ascending order.
+    """
+    _check_engine(engine)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(_VERSION_TABLE[engine])
+        connection.commit()
+        cursor.execute("SELECT version FROM schema_migrations ORDER BY version")
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def migration_applied(connection: Any, engine: str, version: int) -> bool:
+    """
+    Tell whether a migration has been applied, without writing to the database.
+
+    Unlike applied_versions this never creates the version table, so it can run on the request
+    path with a role that has no DDL privileges. A missing table means nothing was applied.
+
+    :param connection: An open DB-API connection.
+    :param engine: The type of database engine ('postgresql', 'sqlserver' or 'sqlite').
+    :param version: The migration version to look for.
+    :return: True if the version is recorded in schema_migrations.
+    """
+    _check_engine(engine)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT 1 FROM schema_migrations WHERE version = {_placeholder(engine)}", (version,))
+        return cursor.fetchone() is not None
+    except Exception:
+        # Most likely the version table does not exist yet. Roll back, as PostgreSQL refuses
+        # further statements in a transaction after an error.
+        connection.rollback()
+        return False
+    finally:
+        cursor.close()
+
+
+class MigrationProbe:
+    """
+    Remembers whether a migration the models rely on has been applied.
+
+    Once applied, it is not checked again. Until then it is rechecked at most every
+    recheck_interval seconds, so workers pick up a migration applied while they run.
+    """
+
+    def __init__(self, version: int, recheck_interval: float = 60.0) -> None:
+        """
+        :param version: The migration version to look for.
+        :param recheck_interval: Seconds before a missing migration is looked for again.
+        """
+        self.version = version
+        self.recheck_interval = recheck_interval
+        self._applied: Optional[bool] = None
+        self._checked_at = 0.0
+
+    def cached(self) -> Optional[bool]:
+        """
+        Return the cached answer, or None if it is missing or expired and must be looked up again.
+        """
+        if self._applied is False and time.monotonic() - self._checked_at >= self.recheck_interval:
+            return None
+        return self._applied
+
+    def record(self, applied: bool) -> bool:
+        """
+        Cache the result of a lookup, for callers that query the version table themselves.
+
+        :param applied: Whether the migration was found.
+        :return: The same value.
+        """
+        if not applied and self._applied is None:
+            name = next((migration.name for migration in MIGRATIONS if migration.version == self.version), "")
+            logger.error("Migration %d (%s) is not applied; run python -m scripts.migrate.", self.version, name)
+        self._applied, self._checked_at = applied, time.monotonic()
+        return applied
+
+    def applied(self, connection: Any, engine: str) -> bool:
+        """
+        Return whether the migration has been applied, querying only when the cached answer expired.
+
+        :param connection: An open DB-API connection, used only when the answer is rechecked.
+        :param engine: The type of database engine ('postgresql', 'sqlserver' or 'sqlite').
+        """
+        applied = self.cached()
+        if applied is None:
+            applied = self.record(migration_applied(connection, engine, self.version))
+        return applied
+
+
+def migrate(connection: Any, engine: str, target: int | None = None) -> List[Migration]:
+    """
+    Apply every pending migration up to the target version, each in its own transaction.
+
+    :param connection: An open DB-API connection.
+    :param engine: The type of database engine ('postgresql', 'sqlserver' or 'sqlite').
+    :param target: The last version to apply; all of them if None.
+    :return: The migrations that were applied.
+    :raises ValueError: If existing rows would violate a unique index the migration creates.
+    """
+    applied = set(applied_versions(connection, engine))
+    done = []
+    for migration in MIGRATIONS:
+        if migration.version in applied or (target is not None and migration.version > target):
+            continue
+        cursor = connection.cursor()
+        try:
+            check = _DUPLICATE_CHECKS.get(migration.version)
+            if check is not None:
+                cursor.execute(check)
+                duplicates = cursor.fetchmany(5)
+                if duplicates:
+                    raise ValueError(f"Cannot apply migration {migration.version} ({migration.name}): "
+                                     f"duplicate values {[row[0] for row in duplicates]}")
+            for statement in migration.up[engine]:
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO schema_migrations (version, name) VALUES "
+                           f"({_placeholder(engine)}, {_placeholder(engine)})", (migration.version, migration.name))
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        done.append(migration)
+    return done
+
+
+def rollback(connection: Any, engine: str, target: int = 0,
+             versions: Optional[Collection[int]] = None) -> List[Migration]:
+    """
+    Revert the applied migrations above the target version, newest first.
+
+    :param connection: An open DB-API connection.
+    :param engine: The type of database engine ('postgresql', 'sqlserver' or 'sqlite').
+    :param target: The version to go back to; 0 reverts everything.
+    :param versions: Only revert these versions, leaving the others applied; all of them if None.
+    :return: The migrations that were reverted.
+    """
+    applied = set(applied_versions(connection, engine))
+    done = []
+    for migration in reversed(MIGRATIONS):
+        if migration.version not in applied or migration.version <= target:
+            continue
+        if versions is not None and migration.version not in versions:
+            continue
+        cursor = connection.cursor()
+        try:
+            for statement in migration.down[engine]:
+                cursor.execute(statement)
+            cursor.execute(f"DELETE FROM schema_migrations WHERE version = {_placeholder(engine)}", (migration.version,))
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        done.append(migration)
+    return done
@@ -1,23 +1,55 @@
 from src.database.database_connection import DatabaseConnection
+from src.database.schema import MigrationProbe
 from src.models.entities.dogs import Dog
-from typing import List, Optional
+from src.services.entity_cache import get_entity_cache
+from typing import Any, Callable, List, Optional
+
+# The migration that adds the dogs.thumbnails column.
+THUMBNAILS_MIGRATION = 3
 
 class DogModel:
     """
     A model class to interact with the dogs' data in the database.
     It provides methods to save, retrieve, and update dog records.
+
+    Per-user dog lists and dog-by-id lookups are read through the 'dogs' entity cache, and
+    save_dog / update_dog / set_thumbnails invalidate the entries they change once the write
+    is committed.
+
+    Until migration 3 adds dogs.thumbnails, dogs are read with no thumbnails and none are recorded.
     """
 
+    _thumbnails_column = MigrationProbe(THUMBNAILS_MIGRATION)
+
+    @classmethod
+    def _has_thumbnails(cls, connection: Any) -> bool:
+        return cls._thumbnails_column.applied(connection, DatabaseConnection.get_engine())
+
+    @classmethod
+    def _thumbnails_select(cls, connection: Any) -> str:
+        return "thumbnails" if cls._has_thumbnails(connection) else "NULL AS thumbnails"
+
+    @staticmethod
+    def _cached(key: str, loader: Callable[[], Any]) -> Any:
+        cache = get_entity_cache('dogs')
+        return cache.get(key, loader) if cache is not None else loader()
+
+    @staticmethod
+    def _invalidate(*keys: str) -> None:
+        cache = get_entity_cache('dogs')
+        if cache is not None:
+            cache.invalidate(*keys)
+
     @classmethod
     def save_dog(cls, dog: Dog) -> bool:
         try:
-            connection = DatabaseConnection.get_connection()
-            with connection.cursor() as cursor:
+            with DatabaseConnection.connection() as connection, connection.cursor() as cursor:
                 cursor.execute(
                     "INSERT INTO dogs (dogid, dogname, breed, age, userid, imageurl) VALUES (?, ?, ?, ?, ?, ?)",
                     (dog.dogid, dog.dogname, dog.breed, dog.age, dog.userid, dog.imageurl)
                 )
                 connection.commit()
+            cls._invalidate(f"user:{dog.userid}", f"dog:{dog.dogid}")
             return True
         except Exception as ex:
             raise Exception(ex)
@@ -25,8 +57,7 @@ class DogModel:
     @classmethod
     def get_dog_by_user(cls, userid: str) -> List[Dog]:
         try:
-            connection = DatabaseConnection.get_connection()
-            with connection.cursor() as cursor:
+            with DatabaseConnection.connection() as connection, connection.cursor() as cursor:
                 cursor.execute(
                     "SELECT * FROM dogs WHERE userid = ?", (userid,)
                 )
@@ -41,45 +72,83 @@ class DogModel:
 
     @classmethod
     def get_dog_by_id(cls, dogid: str) -> Optional[Dog]:
-        try:
-            connection = DatabaseConnection.get_connection()
-            with connection.cursor() as cursor:
+        def load() -> Optional[dict]:
+            with DatabaseConnection.connection() as connection, connection.cursor() as cursor:
                 cursor.execute(
-                    "SELECT * FROM dogs WHERE dogid = ?", (dogid,)
+                    f"SELECT dogid, dogname, breed, age, userid, imageurl, {cls._thumbnails_select(connection)} "
+                    "FROM dogs WHERE dogid = ?", (dogid,)
                 )
                 row = cursor.fetchone()
                 if row:
-                    return Dog(row[0], row[1], row[2], row[3], row[4], row[5])
+                    return vars(Dog(row[0], row[1], row[2], row[3], row[4], row[5], row[6]))
                 else:
                     return None
+
+        try:
+            fields = cls._cached(f"dog:{dogid}", load)
+            return Dog(**fields) if fields is not None else None
         except Exception as ex:
             raise Exception(ex)
 
     @staticmethod
     def get_dogs_by_user_id(userid: str) -> List[Dog]:
-        try:
-            connection = DatabaseConnection.get_connection()
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT dogid, dogname, breed, age, imageurl FROM dogs WHERE userid = ?", (userid,))
+        def load() -> List[dict]:
+            with DatabaseConnection.connection() as connection, connection.cursor() as cursor:
+                cursor.execute(f"SELECT dogid, dogname, breed, age, imageurl, {DogModel._thumbnails_select(connection)} "
+                               "FROM dogs WHERE userid = ?", (userid,))
                 rows = cursor.fetchall()
                 dogs = []
                 if rows:
                     for row in rows:
-                        dogs.append(Dog(row[0], row[1], row[2], row[3], userid, row[4]))
+                        dogs.append(vars(Dog(row[0], row[1], row[2], row[3], userid, row[4], row[5])))
                 return dogs
+
+        try:
+            return [Dog(**fields) for fields in DogModel._cached(f"user:{userid}", load)]
         except Exception as ex:
             raise Exception(ex)
 
     @staticmethod
     def update_dog(dog: Dog) -> None:
+        """
+        Updates a dog. Its recorded thumbnails are cleared if the image changes.
+        """
+        try:
+            with DatabaseConnection.connection() as connection, connection.cursor() as cursor:
+                if DogModel._has_thumbnails(connection):
+                    cursor.execute(
+                        "UPDATE dogs SET dogname = ?, breed = ?, age = ?, imageurl = ?, "
+                        "thumbnails = CASE WHEN imageurl = ? THEN thumbnails ELSE NULL END WHERE dogid = ?",
+                        (dog.dogname, dog.breed, dog.age, dog.imageurl, dog.imageurl, dog.dogid)
+                    )
+                else:
+                    cursor.execute(
+                        "UPDATE dogs SET dogname = ?, breed = ?, age = ?, imageurl = ? WHERE dogid = ?",
+                        (dog.dogname, dog.breed, dog.age, dog.imageurl, dog.dogid)
+                    )
+                connection.commit()
+            DogModel._invalidate(f"user:{dog.userid}", f"dog:{dog.dogid}")
+        except Exception as ex:
+            raise Exception(ex)
+
+    @staticmethod
+    def set_thumbnails(dogid: str, userid: str, imageurl: str, thumbnails: str) -> bool:
+        """
+        Records the thumbnails stored for a dog's image, unless the dog has another image by now.
+
+        Returns:
+            bool: Whether the dog still had that image; False while the thumbnails column is missing.
+        """
         try:
-            connection = DatabaseConnection.get_connection()
-            with connection.cursor() as cursor:
+            with DatabaseConnection.connection() as connection, connection.cursor() as cursor:
+                if not DogModel._has_thumbnails(connection):
+                    return False
                 cursor.execute(
-                    "UPDATE dogs SET dogname = ?, breed = ?, age = ?, imageurl = ? WHERE dogid = ?",
-                    (dog.dogname, dog.breed, dog.age, dog.imageurl, dog.dogid)
+                    "UPDATE dogs SET thumbnails = ? WHERE dogid = ? AND imageurl = ?", (thumbnails, dogid, imageurl)
                 )
+                updated = cursor.rowcount > 0
                 connection.commit()
+            DogModel._invalidate(f"user:{userid}", f"dog:{dogid}")
+            return updated
         except Exception as ex:
-            connection.rollback()
             raise Exception(ex)
\ No newline at end of file
@@ -1,12 +1,18 @@
+from typing import Optional
+
 class Dog:
     """
     A class to represent a dog.
     """
 
-    def __init__(self, dogid: str, dogname: str, breed: str, age: int, userid: str, imageurl: str):
+    def __init__(self, dogid: str, dogname: str, breed: str, age: int, userid: str, imageurl: str,
+                 thumbnails: Optional[str] = None):
         self.dogid = dogid
         self.dogname = dogname
         self.breed = breed
         self.age = age
         self.userid = userid
-        self.imageurl = imageurl
\ No newline at end of file
+        self.imageurl = imageurl
+        # The sizes and formats of the thumbnails stored for imageurl, as written by
+        # image_derivatives.derivatives_record, or None until they have all been stored.
+        self.thumbnails = thumbnails
\ No newline at end of file
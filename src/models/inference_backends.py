@@ -0,0 +1,304 @@
+import os
+import threading
+import numpy as np
+from PIL import Image
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence
+from src.services.preprocess_model import preprocess_batch
+
+if TYPE_CHECKING:
+    import tensorflow as tf
+
+# TensorFlow is imported inside the functions that need it, so that importing this module
+# (and the prediction routes) does not pay TensorFlow's import time until a model is loaded.
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+
+class InferenceBackend:
+    """
+    Base class for the runtimes that can serve the breed classifier.
+
+    Every backend takes a float32 (N, 224, 224, 3) batch and returns the (N, classes) output,
+    so the prediction routes do not depend on which runtime is loaded.
+    """
+
+    name = "base"
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        Approximate size of the model parameters held in memory.
+        """
+        return 0
+
+
+class KerasBackend(InferenceBackend):
+    """
+    Serves a tf.keras.Model directly.
+    """
+
+    name = "keras"
+
+    def __init__(self, model: "tf.keras.Model") -> None:
+        self.model = model
+
+    @classmethod
+    def load(cls, path: str) -> "KerasBackend":
+        import tensorflow as tf
+        return cls(tf.keras.models.load_model(path))
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        return np.asarray(self.model.predict_on_batch(images))
+
+    @property
+    def memory_bytes(self) -> int:
+        # Keras 3 reports dtypes as strings, tf.keras 2 as tf.DType.
+        return sum(
+            int(np.prod(tuple(weight.shape))) * np.dtype(getattr(weight.dtype, 'as_numpy_dtype', weight.dtype)).itemsize
+            for weight in self.model.weights
+        )
+
+
+class TFLiteBackend(InferenceBackend):
+    """
+    Serves a .tflite model with the TensorFlow Lite interpreter.
+
+    The interpreter is not thread-safe, so calls are serialized; with the micro-batcher in
+    front, a single thread runs all forward passes anyway. Quantized inputs and outputs are
+    converted with the scale and zero point stored in the model.
+    """
+
+    name = "tflite"
+
+    def __init__(self, path: str, num_threads: Optional[int] = None) -> None:
+        self.path = path
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        self._lock = threading.Lock()
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        with self._lock:
+            if len(images) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input['index'], [len(images), *images.shape[1:]])
+                self.interpreter.allocate_tensors()
+                self._input = self.interpreter.get_input_details()[0]
+                self._output = self.interpreter.get_output_details()[0]
+                self._batch_size = len(images)
+
+            if self._input['dtype'] != np.float32:
+                scale, zero_point = self._input['quantization']
+                images = np.round(images / scale + zero_point).astype(self._input['dtype'])
+            self.interpreter.set_tensor(self._input['index'], images)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output['index'])
+
+            if self._output['dtype'] != np.float32:
+                scale, zero_point = self._output['quantization']
+                output = (output.astype(np.float32) - zero_point) * scale
+            return output
+
+    @property
+    def memory_bytes(self) -> int:
+        return os.path.getsize(self.path)
+
+
+class ONNXBackend(InferenceBackend):
+    """
+    Serves a .onnx model with ONNX Runtime on the CPU.
+    """
+
+    name = "onnx"
+
+    def __init__(self, path: str, num_threads: Optional[int] = None) -> None:
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self._input_name: images.astype(np.float32, copy=False)})[0]
+
+    @property
+    def memory_bytes(self) -> int:
+        return os.path.getsize(self.path)
+
+
+def resolve_backend(path: str, backend: str = 'auto') -> str:
+    """
+    Returns the backend that will serve a model, picking it from the file extension for 'auto'.
+    """
+    if backend != 'auto':
+        return backend
+    extension = os.path.splitext(path)[1].lower()
+    return {'.tflite': 'tflite', '.onnx': 'onnx'}.get(extension, 'keras')
+
+
+def load_backend(path: str, backend: str = 'auto', num_threads: Optional[int] = None) -> InferenceBackend:
+    """
+    Loads a model with the requested backend.
+
+    Args:
+        path (str): Path to a Keras model, a .tflite file or a .onnx file.
+        backend (str): 'keras', 'tflite', 'onnx', or 'auto' to pick one from the file extension.
+        num_threads (int, optional): Number of CPU threads for the TFLite and ONNX runtimes.
+
+    Returns:
+        InferenceBackend: The loaded backend.
+
+    Raises:
+        ValueError: If an unsupported backend is requested.
+    """
+    backend = resolve_backend(path, backend)
+    if backend == 'keras':
+        return KerasBackend.load(path)
+    if backend == 'tflite':
+        return TFLiteBackend(path, num_threads)
+    if backend == 'onnx':
+        return ONNXBackend(path, num_threads)
+    raise ValueError(f"Unsupported inference backend: {backend}")
+
+
+def list_images(folder: str) -> List[str]:
+    """
+    Returns the image files under a folder, recursively and in a stable order.
+    """
+    paths = []
+    for root, _, files in os.walk(folder):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(paths)
+
+
+def iter_batches(paths: Sequence[str], batch_size: int) -> Iterator[np.ndarray]:
+    """
+    Yields preprocessed (N, 224, 224, 3) batches for a list of image files.
+    """
+    for start in range(0, len(paths), batch_size):
+        yield preprocess_batch([Image.open(path) for path in paths[start:start + batch_size]])
+
+
+def export_tflite(model: "tf.keras.Model", output_path: str, quantization: Optional[str] = None,
+                  calibration_dir: Optional[str] = None, calibration_samples: int = 200) -> str:
+    """
+    Exports a Keras model to TensorFlow Lite.
+
+    Args:
+        model (tf.keras.Model): The model to export.
+        output_path (str): Where to write the .tflite file.
+        quantization (str, optional): None for float32, 'dynamic' for dynamic-range (int8
+            weights), or 'int8' for int8 weights and activations calibrated on sample images.
+        calibration_dir (str, optional): Folder of sample images, required for 'int8'.
+        calibration_samples (int): Maximum number of calibration images.
+
+    Returns:
+        str: The output path.
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantization in ('dynamic', 'int8'):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'int8':
+        if not calibration_dir:
+            raise ValueError("int8 quantization requires a calibration folder")
+        paths = list_images(calibration_dir)[:calibration_samples]
+
+        def representative_dataset():
+            for batch in iter_batches(paths, 1):
+                yield [batch]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    return output_path
+
+
+def export_onnx(model: "tf.keras.Model", output_path: str, quantization: Optional[str] = None,
+                calibration_dir: Optional[str] = None, calibration_samples: int = 200) -> str:
+    """
+    Exports a Keras model to ONNX with tf2onnx, optionally quantized with ONNX Runtime.
+
+    Args:
+        model (tf.keras.Model): The model to export.
+        output_path (str): Where to write the .onnx file.
+        quantization (str, optional): None, 'dynamic' or 'int8' (static, calibrated on sample images).
+        calibration_dir (str, optional): Folder of sample images, required for 'int8'.
+        calibration_samples (int): Maximum number of calibration images.
+
+    Returns:
+        str: The output path.
+    """
+    import tensorflow as tf
+    import tf2onnx
+
+    float_path = output_path if quantization is None else output_path + '.float.onnx'
+    spec = (tf.TensorSpec((None, 224, 224, 3), tf.float32, name="input"),)
+    # Convert the traced call rather than the model: tf2onnx's from_keras cannot map the output
+    # names of Keras 3 models.
+    tf2onnx.convert.from_function(tf.function(lambda images: model(images, training=False)),
+                                  input_signature=spec, output_path=float_path)
+    if quantization is None:
+        return output_path
+
+    from onnxruntime import quantization as ort_quantization
+    if quantization == 'dynamic':
+        ort_quantization.quantize_dynamic(float_path, output_path, weight_type=ort_quantization.QuantType.QInt8)
+    elif quantization == 'int8':
+        if not calibration_dir:
+            raise ValueError("int8 quantization requires a calibration folder")
+        paths = list_images(calibration_dir)[:calibration_samples]
+
+        class ImageFolderReader(ort_quantization.CalibrationDataReader):
+            def __init__(self) -> None:
+                self._batches = iter_batches(paths, 1)
+
+            def get_next(self) -> Optional[Dict[str, Any]]:
+                batch = next(self._batches, None)
+                return {"input": batch} if batch is not None else None
+
+        ort_quantization.quantize_static(float_path, output_path, ImageFolderReader(),
+                                         weight_type=ort_quantization.QuantType.QInt8)
+    else:
+        raise ValueError(f"Unsupported quantization: {quantization}")
+    os.remove(float_path)
+    return output_path
+
+
+def top1_agreement(reference: InferenceBackend, candidate: InferenceBackend, paths: Sequence[str],
+                   batch_size: int = 32) -> Dict[str, Any]:
+    """
+    Compares the top-1 class of two backends on a set of images.
+
+    Returns:
+        dict: The number of images, how many got the same top-1 class, the agreement ratio
+        and the largest absolute difference between the two outputs.
+    """
+    images = agreed = 0
+    max_difference = 0.0
+    for batch in iter_batches(paths, batch_size):
+        expected = reference.predict(batch)
+        actual = candidate.predict(batch)
+        agreed += int(np.sum(np.argmax(expected, axis=1) == np.argmax(actual, axis=1)))
+        max_difference = max(max_difference, float(np.max(np.abs(expected - actual))))
+        images += len(batch)
+    return {
+        "images": images,
+        "agreed": agreed,
+        "agreement": agreed / images if images else 0.0,
+        "max_abs_difference": max_difference,
+    }
@@ -1,14 +1,381 @@
 from flask import current_app
-import tensorflow as tf
+import numpy as np
+import logging
+import threading
+import time
+import os
+from concurrent.futures import Future
+from typing import Any, Dict, Mapping, Optional
+from src.services.batch_inference import MicroBatcher
+from src.services.inference_pool import InferencePool
+from src.models.inference_backends import InferenceBackend, load_backend
+from src.utils.stats import register_stats_provider
 
-def get_model() -> tf.keras.Model:
+logger = logging.getLogger(__name__)
+
+# Longest wait between attempts to reload a model file that failed to load.
+MAX_RELOAD_BACKOFF = 300.0
+
+
+def _path_mtime(path: str) -> float:
+    """
+    Returns the most recent modification time for a model path.
+
+    A SavedModel is a directory whose own mtime does not change when the files inside it
+    are replaced, so directories are walked and the newest file wins.
+    """
+    if not os.path.isdir(path):
+        return os.path.getmtime(path)
+
+    latest = os.path.getmtime(path)
+    for root, _, files in os.walk(path):
+        for name in files:
+            latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+    return latest
+
+
+class ModelRegistry:
+    """
+    Process-wide registry that keeps the model resident between requests.
+
+    The model is loaded once (at startup or lazily on first use) with the configured inference
+    backend and reused by every request. Concurrent first loads are serialized so only one
+    thread pays the load cost, and the file at the model path is polled so a new model can be
+    swapped in without restarting workers. If the new file fails to load, the resident model
+    keeps serving and the reload is retried with an exponential backoff.
+    """
+
+    def __init__(self) -> None:
+        self._load_lock = threading.Lock()
+        self._model: Optional[InferenceBackend] = None
+        self._path: Optional[str] = None
+        self._backend = 'auto'
+        self._num_threads: Optional[int] = None
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._retry_at = 0.0
+        self._reload_failures = 0
+        self._loaded_at: Optional[float] = None
+        self._load_seconds: Optional[float] = None
+        self._weights_bytes = 0
+        self._load_count = 0
+
+    def configure(self, backend: str = 'auto', num_threads: Optional[int] = None) -> None:
+        """
+        Selects the inference backend used for the next load.
+
+        Args:
+            backend (str): 'keras', 'tflite', 'onnx', or 'auto' to pick one from the file extension.
+            num_threads (int, optional): Number of CPU threads for the TFLite and ONNX runtimes.
+        """
+        self._backend = backend
+        self._num_threads = num_threads
+
+    def load(self, path: str) -> InferenceBackend:
+        """
+        Loads the model at the given path and makes it the active model.
+
+        The previous model keeps serving until the new one is fully built, then the reference
+        is swapped so requests never see a half-loaded model.
+
+        Args:
+            path (str): Path to the saved Keras, TFLite or ONNX model.
+
+        Returns:
+            InferenceBackend: The newly loaded model.
+        """
+        with self._load_lock:
+            return self._load_locked(path)
+
+    def _load_locked(self, path: str) -> InferenceBackend:
+        mtime = _path_mtime(path)
+        start = time.perf_counter()
+        model = load_backend(path, self._backend, self._num_threads)
+        load_seconds = time.perf_counter() - start
+
+        self._weights_bytes = model.memory_bytes
+        self._model = model
+        self._path = path
+        self._mtime = mtime
+        self._last_check = time.monotonic()
+        self._loaded_at = time.time()
+        self._load_seconds = load_seconds
+        self._load_count += 1
+        self._reload_failures = 0
+        self._retry_at = 0.0
+        return model
+
+    def get(self, path: str, reload_interval: float = 0) -> InferenceBackend:
+        """
+        Returns the resident model, loading it on first use.
+
+        Args:
+            path (str): Path to the saved Keras, TFLite or ONNX model.
+            reload_interval (float): Minimum number of seconds between checks of the model
+                file for changes. A value of 0 or less disables hot-reload.
+
+        Returns:
+            InferenceBackend: The active model.
+        """
+        model = self._model
+        if model is None or path != self._path:
+            with self._load_lock:
+                if self._model is None or path != self._path:
+                    return self._load_locked(path)
+                return self._model
+
+        if reload_interval > 0 and time.monotonic() - self._last_check >= reload_interval:
+            self._reload_if_changed(path, reload_interval)
+
+        return self._model
+
+    def _reload_if_changed(self, path: str, reload_interval: float) -> None:
+        # Only one thread polls the file; the others keep using the current model.
+        if not self._load_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            self._last_check = now
+            if now < self._retry_at:
+                return
+            try:
+                mtime = _path_mtime(path)
+            except OSError:
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                self._load_locked(path)
+            except Exception:
+                # A half-written or broken file must not fail requests: keep the resident model.
+                self._reload_failures += 1
+                backoff = min(reload_interval * 2 ** self._reload_failures, MAX_RELOAD_BACKOFF)
+                self._retry_at = now + backoff
+                logger.exception("Could not reload the model from %s (attempt %d), keeping the resident "
+                                 "model and retrying in %.0fs", path, self._reload_failures, backoff)
+        finally:
+            self._load_lock.release()
+
+    @property
+    def version(self) -> Optional[str]:
+        """
+        Identifies the active model by its path and modification time.
+        """
+        if self._model is None:
+            return None
+        return f"{self._path}@{self._mtime}"
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns load time and memory footprint information for the active model.
+        """
+        return {
+            "loaded": self._model is not None,
+            "backend": self._model.name if self._model is not None else None,
+            "path": self._path,
+            "version": self.version,
+            "loaded_at": self._loaded_at,
+            "load_seconds": self._load_seconds,
+            "load_count": self._load_count,
+            "reload_failures": self._reload_failures,
+            "weights_bytes": self._weights_bytes,
+        }
+
+
+model_registry = ModelRegistry()
+
+
+def get_model() -> InferenceBackend:
     """
-    Load the machine learning model from the path specified in the Flask app's config.
+    Return the machine learning model from the path specified in the Flask app's config.
+
+    The model is kept resident in the process-wide registry, so it is only read from disk on
+    first use or when the file at MODEL_PATH changes.
 
     Returns:
-        tf.keras.Model: The TensorFlow Keras model that was loaded from the specified path.
+        InferenceBackend: The model loaded from the specified path with the configured backend.
     """
     config = current_app.config
-    model = tf.keras.models.load_model(config['MODEL_PATH'])
+    model = model_registry.get(config['MODEL_PATH'], config.get('MODEL_RELOAD_INTERVAL', 0))
 
     return model
+
+
+_batcher: Optional[MicroBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher(config: Optional[Mapping[str, Any]] = None) -> MicroBatcher:
+    """
+    Return the process-wide micro-batcher that runs forward passes on the resident model.
+
+    The batcher's scheduler thread runs outside the Flask app context, so the model path and
+    batching limits are read from the config once, when the batcher is created.
+
+    Args:
+        config (Mapping, optional): Settings to use instead of the Flask app's config, for
+            callers running outside a Flask app context.
+
+    Returns:
+        MicroBatcher: The micro-batcher serving this process.
+    """
+    global _batcher
+    if _batcher is None:
+        config = config if config is not None else current_app.config
+        with _batcher_lock:
+            if _batcher is None:
+                model_path = config['MODEL_PATH']
+                reload_interval = config.get('MODEL_RELOAD_INTERVAL', 0)
+
+                def predict_fn(images: np.ndarray) -> np.ndarray:
+                    return model_registry.get(model_path, reload_interval).predict(images)
+
+                _batcher = MicroBatcher(
+                    predict_fn,
+                    max_batch_size=config.get('INFERENCE_MAX_BATCH_SIZE', 16),
+                    max_wait_ms=config.get('INFERENCE_MAX_WAIT_MS', 5)
+                )
+    return _batcher
+
+
+def batcher_stats() -> Optional[Dict[str, Any]]:
+    """
+    Return the micro-batcher metrics, or None if no batch has been requested yet.
+    """
+    return _batcher.stats() if _batcher is not None else None
+
+
+_inference_pool: Optional[InferencePool] = None
+_inference_pool_lock = threading.Lock()
+
+
+def get_inference_pool(config: Optional[Mapping[str, Any]] = None) -> Optional[InferencePool]:
+    """
+    Return the process-wide inference worker pool, or None if INFERENCE_POOL_WORKERS is 0.
+
+    With the pool enabled, the model is only loaded by the worker processes, so this process
+    never imports TensorFlow. Every web worker would start a pool of its own, each with its own
+    model copies, so the pool is only started when WEB_CONCURRENCY is 1; scale out with more
+    INFERENCE_POOL_WORKERS instead.
+
+    Args:
+        config (Mapping, optional): Settings to use instead of the Flask app's config, for
+            callers running outside a Flask app context.
+
+    Returns:
+        InferencePool: The pool serving this process, started on first use.
+
+    Raises:
+        ValueError: If the pool is enabled with more than one web worker.
+    """
+    global _inference_pool
+    config = config if config is not None else current_app.config
+    if config.get('INFERENCE_POOL_WORKERS', 0) <= 0:
+        return None
+    if config.get('WEB_CONCURRENCY', 1) > 1:
+        raise ValueError(
+            f"INFERENCE_POOL_WORKERS needs a single web worker, but WEB_CONCURRENCY is {config['WEB_CONCURRENCY']}: "
+            f"every web worker would load {config['INFERENCE_POOL_WORKERS']} model copies of its own"
+        )
+    if _inference_pool is None:
+        with _inference_pool_lock:
+            if _inference_pool is None:
+                _inference_pool = InferencePool(
+                    config['MODEL_PATH'],
+                    workers=config['INFERENCE_POOL_WORKERS'],
+                    backend=config.get('INFERENCE_BACKEND', 'auto'),
+                    intra_op_threads=config.get('INFERENCE_POOL_INTRA_OP_THREADS', 1),
+                    inter_op_threads=config.get('INFERENCE_POOL_INTER_OP_THREADS', 1),
+                    pin_cpus=config.get('INFERENCE_POOL_PIN_CPUS', False),
+                    slots=config.get('INFERENCE_POOL_SLOTS') or None,
+                    slot_images=config.get('INFERENCE_MAX_BATCH_SIZE', 16),
+                    reload_interval=config.get('MODEL_RELOAD_INTERVAL', 0)
+                )
+    return _inference_pool
+
+
+def inference_pool_stats() -> Optional[Dict[str, Any]]:
+    """
+    Return the per-worker utilization of the inference pool, or None if it was not started.
+    """
+    return _inference_pool.stats() if _inference_pool is not None else None
+
+
+def shutdown_inference_pool() -> None:
+    """
+    Stop the inference workers, if the pool was started.
+    """
+    if _inference_pool is not None:
+        _inference_pool.close()
+
+
+def model_version() -> Optional[str]:
+    """
+    Return the version of the model serving predictions, loading it if needed.
+    """
+    pool = get_inference_pool()
+    if pool is not None:
+        pool.wait_ready(current_app.config.get('INFERENCE_POOL_START_TIMEOUT', 120))
+        return pool.version
+    get_model()
+    return model_registry.version
+
+
+def submit_images(images: np.ndarray, config: Optional[Mapping[str, Any]] = None) -> Future:
+    """
+    Queue preprocessed images on the inference pool or, with INFERENCE_BATCHING enabled, on the
+    micro-batcher. Failing both, the model is run in the calling thread, like predict_images does,
+    and the returned future is already resolved.
+
+    Returns:
+        Future: Resolves to the (N, classes) model output.
+
+    Raises:
+        InferenceError: If no pool slot is free within INFERENCE_TIMEOUT.
+    """
+    config = config if config is not None else current_app.config
+    pool = get_inference_pool(config)
+    if pool is not None:
+        return pool.submit(images, config.get('INFERENCE_TIMEOUT'))
+    if config.get('INFERENCE_BATCHING', False):
+        return get_batcher(config).submit(images)
+
+    future: Future = Future()
+    try:
+        model = model_registry.get(config['MODEL_PATH'], config.get('MODEL_RELOAD_INTERVAL', 0))
+        future.set_result(model.predict(images))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def predict_images(images: np.ndarray) -> np.ndarray:
+    """
+    Run the model on one or more preprocessed images.
+
+    With INFERENCE_POOL_WORKERS set, the images are run by the inference worker pool. Otherwise,
+    with INFERENCE_BATCHING enabled, they are queued on the micro-batcher and share a forward
+    pass with concurrent requests; failing both, the model is called directly.
+
+    Args:
+        images (np.ndarray): A (N, 224, 224, 3) array of preprocessed images.
+
+    Returns:
+        np.ndarray: The (N, classes) model output.
+
+    Raises:
+        InferenceError: If the pool has no free slot or no live worker within INFERENCE_TIMEOUT.
+        concurrent.futures.TimeoutError: If the predictions do not arrive within INFERENCE_TIMEOUT.
+    """
+    timeout = current_app.config.get('INFERENCE_TIMEOUT')
+    pool = get_inference_pool()
+    if pool is not None:
+        return pool.predict(images, timeout)
+    if current_app.config.get('INFERENCE_BATCHING', False):
+        return get_batcher().predict(images, timeout)
+    return get_model().predict(images)
+
+
+register_stats_provider('model', model_registry.stats)
+register_stats_provider('batching', batcher_stats)
+register_stats_provider('inference_pool', inference_pool_stats)
@@ -1,80 +1,152 @@
+import time
+from datetime import date, datetime
 from src.models.entities.user import User
-from src.database.database_connection import DatabaseConnection
+from src.database.database_connection import DatabaseConnection, is_unique_violation
+from src.database.schema import MigrationProbe
+from src.services.entity_cache import get_entity_cache
+from src.services.password_hasher import HasherBusy, get_password_hasher
+from typing import Optional, Tuple
+
+PROFILE_COLUMNS = "userid, email, firstname, lastname, birthdate, country"
+DATE_TYPES = {"date": date, "datetime": datetime}
+# The migration that creates the unique users.email index register relies on.
+UNIQUE_EMAIL_MIGRATION = 1
 
 class UserModel:
     """
     This class provides methods to interact with the users in the database.
     It includes functionalities for user login, registration, retrieval by ID, 
     and updating user information.
+
+    Profiles are read through the 'profiles' entity cache. Writes replace or drop the cached
+    profile, and each cached profile records when it was last known to change.
     """
 
+    # Whether the unique email index exists; register falls back to a duplicate check until it does.
+    _unique_email_index = MigrationProbe(UNIQUE_EMAIL_MIGRATION)
+
+    @staticmethod
+    def _profile_entry(row: tuple, modified_at: float) -> dict:
+        # The shared cache tiers store JSON, so a driver's date is cached as an ISO string
+        # together with its type, and restored by _profile_user.
+        birthdate = row[4]
+        birthdate_type = type(birthdate).__name__ if isinstance(birthdate, date) else None
+        if birthdate_type is not None:
+            birthdate = birthdate.isoformat()
+        return {
+            "fields": vars(User(row[0], row[1], None, row[2], row[3], birthdate, row[5])),
+            "birthdate_type": birthdate_type,
+            "modified_at": modified_at
+        }
+
+    @staticmethod
+    def _profile_user(entry: dict) -> User:
+        fields = dict(entry["fields"])
+        if entry.get("birthdate_type"):
+            fields["birthdate"] = DATE_TYPES[entry["birthdate_type"]].fromisoformat(fields["birthdate"])
+        return User(**fields)
+
     @classmethod
     def login(cls, user: User) -> User | None:
         try:
-            connection = DatabaseConnection.get_connection()
-            print("Connection successfully")
-
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT userid, email, upassword, firstname, lastname, birthdate, country FROM users WHERE email = ?", (user.email,))
+            with DatabaseConnection.connection() as connection, connection.cursor() as cursor:
+                # Only the columns carried by the email index, so the lookup never touches the table
+                cursor.execute("SELECT userid, upassword FROM users WHERE email = ?", (user.email,))
                 row = cursor.fetchone()
-                if row is not None:
-                    hashed_password = row[2]
-                    if User.check_password(hashed_password, user.upassword):
-                        user = User(row[0], row[1], hashed_password, row[3], row[4], row[5], row[6])
-                        return user
+            # The hash runs with the connection back in the pool.
+            hasher = get_password_hasher()
+            if not hasher.verify(row[1] if row is not None else None, user.upassword):
                 return None
 
+            hashed_password = row[1]
+            if hasher.needs_rehash(hashed_password):
+                hashed_password = cls._rehash_password(row[0], hashed_password, user.upassword)
+            return User(row[0], user.email, hashed_password)
+
+        except HasherBusy:
+            raise
         except Exception as ex:
             raise Exception(ex)
 
+    @classmethod
+    def _rehash_password(cls, userid: str, old_hash: str, password: str) -> str:
+        """
+        Replaces a hash made with outdated parameters, after a successful login proved the password.
+
+        The update only applies if the stored hash is still the one that was verified, so a
+        concurrent password change is never overwritten.
+        """
+        hasher = get_password_hasher()
+        new_hash = hasher.hash(password)
+        with DatabaseConnection.connection() as connection, connection.cursor() as cursor:
+            cursor.execute("UPDATE users SET upassword = ? WHERE userid = ? AND upassword = ?",
+                           (new_hash, userid, old_hash))
+            connection.commit()
+        hasher.count_rehash()
+        return new_hash
+
     @classmethod
     def get_by_id(cls, userid: str) -> User | None:
-        try:
-            connection = DatabaseConnection.get_connection()
-            print("Connection successfully")
+        return cls.get_profile(userid)[0]
 
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT userid, email, firstname, lastname, birthdate, country FROM users WHERE userid = ?", (userid,))
+    @classmethod
+    def get_profile(cls, userid: str) -> Tuple[Optional[User], Optional[float]]:
+        """
+        Returns a user (without password) and the time its profile was last known to change.
+
+        A profile loaded from the database is stamped with the load time, which is never
+        earlier than its last change.
+        """
+        def load() -> Optional[dict]:
+            with DatabaseConnection.connection() as connection, connection.cursor() as cursor:
+                cursor.execute(f"SELECT {PROFILE_COLUMNS} FROM users WHERE userid = ?", (userid,))
                 row = cursor.fetchone()
                 if row is not None:
-                    logged_user = User(row[0], row[1], None, row[2], row[3], row[4], row[5])
-                    return logged_user
+                    return cls._profile_entry(row, time.time())
                 return None
 
+        try:
+            cache = get_entity_cache('profiles')
+            entry = cache.get(f"user:{userid}", load) if cache is not None else load()
+            if entry is None:
+                return None, None
+            return cls._profile_user(entry), entry["modified_at"]
+
         except Exception as ex:
             raise Exception(ex)
 
     @classmethod
     def register(cls, user: User) -> bool:
         try:
-            connection = DatabaseConnection.get_connection()
-            print("Connection successfully")
+            # Hash before taking a connection, so it is not held while the hash runs
+            hashed_password = get_password_hasher().hash(user.upassword)
 
-            # Check if email is already registered
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT * FROM users WHERE email = ?", (user.email,))
-                row = cursor.fetchone()
-                if row is not None:
-                    raise Exception("Email already registered")
-
-                # If not, insert the new user
-                hashed_password = User.generate_password(user.upassword)
-                cursor.execute(
-                    "INSERT INTO users (userid, email, upassword, firstname, lastname, birthdate, country) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (user.userid, user.email, hashed_password, user.firstname, user.lastname, user.birthdate, user.country)
-                )
+            # A single insert: the unique email index (src/database/schema.py) rejects duplicates atomically
+            with DatabaseConnection.connection() as connection, connection.cursor() as cursor:
+                if not cls._unique_email_index.applied(connection, DatabaseConnection.get_engine()):
+                    cursor.execute("SELECT 1 FROM users WHERE email = ?", (user.email,))
+                    if cursor.fetchone() is not None:
+                        raise Exception("Email already registered")
+                try:
+                    cursor.execute(
+                        "INSERT INTO users (userid, email, upassword, firstname, lastname, birthdate, country) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (user.userid, user.email, hashed_password, user.firstname, user.lastname, user.birthdate, user.country)
+                    )
+                except Exception as ex:
+                    if is_unique_violation(ex):
+                        raise Exception("Email already registered")
+                    raise
                 connection.commit()
                 return True
+        except HasherBusy:
+            raise
         except Exception as ex:
             raise Exception(str(ex))
 
     @classmethod
     def update_user(cls, user: User) -> bool:
         try:
-            connection = DatabaseConnection.get_connection()
-            print("Connection successfully")
-
-            with connection.cursor() as cursor:
+            with DatabaseConnection.connection() as connection, connection.cursor() as cursor:
                 cursor.execute("""
                     UPDATE users 
                     SET firstname = ?, lastname = ?, birthdate = ?, country = ?
@@ -82,6 +154,48 @@ class UserModel:
                 """, (user.firstname, user.lastname, user.birthdate, user.country, user.userid))
                 
                 connection.commit()
-                return True
+            cache = get_entity_cache('profiles')
+            if cache is not None:
+                cache.invalidate(f"user:{user.userid}")
+            return True
+        except Exception as ex:
+            raise Exception(ex)
+
+    @classmethod
+    def update_profile(cls, userid: str, firstname: Optional[str] = None, lastname: Optional[str] = None,
+                       birthdate: Optional[str] = None, country: Optional[str] = None) -> User | None:
+        """
+        Updates the given profile fields in a single round trip and returns the updated user.
+
+        Fields left as None keep their current value. The updated row comes back from the
+        UPDATE itself (RETURNING on PostgreSQL, OUTPUT inserted on SQL Server) and replaces
+        the cached profile, so no SELECT is needed before or after the write.
+
+        Returns:
+            User: The updated user, or None if there is no user with this id.
+        """
+        assignments = """
+            SET firstname = COALESCE(?, firstname), lastname = COALESCE(?, lastname),
+                birthdate = COALESCE(?, birthdate), country = COALESCE(?, country)
+        """
+        if DatabaseConnection.get_engine() == "sqlserver":
+            output = ", ".join(f"inserted.{column}" for column in PROFILE_COLUMNS.split(", "))
+            query = f"UPDATE users {assignments} OUTPUT {output} WHERE userid = ?"
+        else:
+            query = f"UPDATE users {assignments} WHERE userid = ? RETURNING {PROFILE_COLUMNS}"
+
+        try:
+            with DatabaseConnection.connection() as connection, connection.cursor() as cursor:
+                cursor.execute(query, (firstname, lastname, birthdate, country, userid))
+                row = cursor.fetchone()
+                connection.commit()
+            if row is None:
+                return None
+
+            entry = cls._profile_entry(row, time.time())
+            cache = get_entity_cache('profiles')
+            if cache is not None:
+                cache.put(f"user:{userid}", entry)
+            return cls._profile_user(entry)
         except Exception as ex:
             raise Exception(ex)
\ No newline at end of file
@@ -0,0 +1,196 @@
+import asyncio
+import base64
+import io
+import json
+import jwt
+import numpy as np
+from PIL import Image
+from azure.storage.blob import ContentSettings
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from typing import Any, Dict
+from src.database.schema import MigrationProbe
+from src.models.dog_model import THUMBNAILS_MIGRATION
+from src.models.prediction_models import submit_images
+from src.services.inference_pool import InferenceError
+from src.services.azure_storage_connection import AzureBlobStorage
+from src.services.image_derivatives import recorded_derivative_urls
+from src.services.preprocess_model import preprocess_image
+from src.services.postprocess_model import format_predictions, load_temperature
+from src.utils.label_mapping import label_mapping_cache
+
+
+def get_identity(request: Request) -> str:
+    """
+    Verifies the Bearer token of the request, as issued by the Flask app's /login.
+
+    Like @jwt_required(), only access tokens are accepted; refresh tokens and tokens without
+    an identity are rejected with a 401.
+
+    Returns:
+        str: The userid stored as the token's identity.
+    """
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        raise HTTPException(401, "Missing Authorization Header")
+    try:
+        claims = jwt.decode(header[len('Bearer '):], request.app.state.config['JWT_SECRET_KEY'], algorithms=['HS256'],
+                            options={'require': ['sub']})
+    except jwt.PyJWTError as e:
+        raise HTTPException(401, str(e))
+    if claims.get('type') != 'access':
+        raise HTTPException(401, "Only access tokens are allowed")
+    return claims['sub']
+
+
+def decode_and_preprocess(data: bytes) -> np.ndarray:
+    img = Image.open(io.BytesIO(data))
+    return preprocess_image(img)
+
+
+async def predict_local(request: Request, data: bytes) -> Dict[str, Any]:
+    config = request.app.state.config
+    labels = await run_in_threadpool(
+        label_mapping_cache.get_labels,
+        config['LABEL_MAPPING_PATH'],
+        config.get('LABEL_MAPPING_TTL', 300),
+        config['AZURE_STORAGE_CONNECTION_STRING']
+    )
+
+    img_array = await run_in_threadpool(decode_and_preprocess, data)
+    try:
+        # Waiting for a free pool slot blocks, so it is done off the event loop.
+        future = await run_in_threadpool(submit_images, img_array, config)
+        predictions = await asyncio.wait_for(asyncio.wrap_future(future), config.get('INFERENCE_TIMEOUT'))
+    except (InferenceError, asyncio.TimeoutError) as e:
+        raise HTTPException(503, f"Prediction is unavailable: {str(e) or 'timed out'}")
+
+    return format_predictions(
+        predictions, labels, config.get('PREDICT_TOP_K', 3), load_temperature(config.get('CALIBRATION_PATH'))
+    )[0]
+
+
+async def predict_azure(request: Request, data: bytes) -> Dict[str, Any]:
+    config = request.app.state.config
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {config['AZURE_ML_TOKEN']}"
+    }
+    json_payload = {
+        "data": base64.b64encode(data).decode('utf-8')
+    }
+
+    response = await request.app.state.http.post(config['AZURE_ML_URL'], json=json_payload, headers=headers)
+    prediction = json.loads(response.json())
+
+    return {
+        'breed': prediction.get('breed'),
+        'confidence': prediction.get('confidence'),
+        'top_k': [{'breed': prediction.get('breed'), 'confidence': prediction.get('confidence')}]
+    }
+
+
+async def upload_image(request: Request, data: bytes, predicted_label: str, content_type: str) -> None:
+    config = request.app.state.config
+    blob_name = AzureBlobStorage.image_blob_name(predicted_label, predicted_label, content_type)
+    blob_client = request.app.state.blob_service_client.get_blob_client(
+        container=config['CONTAINER_NAME'], blob=blob_name
+    )
+    await blob_client.upload_blob(data, overwrite=True, content_settings=ContentSettings(content_type=content_type))
+
+
+async def predict(request: Request) -> JSONResponse:
+    """
+    Async counterpart of the Flask '/predict' endpoint.
+    Predicts the breed of the dog based on the uploaded image file.
+    If the prediction confidence is greater than UPLOAD_CONFIDENCE_THRESHOLD, uploads the image to Blob Storage.
+    """
+    get_identity(request)
+
+    form = await request.form()
+    file = form.get('file')
+    if file is None:
+        return JSONResponse({'error': 'No file uploaded'}, status_code=400)
+    data = await file.read()
+
+    config = request.app.state.config
+    if config['DEBUG']:
+        prediction = await predict_local(request, data)
+    else:
+        prediction = await predict_azure(request, data)
+
+    if prediction['confidence'] > config.get('UPLOAD_CONFIDENCE_THRESHOLD', 95):
+        try:
+            await upload_image(request, data, prediction['breed'], file.content_type)
+        except Exception as e:
+            return JSONResponse({
+                **prediction,
+                'message': f"Prediction succeeded, but failed to upload image: {str(e)}"
+            }, status_code=500)
+
+    return JSONResponse(prediction)
+
+
+_thumbnails_column = MigrationProbe(THUMBNAILS_MIGRATION)
+
+
+async def get_dog(request: Request) -> JSONResponse:
+    """
+    Async counterpart of the Flask '/get_dog' endpoint.
+    Retrieves all dogs associated with the current user, with the URLs of their stored thumbnails.
+    """
+    userid = get_identity(request)
+    try:
+        db = request.app.state.db
+        has_thumbnails = _thumbnails_column.cached()
+        if has_thumbnails is None:
+            has_thumbnails = _thumbnails_column.record(await db.migration_applied(THUMBNAILS_MIGRATION))
+        thumbnails = "thumbnails" if has_thumbnails else "NULL AS thumbnails"
+        rows = await db.fetchall(
+            f"SELECT dogid, dogname, breed, age, imageurl, {thumbnails} FROM dogs WHERE userid = ?", (userid,)
+        )
+        dogs_data = [
+            {"id": row[0], "name": row[1], "breed": row[2], "age": row[3], "image_url": row[4],
+             "thumbnails": recorded_derivative_urls(row[4], row[5])}
+            for row in rows
+        ]
+        return JSONResponse({"success": True, "data": dogs_data})
+    except Exception as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=500)
+
+
+async def get_profile(request: Request) -> JSONResponse:
+    """
+    Async counterpart of the Flask '/profile' endpoint.
+    Retrieves the current user's profile data.
+    """
+    userid = get_identity(request)
+    try:
+        row = await request.app.state.db.fetchone(
+            "SELECT userid, email, firstname, lastname, birthdate, country FROM users WHERE userid = ?", (userid,)
+        )
+        if row is None:
+            return JSONResponse({"success": True, "data": None})
+
+        user_data = {
+            "user_id": row[0],
+            "email": row[1],
+            "first_name": row[2],
+            "last_name": row[3],
+            "birth_date": str(row[4]) if row[4] is not None else None,
+            "country": row[5]
+        }
+        return JSONResponse({"success": True, "data": user_data})
+    except Exception as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=500)
+
+
+routes = [
+    Route('/predict', predict, methods=['POST']),
+    Route('/get_dog', get_dog, methods=['GET']),
+    Route('/profile', get_profile, methods=['GET']),
+]
@@ -1,12 +1,32 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from src.models.entities.user import User
 from src.models.user_model import UserModel
+from src.services.password_hasher import HasherBusy
+from src.utils.rate_limit import RateLimiter, get_rate_limiter
+import math
 import uuid
 from datetime import timedelta
 
 auth = Blueprint('auth', __name__)
 
+
+def _limiter(name: str, setting: str) -> RateLimiter:
+    config = current_app.config
+    return get_rate_limiter(name, config.get(setting, 0), config.get('LOGIN_RATE_LIMIT_WINDOW', 60))
+
+
+def _too_many_requests(retry_after: float):
+    response = jsonify({"success": False, "message": "Too many attempts, try again later"})
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, 429
+
+
+def _hasher_busy():
+    response = jsonify({"success": False, "message": "Server busy, try again later"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth.route('/login', methods=['POST'])
 def login():
     """
@@ -14,12 +34,24 @@ def login():
 
     If the credentials are valid, a JWT access token is generated with a 24-hour expiration.
 
+    Attempts are limited per client IP (LOGIN_RATE_LIMIT_IP) and failures per email
+    (LOGIN_RATE_LIMIT_EMAIL) before any password is hashed, so a login storm cannot
+    spend the CPU the predictions need.
+
     Returns:
         jsonify: A JSON response with the success status and the generated JWT token on successful login, or an error message on failure.
     """
     try:
         email: str = request.form['email']
         upassword: str = request.form['password']
+
+        failures = _limiter('login_email_failures', 'LOGIN_RATE_LIMIT_EMAIL')
+        retry_after = failures.retry_after(email.lower())
+        if not retry_after:
+            retry_after = _limiter('login_ip', 'LOGIN_RATE_LIMIT_IP').acquire(request.remote_addr or '')
+        if retry_after:
+            return _too_many_requests(retry_after)
+
         user: User = UserModel.login(User(0, email, upassword))
         
         if user and user.upassword:
@@ -30,7 +62,10 @@ def login():
                 "message": "Login successful"
             }), 200
         else:
+            failures.hit(email.lower())
             return jsonify({"success": False, "message": "Invalid credentials"}), 401
+    except HasherBusy:
+        return _hasher_busy()
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
@@ -55,10 +90,16 @@ def register():
         userid: str = str(uuid.uuid4())
         
         new_user: User = User(userid, email, upassword, firstname, lastname, birthdate, country)
-        
+
+        retry_after = _limiter('register_ip', 'LOGIN_RATE_LIMIT_IP').acquire(request.remote_addr or '')
+        if retry_after:
+            return _too_many_requests(retry_after)
+
         try:
             UserModel.register(new_user)
             return jsonify({"success": True, "message": "User registered successfully"}), 201
+        except HasherBusy:
+            return _hasher_busy()
         except Exception as e:
             if 'Email already registered' in str(e):
                 return jsonify({"success": False, "message": "Email already registered"}), 400
@@ -2,30 +2,51 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import uuid
 from src.models.dog_model import DogModel
-from src.services.azure_storage_connection import AzureBlobStorage
+from src.services.blob_storage import get_blob_storage
+from src.services.direct_uploads import ALLOWED_CONTENT_TYPES, DirectUploadError, dog_image_blob_name, get_direct_uploads
+from src.services.image_derivatives import get_derivative_pipeline, recorded_derivative_urls
 from src.models.entities.dogs import Dog
 
 dog_bp = Blueprint('dog_bp', __name__)
 
-blob_storage_instance = None
 
-def get_blob_storage():
+def store_dog_image(image, breed):
     """
-    It is a Singleton pattern.
-    Retrieves the Azure Blob Storage instance. If it hasn't been created yet, it initializes it with the connection string and container name 
-    from the app's configuration.
+    Stores an image uploaded through the API as '<breed>/<uuid>_<filename>' in the process-wide
+    blob storage. Queue its thumbnails with queue_thumbnails once it is recorded on the dog.
+
+    Args:
+        image (FileStorage): The uploaded image.
+        breed (str): The dog's breed, used as the folder.
 
     Returns:
-        AzureBlobStorage: The singleton instance of the AzureBlobStorage class for handling file uploads.
+        tuple: The URL of the stored image, its blob name and its content.
+
+    Raises:
+        DirectUploadError: If the file is not a supported image type.
     """
-    config = current_app.config
-    AZURE_STORAGE_CONNECTION_STRING = config('AZURE_STORAGE_CONNECTION_STRING')
-    CONTAINER_NAME = config('CONTAINER_NAME')
+    if image.mimetype not in ALLOWED_CONTENT_TYPES:
+        raise DirectUploadError(f"Unsupported file type: {image.mimetype}")
+    data = image.read()
+    blob_name = dog_image_blob_name(breed, image.filename or 'image')
+    imageurl = get_blob_storage().upload_blob(current_app.config['CONTAINER_NAME'], blob_name, data, image.mimetype)
+    return imageurl, blob_name, data
+
+def queue_thumbnails(dog, blob_name, data=None):
+    """
+    Queues the thumbnails of the image just recorded on a dog. Once all of them are stored,
+    they are recorded on the dog, if it still has that image, so /get_dog only lists
+    thumbnails that exist.
+    """
+    app = current_app._get_current_object()
+    pipeline = get_derivative_pipeline()
+    dogid, userid, imageurl, record = dog.dogid, dog.userid, dog.imageurl, pipeline.record()
+
+    def on_rendered():
+        with app.app_context():
+            DogModel.set_thumbnails(dogid, userid, imageurl, record)
 
-    global blob_storage_instance
-    if blob_storage_instance is None:
-        blob_storage_instance = AzureBlobStorage(AZURE_STORAGE_CONNECTION_STRING)
-    return blob_storage_instance
+    pipeline.submit(blob_name, data, on_rendered)
 
 @dog_bp.route('/upload_dog', methods=['POST'])
 @jwt_required()
@@ -39,7 +60,8 @@ def upload_dog():
     """
     try:
         userid = get_jwt_identity()
-        existing_dog = DogModel.get_dog_by_user(userid)
+        existing_dogs = DogModel.get_dogs_by_user_id(userid)
+        existing_dog = existing_dogs[0] if existing_dogs else None
         
         breed = request.form['breed']
         dogname = request.form['name']
@@ -52,21 +74,30 @@ def upload_dog():
             existing_dog.breed = breed
             existing_dog.age = age
             
+            stored = None
             if image:
-                existing_dog.imageurl = blob_storage_instance.upload_file(image, breed)
+                stored = store_dog_image(image, breed)
+                existing_dog.imageurl = stored[0]
             
             DogModel.update_dog(existing_dog)
+            if stored:
+                queue_thumbnails(existing_dog, stored[1], stored[2])
             return jsonify({"success": True, "message": "Dog updated successfully!"})
 
         else:
-            imageurl = ''
+            imageurl, stored = '', None
             if image:
-                imageurl = blob_storage_instance.upload_file(image, breed)
+                stored = store_dog_image(image, breed)
+                imageurl = stored[0]
             dogid = str(uuid.uuid4())
             dog = Dog(dogid, dogname, breed, age, userid, imageurl)
             DogModel.save_dog(dog)
+            if stored:
+                queue_thumbnails(dog, stored[1], stored[2])
             return jsonify({"success": True, "message": "Dog uploaded successfully!"})
 
+    except DirectUploadError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -115,6 +146,11 @@ def get_dog():
     """
     Retrieves all dogs associated with the current user. If no dogs are found, an empty list is returned.
 
+    The list is served from the dog cache and carries an ETag, so a client sending it back in
+    If-None-Match gets a 304 Not Modified while its dogs are unchanged. Each dog carries the
+    URLs of its image thumbnails, keyed by size and format, to use instead of the original;
+    the map is empty until they have all been stored.
+
     Returns:
         jsonify: A JSON response with the list of dogs or an empty list if no dogs are found.
     """
@@ -123,9 +159,6 @@ def get_dog():
         
         dogs = DogModel.get_dogs_by_user_id(userid)
         
-        if not dogs:
-            return jsonify({"success": True, "data": []}), 200
-
         dogs_data = []
         for dog in dogs:
             dogs_data.append({
@@ -133,13 +166,17 @@ def get_dog():
                 "name": dog.dogname,
                 "breed": dog.breed,
                 "age": dog.age,
-                "image_url": dog.imageurl
+                "image_url": dog.imageurl,
+                "thumbnails": recorded_derivative_urls(dog.imageurl, dog.thumbnails)
             })
         
-        return jsonify({
+        response = jsonify({
             "success": True,
             "data": dogs_data
-        }), 200
+        })
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.add_etag()
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -169,11 +206,84 @@ def upload_dog_image(dogid):
         if not image:
             return jsonify({"success": False, "message": "No image provided"}), 400
 
-        imageurl = blob_storage_instance.upload_file(image, dog.breed)
-
-        dog.imageurl = imageurl
+        dog.imageurl, blob_name, data = store_dog_image(image, dog.breed)
         DogModel.update_dog(dog)
+        queue_thumbnails(dog, blob_name, data)
 
         return jsonify({"success": True, "message": "Dog image updated successfully!"}), 200
+    except DirectUploadError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@dog_bp.route('/upload_dog_image_url/<dogid>', methods=['POST'])
+@jwt_required()
+def upload_dog_image_url(dogid):
+    """
+    Issues a short-lived URL the client uploads a dog's image to directly, so the image never
+    passes through the app servers. The dog must belong to the current user.
+
+    The client PUTs the image to the URL with the returned headers, then calls
+    /complete_dog_image/<dogid> with the returned upload token.
+
+    Args:
+        dogid (str): The ID of the dog whose image is being uploaded.
+
+    Returns:
+        jsonify: A JSON response with the upload URL, method, headers, blob name and upload token.
+    """
+    try:
+        userid = get_jwt_identity()
+
+        dog = DogModel.get_dog_by_id(dogid)
+        if dog is None:
+            return jsonify({"success": False, "message": "Dog not found"}), 404
+
+        if dog.userid != userid:
+            return jsonify({"success": False, "message": "Unauthorized access"}), 403
+
+        filename = request.form.get('filename', 'image')
+        content_type = request.form.get('content_type', '')
+        grant = get_direct_uploads().issue(dog, filename, content_type)
+        return jsonify({"success": True, "data": grant}), 200
+    except DirectUploadError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@dog_bp.route('/complete_dog_image/<dogid>', methods=['POST'])
+@jwt_required()
+def complete_dog_image(dogid):
+    """
+    Records the image a client uploaded through an upload URL as the dog's image.
+    The dog must belong to the current user.
+
+    Args:
+        dogid (str): The ID of the dog whose image was uploaded.
+
+    Returns:
+        jsonify: A JSON response with the recorded image URL, or an error message if the upload is not valid.
+    """
+    try:
+        userid = get_jwt_identity()
+
+        dog = DogModel.get_dog_by_id(dogid)
+        if dog is None:
+            return jsonify({"success": False, "message": "Dog not found"}), 404
+
+        if dog.userid != userid:
+            return jsonify({"success": False, "message": "Unauthorized access"}), 403
+
+        upload_token = request.form.get('upload_token')
+        if not upload_token:
+            return jsonify({"success": False, "message": "No upload token provided"}), 400
+
+        blob_name, dog.imageurl = get_direct_uploads().complete(dog, upload_token)
+        DogModel.update_dog(dog)
+        queue_thumbnails(dog, blob_name)
+
+        return jsonify({"success": True, "message": "Dog image updated successfully!", "image_url": dog.imageurl}), 200
+    except DirectUploadError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
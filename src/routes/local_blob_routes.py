@@ -0,0 +1,51 @@
+from flask import Blueprint, abort, current_app, jsonify, request, send_file
+from src.services.direct_uploads import get_direct_uploads
+from src.services.local_blob_storage import UploadTooLarge
+
+local_blob_bp = Blueprint('local_blob_bp', __name__)
+
+@local_blob_bp.route('/local_blobs/<container_name>/<path:blob_name>', methods=['PUT'])
+def put_blob(container_name, blob_name):
+    """
+    Stores an image PUT to a signed upload URL, like Blob Storage does for a SAS URL.
+
+    Only registered when BLOB_STORAGE_BACKEND is 'local'. The body is streamed to disk
+    in chunks and rejected beyond UPLOAD_MAX_BYTES. Like a create-only SAS, the URL cannot
+    replace a blob that was already stored.
+
+    Returns:
+        jsonify: 201 once the blob is stored, 403 for a missing, invalid or expired signature,
+            409 if the blob already exists.
+    """
+    storage = get_direct_uploads().storage
+    content_type = request.content_type or ''
+    if not storage.verify_upload(container_name, blob_name, request.args.get('se'), request.args.get('sig'),
+                                 content_type):
+        return jsonify({"success": False, "message": "Invalid or expired upload signature"}), 403
+
+    if storage.blob_properties(container_name, blob_name) is not None:
+        return jsonify({"success": False, "message": "Blob already exists"}), 409
+
+    request.max_content_length = current_app.config.get('UPLOAD_MAX_BYTES')
+    try:
+        size = storage.write(container_name, blob_name, request.stream, content_type,
+                             current_app.config.get('UPLOAD_MAX_BYTES'), overwrite=False)
+    except UploadTooLarge as e:
+        return jsonify({"success": False, "message": str(e)}), 413
+    except FileExistsError:
+        return jsonify({"success": False, "message": "Blob already exists"}), 409
+    return jsonify({"success": True, "size": size}), 201
+
+@local_blob_bp.route('/local_blobs/<container_name>/<path:blob_name>', methods=['GET'])
+def get_blob(container_name, blob_name):
+    """
+    Serves a stored blob, so image URLs recorded while working offline can be opened.
+    """
+    storage = get_direct_uploads().storage
+    try:
+        properties = storage.blob_properties(container_name, blob_name)
+    except ValueError:
+        abort(404)
+    if properties is None:
+        abort(404)
+    return send_file(storage.path(container_name, blob_name), mimetype=properties["content_type"])
@@ -1,59 +1,71 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from PIL import Image
-import io
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as InferenceTimeout
 import numpy as np
-import requests
-import base64
 import json
-from src.models.prediction_models import get_model
-from src.services.preprocess_model import preprocess_image
-from src.utils.label_mapping import get_label_mapping
-from src.services.azure_storage_connection import AzureBlobStorage
+import mimetypes
+import tarfile
+import zipfile
+from typing import Any, Dict, Iterator, List, Tuple
+from src.models.prediction_models import get_inference_pool, model_version, predict_images
+from src.services.inference_pool import InferenceError
+from src.services.preprocess_model import decode_image, get_batch_buffer, preprocess_image
+from src.services.postprocess_model import format_predictions, load_temperature
+from src.utils.label_mapping import get_labels
+from src.services.upload_queue import get_uploader
+from src.services.prediction_cache import PredictionCache, get_prediction_cache
+from src.services.scoring_client import get_scoring_client
+from src.utils.metrics import timed
+from src.utils.upload_spool import BufferReader, SpooledUpload
 
 predict_bp = Blueprint('predict', __name__)
 
-def predict_local(file):
-    model = get_model()
-    label_mapping = get_label_mapping()
-
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file uploaded'}), 400
-
-    img = Image.open(io.BytesIO(file.read()))
-    img_array = preprocess_image(img)
+def predict_local(upload: SpooledUpload) -> Dict[str, Any]:
+    config = current_app.config
+    with timed('labels'):
+        labels = get_labels()
 
-    predictions = model.predict(img_array)
-    predicted_class = np.argmax(predictions[0])
-    predicted_label = label_mapping[str(predicted_class)]
-    confidence = round((predictions[0][predicted_class]) * 100, 2)
+    with timed('decode'):
+        img = decode_image(Image.open(upload.open()))
+    pool = get_inference_pool()
+    if pool is not None:
+        # Preprocess straight into the shared memory the inference worker reads from.
+        timeout = config.get('INFERENCE_TIMEOUT')
+        with pool.slot(1, timeout) as slot:
+            with timed('preprocess'):
+                preprocess_image(img, slot.images)
+            with timed('inference'):
+                predictions = slot.predict(timeout)
+    else:
+        with timed('preprocess'):
+            img_array = preprocess_image(img, get_batch_buffer(1))
+        with timed('inference'):
+            predictions = predict_images(img_array)
 
-    return predicted_label, confidence
+    with timed('postprocess'):
+        return format_predictions(
+            predictions, labels, config.get('PREDICT_TOP_K', 3), load_temperature(config.get('CALIBRATION_PATH'))
+        )[0]
 
 
-def predict_azure(file, config):
-    url = config['AZURE_ML_URL']
-    aml_token = config['AZURE_ML_TOKEN']
+def predict_azure(upload: SpooledUpload, config: Any) -> Dict[str, Any]:
+    with timed('azure_scoring'):
+        predicted_label, confidence = get_scoring_client(config).score(upload.view)
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {aml_token}"
-    }
+    return azure_prediction(predicted_label, confidence)
 
-    img = file.read()
-    image_base64 = base64.b64encode(img).decode('utf-8')
 
-    json_payload = {
-        "data": image_base64
+def azure_prediction(predicted_label: str, confidence: float) -> Dict[str, Any]:
+    """
+    Shapes an Azure ML answer like a local prediction. The endpoint only returns its top class.
+    """
+    return {
+        'breed': predicted_label,
+        'confidence': confidence,
+        'top_k': [{'breed': predicted_label, 'confidence': confidence}]
     }
 
-    response = requests.post(url, json=json_payload, headers=headers)
-    prediction = json.loads(response.json())
-    predicted_label = prediction.get('breed')
-    confidence = prediction.get('confidence')
-
-    return predicted_label, confidence
-
 
 @predict_bp.route('/predict', methods=['POST'])
 @jwt_required()
@@ -61,50 +73,264 @@ def predict():
     """
     Handles POST requests to the '/predict' endpoint.
     Predicts the breed of the dog based on the uploaded image file.
-    If the prediction confidence is greater than 95%, uploads the image to Blob Storage.
+    The response includes the PREDICT_TOP_K most likely breeds. If the prediction confidence is
+    greater than UPLOAD_CONFIDENCE_THRESHOLD (95% by default), queues the image for upload to Blob Storage.
+
+    The image is spooled once and shared as a memoryview by decoding, hashing and the upload;
+    bodies larger than UPLOAD_MAX_BYTES are rejected with a 413 before they are read.
     """
     config = current_app.config
     userid = get_jwt_identity()
 
-    file = request.files['file']
+    request.max_content_length = config.get('UPLOAD_MAX_BYTES', 20 * 1024 * 1024)
+    with timed('multipart'):
+        files = request.files
+    if 'file' not in files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    upload = SpooledUpload.from_file(files['file'])
+
+    prediction_cache = get_prediction_cache()
+    cache_status = 'off'
+    if prediction_cache is not None:
+        if config['DEBUG']:
+            version = model_version()
+            temperature = load_temperature(config.get('CALIBRATION_PATH'))
+        else:
+            version = config.get('AZURE_ML_MODEL_VERSION') or config['AZURE_ML_URL']
+            temperature = 1.0
+        with timed('cache'):
+            cache_key = PredictionCache.make_key(upload.view, version, config.get('PREDICT_TOP_K', 3), temperature)
+            cached, cache_status = prediction_cache.get(cache_key)
+        if cached is not None:
+            # The image was already handled (and uploaded if confident) when it was first predicted.
+            response = jsonify(cached)
+            response.headers['X-Prediction-Cache'] = cache_status
+            return response
 
     if current_app.config['DEBUG']:
-        predicted_label, confidence = predict_local(file)
-        print("DEV")
+        try:
+            prediction = predict_local(upload)
+        except (InferenceError, InferenceTimeout) as e:
+            return jsonify({'error': f"Prediction is unavailable: {str(e) or 'timed out'}"}), 503
     else:
-        predicted_label, confidence = predict_azure(file, config)
-        print("PROD")
+        prediction = predict_azure(upload, config)
+    predicted_label, confidence = prediction['breed'], prediction['confidence']
+
+    if confidence > config.get('UPLOAD_CONFIDENCE_THRESHOLD', 95):
+        if not get_uploader().enqueue(upload.view, predicted_label, predicted_label, upload.content_type):
+            # Not cached, so the upload is tried again the next time this image is sent.
+            return jsonify({
+                **prediction,
+                'message': "Prediction succeeded, but failed to upload image: upload queue is full"
+            }), 500
+
+    if prediction_cache is not None:
+        prediction_cache.set(cache_key, prediction)
+
+    response = jsonify(prediction)
+    response.headers['X-Prediction-Cache'] = cache_status
+    if config['DEBUG']:
+        response.headers['X-Upload-Bytes-Copied'] = str(upload.bytes_copied)
+    return response
+
+
+def read_batch_images(max_images: int, max_image_bytes: int) -> List[Tuple[str, Any, str]]:
+    """
+    Collects the images of a batch request, either from multipart 'files' fields or
+    from a zip/tar 'archive' field.
+
+    The number of images and the size of every archive member are checked against the limits
+    before anything is extracted, and members are read with a bounded read, so a zip bomb or an
+    archive with thousands of entries is rejected without filling the worker's memory.
+
+    Returns:
+        list: (filename, image bytes or memoryview, content type) for each image, in request order.
+
+    Raises:
+        ValueError: If there are more than max_images images or one is larger than max_image_bytes.
+    """
+    files = request.files.getlist('files')
+    check_batch_count(len(files), max_images)
+    images = []
+    for file in files:
+        upload = SpooledUpload.from_file(file, max_image_bytes)
+        images.append((upload.filename, upload.view, upload.content_type))
+
+    archive = request.files.get('archive')
+    if archive:
+        if zipfile.is_zipfile(archive.stream):
+            archive.stream.seek(0)
+            with zipfile.ZipFile(archive.stream) as zf:
+                members = [info for info in zf.infolist() if not info.is_dir()]
+                check_batch_count(len(images) + len(members), max_images)
+                for info in members:
+                    check_member_size(info.filename, info.file_size, max_image_bytes)
+                for info in members:
+                    with zf.open(info) as member_file:
+                        data = read_member(info.filename, member_file, max_image_bytes)
+                    images.append((info.filename, data, mimetypes.guess_type(info.filename)[0]))
+        else:
+            archive.stream.seek(0)
+            with tarfile.open(fileobj=archive.stream, mode='r:*') as tf_archive:
+                # Only the headers are read here; tarfile skips over the member data.
+                members = []
+                for member in tf_archive:
+                    if member.isfile():
+                        members.append(member)
+                        check_batch_count(len(images) + len(members), max_images)
+                        check_member_size(member.name, member.size, max_image_bytes)
+                for member in members:
+                    data = read_member(member.name, tf_archive.extractfile(member), max_image_bytes)
+                    images.append((member.name, data, mimetypes.guess_type(member.name)[0]))
+
+    return images
+
+
+def check_batch_count(count: int, max_images: int) -> None:
+    if count > max_images:
+        raise ValueError(f"Too many images in batch: {count} (max {max_images})")
+
+
+def check_member_size(name: str, size: int, max_image_bytes: int) -> None:
+    if size > max_image_bytes:
+        raise ValueError(f"Image '{name}' is too large: {size} bytes (max {max_image_bytes})")
+
+
+def read_member(name: str, member_file: Any, max_image_bytes: int) -> bytes:
+    """
+    Reads an archive member, never more than one byte past the limit, so a member whose
+    data is larger than its header claims is still rejected.
+    """
+    data = member_file.read(max_image_bytes + 1)
+    check_member_size(name, len(data), max_image_bytes)
+    return data
 
 
-    if confidence > 95:
+def decode_and_preprocess(data: Any, out: np.ndarray) -> None:
+    """
+    Decodes image bytes (or a memoryview of them) and writes the preprocessed (1, 224, 224, 3)
+    model input into out.
+    """
+    with timed('decode'):
+        img = decode_image(Image.open(BufferReader(memoryview(data))))
+    with timed('preprocess'):
+        preprocess_image(img, out)
+
+
+def predict_chunk_local(chunk: List[Tuple[str, Any, str]], executor: ThreadPoolExecutor,
+                        labels: List[str], top_k: int, temperature: float = 1.0) -> List[Dict[str, Any]]:
+    """
+    Decodes and preprocesses a chunk of images in parallel, straight into one batch buffer,
+    and runs them through the model as one stacked batch.
+    """
+    batch = get_batch_buffer(len(chunk))
+    futures = [
+        executor.submit(decode_and_preprocess, data, batch[i:i + 1]) for i, (_, data, _) in enumerate(chunk)
+    ]
+
+    results: List[Dict[str, Any]] = [{} for _ in chunk]
+    positions = []
+    for position, future in enumerate(futures):
+        try:
+            future.result()
+            positions.append(position)
+        except Exception as e:
+            results[position] = {'error': f"Could not decode image: {str(e)}"}
+
+    if positions:
+        inputs = batch if len(positions) == len(chunk) else batch[positions]
         try:
+            with timed('inference'):
+                predictions = predict_images(inputs)
+        except (InferenceError, InferenceTimeout) as e:
+            for position in positions:
+                results[position] = {'error': f"Prediction is unavailable: {str(e) or 'timed out'}"}
+            return results
+        for position, result in zip(positions, format_predictions(predictions, labels, top_k, temperature)):
+            results[position] = result
+    return results
+
+
+def predict_chunk_azure(chunk: List[Tuple[str, Any, str]], executor: ThreadPoolExecutor,
+                        config: Any) -> List[Dict[str, Any]]:
+    """
+    Scores a chunk of images against Azure ML, in one batched call when AZURE_ML_BATCH is
+    enabled, or with concurrent single-image calls otherwise.
+    """
+    scoring_client = get_scoring_client(config)
 
-            connection_string = config['AZURE_STORAGE_CONNECTION_STRING']
-            container_name = config['CONTAINER_NAME']
-            azure_blob_storage = AzureBlobStorage(connection_string)
-
-            file.seek(0)
-            content_type = file.content_type
-            print("\n")
-            print("CONTENT TYPE: ")
-            print(content_type)
-            print("\n")
-
-            azure_blob_storage.upload_image(
-                container_name=container_name,
-                folder_name=predicted_label,
-                file_data=file,
-                blob_name=predicted_label,
-                content_type=content_type
-            )
+    if config.get('AZURE_ML_BATCH', False):
+        try:
+            predictions = scoring_client.score_batch([data for _, data, _ in chunk])
         except Exception as e:
-            return jsonify({
-                'breed': predicted_label,
-                'confidence': confidence,
-                'message': f"Prediction succeeded, but failed to upload image: {str(e)}"
-            }), 500
+            return [{'error': f"Prediction failed: {str(e)}"} for _ in chunk]
+        return [azure_prediction(predicted_label, confidence) for predicted_label, confidence in predictions]
 
-    return jsonify({
-        'breed': predicted_label,
-        'confidence': confidence
-    })
+    def score(data: bytes) -> Dict[str, Any]:
+        try:
+            return azure_prediction(*scoring_client.score(data))
+        except Exception as e:
+            return {'error': f"Prediction failed: {str(e)}"}
+
+    return list(executor.map(score, [data for _, data, _ in chunk]))
+
+
+@predict_bp.route('/predict/batch', methods=['POST'])
+@jwt_required()
+def predict_batch():
+    """
+    Handles POST requests to the '/predict/batch' endpoint.
+    Predicts the breed of every image uploaded as multipart 'files' fields or inside a zip/tar 'archive'.
+
+    Results are streamed back as NDJSON, one line per image, as soon as each chunk of images
+    has been run through the model. The images of a chunk with a confidence greater than
+    UPLOAD_CONFIDENCE_THRESHOLD are queued together for upload to Blob Storage by the background
+    uploader, and their lines carry 'archived': false if the upload queue was full.
+    """
+    config = current_app.config
+    chunk_size = config.get('INFERENCE_MAX_BATCH_SIZE', 16)
+    top_k = config.get('PREDICT_TOP_K', 3)
+    threshold = config.get('UPLOAD_CONFIDENCE_THRESHOLD', 95)
+
+    request.max_content_length = config.get('PREDICT_BATCH_MAX_BYTES', 256 * 1024 * 1024)
+    try:
+        with timed('multipart'):
+            images = read_batch_images(config.get('PREDICT_BATCH_MAX_IMAGES', 64), config.get('UPLOAD_MAX_BYTES', 20 * 1024 * 1024))
+    except (ValueError, zipfile.BadZipFile, tarfile.TarError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not images:
+        return jsonify({'error': 'No files uploaded'}), 400
+
+    labels = get_labels() if config['DEBUG'] else None
+    temperature = load_temperature(config.get('CALIBRATION_PATH')) if config['DEBUG'] else 1.0
+
+    uploader = get_uploader()
+
+    def generate() -> Iterator[str]:
+        with ThreadPoolExecutor(max_workers=config.get('PREDICT_BATCH_WORKERS', 4)) as executor:
+            for start in range(0, len(images), chunk_size):
+                chunk = images[start:start + chunk_size]
+                if config['DEBUG']:
+                    results = predict_chunk_local(chunk, executor, labels, top_k, temperature)
+                else:
+                    results = predict_chunk_azure(chunk, executor, config)
+
+                confident = [offset for offset, result in enumerate(results)
+                             if result.get('confidence') is not None and result['confidence'] > threshold]
+                queued = uploader.enqueue_many([
+                    (chunk[offset][1], results[offset]['breed'], results[offset]['breed'],
+                     chunk[offset][2] or 'application/octet-stream')
+                    for offset in confident
+                ])
+                archived = dict(zip(confident, queued))
+
+                for offset, ((filename, _, _), result) in enumerate(zip(chunk, results)):
+                    line = {'index': start + offset, 'filename': filename, **result}
+                    if offset in archived:
+                        line['archived'] = archived[offset]
+                        if not archived[offset]:
+                            line['message'] = "Prediction succeeded, but failed to upload image: upload queue is full"
+                    yield json.dumps(line) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -0,0 +1,42 @@
+import hmac
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+from src.utils.metrics import render_prometheus
+from src.utils.stats import collect_stats
+
+status_bp = Blueprint('status_bp', __name__)
+
+@status_bp.route('/status', methods=['GET'])
+@jwt_required()
+def status():
+    """
+    Reports the runtime state of the process-wide services, such as the resident model.
+
+    Returns:
+        jsonify: A JSON response with the stats of each service.
+    """
+    return jsonify({
+        "success": True,
+        "data": collect_stats()
+    }), 200
+
+@status_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Exports the request, stage and database query histograms and the /status values in the
+    Prometheus text format.
+
+    The scraper must send METRICS_TOKEN as a bearer token. The values are those /status only
+    shows to logged-in users, so without a token configured the endpoint is only open in DEBUG.
+
+    Returns:
+        Response: The metrics as text/plain, or 401 without a valid token.
+    """
+    config = current_app.config
+    token = config.get('METRICS_TOKEN')
+    if not token:
+        if not config['DEBUG']:
+            return jsonify({"success": False, "message": "Unauthorized: METRICS_TOKEN is not configured"}), 401
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
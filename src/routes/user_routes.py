@@ -1,7 +1,10 @@
+import logging
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user_model import UserModel
 
+logger = logging.getLogger(__name__)
+
 profile_bp = Blueprint('profile_bp', __name__)
 
 @profile_bp.route('/profile', methods=['GET'])
@@ -10,12 +13,15 @@ def get_profile():
     """
     Retrieves the current user's profile data. The user must be authenticated via JWT.
 
+    The profile is served from the profile cache with an ETag and a Last-Modified date, so
+    conditional requests for an unchanged profile get a 304 Not Modified.
+
     Returns:
         jsonify: A JSON response containing the user's profile data or null if no user is found.
     """
     try:
         userid = get_jwt_identity()
-        user = UserModel.get_by_id(userid)
+        user, modified_at = UserModel.get_profile(userid)
         
         if not user:
             return jsonify({"success": True, "data": None}), 200
@@ -29,9 +35,13 @@ def get_profile():
             "country": user.country
         }
 
-        return jsonify({"success": True, "data": user_data})
+        response = jsonify({"success": True, "data": user_data})
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.last_modified = modified_at
+        response.add_etag()
+        return response.make_conditional(request)
     except Exception as e:
-        print("Error in get_profile:", e) 
+        logger.exception("Error in get_profile")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
@@ -40,25 +50,25 @@ def get_profile():
 def edit_profile():
     """
     Edits the current user's profile data. The user must be authenticated via JWT. 
-    Allows updating first name, last name, birth date, and country.
+    Allows updating first name, last name, birth date, and country. Fields missing from the
+    form keep their current value; the update is a single database round trip.
 
     Returns:
         jsonify: A JSON response indicating the success or failure of the profile update.
     """
     try:
         userid = get_jwt_identity()
-        user = UserModel.get_by_id(userid)
-        if not user:
-            return jsonify({"success": False, "message": "User not found"}), 404
-
         data = request.form 
 
-        user.firstname = data.get('first_name', user.firstname)
-        user.lastname = data.get('last_name', user.lastname)
-        user.birthdate = data.get('birth_date', user.birthdate)
-        user.country = data.get('country', user.country)
-
-        UserModel.update_user(user)
+        user = UserModel.update_profile(
+            userid,
+            firstname=data.get('first_name'),
+            lastname=data.get('last_name'),
+            birthdate=data.get('birth_date'),
+            country=data.get('country')
+        )
+        if not user:
+            return jsonify({"success": False, "message": "User not found"}), 404
 
         return jsonify({"success": True, "message": "User profile updated successfully"})
     except Exception as e:
@@ -1,46 +1,253 @@
-from azure.storage.blob import BlobServiceClient, ContentSettings
-from azure.core.exceptions import AzureError
+from azure.storage.blob import (
+    BlobClient, BlobSasPermissions, BlobServiceClient, ContainerClient, ContentSettings, generate_blob_sas
+)
+from azure.core.exceptions import AzureError, ResourceNotFoundError
+from datetime import datetime, timedelta, timezone
+from requests.adapters import HTTPAdapter
 from uuid import uuid4
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, Optional
 import json
+import logging
+import os
+import requests
+import threading
+import time
+from src.utils.upload_spool import BufferReader
+
+logger = logging.getLogger(__name__)
 
 class AzureBlobStorage:
     """
     A class to interact with Azure Blob Storage for uploading files.
+
+    Meant to be long-lived and shared (see src/services/blob_storage.py): the service client
+    keeps a pool of HTTP connections, container clients are cached, and large uploads and
+    downloads are split into blocks transferred in parallel. Bytes and latency of every
+    transfer are counted for /status.
     """
 
-    def __init__(self, connection_string: str) -> None:
+    def __init__(self, connection_string: str, max_block_size: int = 4 * 1024 * 1024,
+                 max_single_put_size: int = 8 * 1024 * 1024, max_concurrency: int = 4,
+                 pool_connections: int = 20) -> None:
+        """
+        Args:
+            connection_string (str): The storage account (or Azurite) connection string.
+            max_block_size (int): Size of the blocks large uploads and downloads are split into.
+            max_single_put_size (int): Largest upload sent in a single request; larger ones are
+                uploaded (and downloads fetched) in blocks.
+            max_concurrency (int): Number of blocks transferred in parallel per blob.
+            pool_connections (int): Number of HTTP connections kept open to the account.
+        """
+        self.max_concurrency = max_concurrency
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_connections)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
         try:
-            self.blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-            print("Successfully connected to Blob Storage.")
-        except AzureError as e:
+            self.blob_service_client = BlobServiceClient.from_connection_string(
+                connection_string,
+                max_block_size=max_block_size,
+                max_single_put_size=max_single_put_size,
+                max_chunk_get_size=max_block_size,
+                max_single_get_size=max_single_put_size,
+                session=session
+            )
+            logger.debug("Connected to Blob Storage")
+        except (AzureError, ValueError) as e:
             raise Exception(f"Error connecting to Blob Storage: {str(e)}")
+        self._container_clients: Dict[str, ContainerClient] = {}
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            direction: {"count": 0, "bytes": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0}
+            for direction in ("upload", "download")
+        }
+
+    def container_client(self, container_name: str) -> ContainerClient:
+        """
+        Returns the client of a container, created once and reused.
+        """
+        client = self._container_clients.get(container_name)
+        if client is None:
+            with self._lock:
+                client = self._container_clients.get(container_name)
+                if client is None:
+                    client = self.blob_service_client.get_container_client(container_name)
+                    self._container_clients[container_name] = client
+        return client
 
-    def upload_file(self, file: Any, breed: str) -> str:
+    def _blob_client(self, container_name: str, blob_name: str) -> BlobClient:
+        return self.container_client(container_name).get_blob_client(blob_name)
+
+    def _record(self, direction: str, size: int, seconds: float, failed: bool) -> None:
+        with self._stats_lock:
+            counters = self._counters[direction]
+            if failed:
+                counters["errors"] += 1
+                return
+            counters["count"] += 1
+            counters["bytes"] += size
+            counters["seconds"] += seconds
+            counters["max_seconds"] = max(counters["max_seconds"], seconds)
+
+    def upload_file(self, container_name: str, file: Any, breed: str) -> str:
+        """
+        Uploads a werkzeug FileStorage as '<breed>/<uuid>_<filename>'.
+
+        Returns:
+            str: The URL of the uploaded blob.
+        """
         file_name = f"{breed}/{uuid4()}_{file.filename}"
-        blob_client = self.container_client.get_blob_client(file_name)
-        blob_client.upload_blob(file)
-        return blob_client.url
+        return self.upload_blob(container_name, file_name, file.stream, file.mimetype or 'application/octet-stream')
+
+    @staticmethod
+    def image_blob_name(folder_name: str, blob_name: str, content_type: str) -> str:
+        """
+        Builds a unique '<folder>/<uuid>_<name>.<extension>' blob name for an image.
+
+        Raises:
+            ValueError: If the content type is not a supported image type.
+        """
+        extension = content_type.split("/")[-1]
+        if extension not in ["jpeg", "png", "jpg"]:
+            raise ValueError(f"Unsupported file type: {content_type}")
+        return f"{folder_name}/{uuid4()}_{blob_name}.{extension}"
 
     def upload_image(self, container_name: str, folder_name: str, blob_name: str, file_data: Any, content_type: str) -> None:
         try:
-            extension = content_type.split("/")[-1]
-            if extension not in ["jpeg", "png", "jpg"]:
-                raise ValueError(f"Unsupported file type: {content_type}")
-            blob_name_with_extension = f"{folder_name}/{uuid4()}_{blob_name}.{extension}"
-
-            blob_client = self.blob_service_client.get_blob_client(container=container_name, blob=blob_name_with_extension)
-            blob_client.upload_blob(
-                file_data,
-                overwrite=True,
-                content_settings=ContentSettings(content_type=content_type)
-            )
-            print(f"Image '{blob_name_with_extension}' successfully uploaded to container '{container_name}'.")
+            blob_name_with_extension = self.image_blob_name(folder_name, blob_name, content_type)
+            self.upload_blob(container_name, blob_name_with_extension, file_data, content_type)
+            logger.debug("Uploaded image '%s' to container '%s'", blob_name_with_extension, container_name)
         except AzureError as e:
-            print(f"Error uploading image '{blob_name}': {str(e)}")
+            logger.error("Error uploading image '%s': %s", blob_name, e)
         except ValueError as e:
-            print(f"Error processing file '{blob_name}': {str(e)}")
+            logger.error("Error processing file '%s': %s", blob_name, e)
+
+
+    def upload_blob(self, container_name: str, blob_name: str, data: Any, content_type: str) -> str:
+        """
+        Uploads data to a blob, replacing it if it exists.
+
+        Unlike upload_image, errors are raised to the caller so it can retry. A memoryview is
+        streamed from directly rather than copied into bytes. Data larger than the single put
+        size is uploaded in blocks, max_concurrency at a time.
+
+        Returns:
+            str: The URL of the uploaded blob.
+        """
+        length = _length(data)
+        if isinstance(data, memoryview):
+            data = BufferReader(data)
+        blob_client = self._blob_client(container_name, blob_name)
+        start = time.perf_counter()
+        try:
+            blob_client.upload_blob(data, length=length, overwrite=True, max_concurrency=self.max_concurrency,
+                                    content_settings=ContentSettings(content_type=content_type))
+        except Exception:
+            self._record("upload", 0, 0.0, failed=True)
+            raise
+        self._record("upload", length or 0, time.perf_counter() - start, failed=False)
+        return blob_client.url
+
+    def blob_url(self, container_name: str, blob_name: str) -> str:
+        """
+        Returns the URL of a blob, without any access signature.
+        """
+        return self._blob_client(container_name, blob_name).url
+
+    def generate_upload_url(self, container_name: str, blob_name: str, content_type: str, expires_in: float) -> str:
+        """
+        Builds a SAS URL that lets a client create a single blob with a PUT, until it expires.
+
+        The SAS only grants the create permission, so once the blob exists it cannot be
+        overwritten (nor its properties changed) through the URL; a blob checked by
+        DirectUploads.complete stays the blob that was checked. The client must send the
+        'x-ms-blob-type: BlockBlob' header. The account key is taken from the connection
+        string, so this also works against Azurite.
+
+        Args:
+            container_name (str): The name of the container.
+            blob_name (str): The name of the blob the URL is scoped to.
+            content_type (str): The content type the blob is served with.
+            expires_in (float): Seconds until the URL expires.
+
+        Returns:
+            str: The blob URL with the SAS token as its query string.
+        """
+        credential = self.blob_service_client.credential
+        sas = generate_blob_sas(
+            account_name=self.blob_service_client.account_name,
+            container_name=container_name,
+            blob_name=blob_name,
+            account_key=credential.account_key,
+            permission=BlobSasPermissions(create=True),
+            expiry=datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+            content_type=content_type
+        )
+        return f"{self.blob_url(container_name, blob_name)}?{sas}"
+
+    def blob_properties(self, container_name: str, blob_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the size and content type of a blob, or None if it does not exist.
+        """
+        blob_client = self._blob_client(container_name, blob_name)
+        try:
+            properties = blob_client.get_blob_properties()
+        except ResourceNotFoundError:
+            return None
+        return {"size": properties.size, "content_type": properties.content_settings.content_type}
+
+    def delete_blob(self, container_name: str, blob_name: str) -> None:
+        """
+        Deletes a blob if it exists.
+        """
+        try:
+            self._blob_client(container_name, blob_name).delete_blob()
+        except ResourceNotFoundError:
+            pass
+
+    def list_blobs(self, container_name: str, prefix: str = '') -> Iterator[Dict[str, Any]]:
+        """
+        Lists the blobs whose names start with prefix, in name order, a page at a time.
+
+        Returns:
+            Iterator[dict]: The name and size of each blob.
+        """
+        for blob in self.container_client(container_name).list_blobs(name_starts_with=prefix or None):
+            yield {"name": blob.name, "size": blob.size}
 
+    def download_bytes(self, container_name: str, blob_name: str) -> bytes:
+        """
+        Downloads the content of a blob, in parallel blocks if it is large.
+
+        Errors are raised to the caller, like upload_blob.
+        """
+        blob_client = self._blob_client(container_name, blob_name)
+        start = time.perf_counter()
+        try:
+            data = blob_client.download_blob(max_concurrency=self.max_concurrency).readall()
+        except Exception:
+            self._record("download", 0, 0.0, failed=True)
+            raise
+        self._record("download", len(data), time.perf_counter() - start, failed=False)
+        return data
+
+    def get_blob_etag(self, container_name: str, blob_name: str) -> str:
+        """
+        Retrieves the ETag of a blob without downloading its content.
+
+        Args:
+            container_name (str): The name of the container.
+            blob_name (str): The name of the blob.
+
+        Returns:
+            str: The current ETag of the blob.
+        """
+        try:
+            blob_client = self._blob_client(container_name, blob_name)
+            return blob_client.get_blob_properties().etag
+        except AzureError as e:
+            raise Exception(f"Error reading properties of blob '{blob_name}': {str(e)}")
 
     def download_json(self, container_name: str, blob_name: str) -> Dict[str, Any]:
         """
@@ -54,12 +261,44 @@ class AzureBlobStorage:
             dict: The content of the JSON file as a dictionary.
         """
         try:
-            blob_client = self.blob_service_client.get_blob_client(container=container_name, blob=blob_name)
-            blob_data = blob_client.download_blob().readall()
-            json_data = json.loads(blob_data)
-            print(f"Successfully downloaded JSON blob '{blob_name}' from container '{container_name}'.")
+            json_data = json.loads(self.download_bytes(container_name, blob_name))
+            logger.debug("Downloaded JSON blob '%s' from container '%s'", blob_name, container_name)
             return json_data
         except AzureError as e:
             raise Exception(f"Error downloading JSON blob '{blob_name}': {str(e)}")
         except json.JSONDecodeError as e:
-            raise Exception(f"Error decoding JSON blob '{blob_name}': {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error decoding JSON blob '{blob_name}': {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the number, bytes, errors and latency of the uploads and downloads so far.
+        """
+        with self._stats_lock:
+            counters = {direction: dict(values) for direction, values in self._counters.items()}
+        result: Dict[str, Any] = {"containers": len(self._container_clients), "max_concurrency": self.max_concurrency}
+        for direction, values in counters.items():
+            count = values["count"]
+            result[direction] = {
+                "count": count,
+                "bytes": values["bytes"],
+                "errors": values["errors"],
+                "avg_ms": 1000.0 * values["seconds"] / count if count else 0.0,
+                "max_ms": 1000.0 * values["max_seconds"],
+                "mb_per_s": values["bytes"] / values["seconds"] / 1e6 if values["seconds"] else 0.0,
+            }
+        return result
+
+
+def _length(data: Any) -> Optional[int]:
+    """
+    Returns the number of bytes left to upload, if it can be known without reading the data.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return memoryview(data).nbytes
+    try:
+        position = data.tell()
+        end = data.seek(0, os.SEEK_END)
+        data.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
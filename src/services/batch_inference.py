@@ -0,0 +1,170 @@
+import numpy as np
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+
+class _PendingRequest:
+    """
+    A group of images waiting to be included in a batch, and the future its caller waits on.
+    """
+
+    __slots__ = ("images", "future", "enqueued_at")
+
+    def __init__(self, images: np.ndarray) -> None:
+        self.images = images
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Collects concurrent inference requests into batches and runs one forward pass per batch.
+
+    Requests are queued and a scheduler thread takes up to max_batch_size images, waiting at
+    most max_wait_ms after the first queued request before running the batch. The predictions
+    are then split back and handed to each waiting caller.
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray], max_batch_size: int = 16,
+                 max_wait_ms: float = 5) -> None:
+        """
+        Args:
+            predict_fn (callable): Runs the model on a (N, H, W, C) batch and returns (N, classes).
+            max_batch_size (int): Maximum number of images in a single forward pass.
+            max_wait_ms (float): Maximum time the first request of a batch waits for more requests.
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Optional[_PendingRequest]]" = queue.Queue()
+        self._carry: Optional[_PendingRequest] = None
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: Dict[int, int] = {}
+        self._batches = 0
+        self._images = 0
+        self._requests = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._compute_total = 0.0
+        self._compute_max = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, images: np.ndarray) -> Future:
+        """
+        Queues images for inference.
+
+        Args:
+            images (np.ndarray): A (N, H, W, C) array with one or more preprocessed images.
+
+        Returns:
+            Future: Resolves to the (N, classes) predictions for the submitted images.
+        """
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        request = _PendingRequest(images)
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, images: np.ndarray, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        Queues images for inference and blocks until their predictions are ready.
+        """
+        return self.submit(images).result(timeout)
+
+    def close(self) -> None:
+        """
+        Stops the scheduler thread once the requests already queued have been served.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def _next_batch(self) -> Optional[List[_PendingRequest]]:
+        first = self._carry or self._queue.get()
+        self._carry = None
+        if first is None:
+            return None
+
+        batch = [first]
+        size = len(first.images)
+        deadline = first.enqueued_at + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            if size + len(request.images) > self.max_batch_size:
+                # Keep whole requests together; this one starts the next batch.
+                self._carry = request
+                break
+            batch.append(request)
+            size += len(request.images)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            try:
+                images = batch[0].images if len(batch) == 1 else np.concatenate([r.images for r in batch])
+                predictions = np.asarray(self.predict_fn(images))
+            except Exception as ex:
+                for request in batch:
+                    request.future.set_exception(ex)
+                continue
+            finished = time.perf_counter()
+
+            offset = 0
+            for request in batch:
+                count = len(request.images)
+                request.future.set_result(predictions[offset:offset + count])
+                offset += count
+
+            self._record(batch, len(images), started, finished)
+
+    def _record(self, batch: List[_PendingRequest], size: int, started: float, finished: float) -> None:
+        compute = finished - started
+        with self._stats_lock:
+            self._batches += 1
+            self._images += size
+            self._requests += len(batch)
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+            self._compute_total += compute
+            self._compute_max = max(self._compute_max, compute)
+            for request in batch:
+                wait = started - request.enqueued_at
+                self._queue_wait_total += wait
+                self._queue_wait_max = max(self._queue_wait_max, wait)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns per-batch metrics: batch size histogram, queue wait and compute time.
+        """
+        with self._stats_lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "images": self._images,
+                "requests": self._requests,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "avg_batch_size": self._images / self._batches if self._batches else 0.0,
+                "avg_queue_wait_ms": 1000.0 * self._queue_wait_total / self._requests if self._requests else 0.0,
+                "max_queue_wait_ms": 1000.0 * self._queue_wait_max,
+                "avg_compute_ms": 1000.0 * self._compute_total / self._batches if self._batches else 0.0,
+                "max_compute_ms": 1000.0 * self._compute_max,
+            }
@@ -0,0 +1,81 @@
+import threading
+from flask import current_app
+from typing import Any, Dict, Optional
+from src.utils.stats import register_stats_provider
+
+_storage: Optional[Any] = None
+_storage_lock = threading.Lock()
+_azure_clients: Dict[str, Any] = {}
+_azure_clients_lock = threading.Lock()
+
+
+def get_azure_blob_storage(connection_string: str, config: Optional[Any] = None) -> Any:
+    """
+    Returns the process-wide AzureBlobStorage for a connection string, creating it on first use.
+
+    Every caller shares one BlobServiceClient (and its connection pool) per storage account,
+    whether it comes from the app's storage or from a label mapping blob URL.
+
+    Args:
+        connection_string (str): The storage account connection string.
+        config (Mapping, optional): Settings for the block size, concurrency and pool size,
+            used if the client does not exist yet.
+    """
+    storage = _azure_clients.get(connection_string)
+    if storage is None:
+        config = config if config is not None else {}
+        with _azure_clients_lock:
+            storage = _azure_clients.get(connection_string)
+            if storage is None:
+                from src.services.azure_storage_connection import AzureBlobStorage
+                storage = AzureBlobStorage(
+                    connection_string,
+                    max_block_size=config.get('BLOB_MAX_BLOCK_SIZE', 4 * 1024 * 1024),
+                    max_single_put_size=config.get('BLOB_MAX_SINGLE_PUT_SIZE', 8 * 1024 * 1024),
+                    max_concurrency=config.get('BLOB_MAX_CONCURRENCY', 4),
+                    pool_connections=config.get('BLOB_POOL_CONNECTIONS', 20)
+                )
+                _azure_clients[connection_string] = storage
+    return storage
+
+
+def create_blob_storage(config: Any) -> Any:
+    """
+    Creates the storage dog images are kept in: Azure Blob Storage (or Azurite, through its
+    connection string), or the filesystem when BLOB_STORAGE_BACKEND is 'local'.
+
+    Outside the app (scripts), this is the way to get a storage from plain settings.
+    """
+    if config.get('BLOB_STORAGE_BACKEND', 'azure') == 'local':
+        from src.services.local_blob_storage import LocalBlobStorage
+        return LocalBlobStorage(config['LOCAL_BLOB_ROOT'], config['LOCAL_BLOB_BASE_URL'], config['SECRET_KEY'])
+    return get_azure_blob_storage(config['AZURE_STORAGE_CONNECTION_STRING'], config)
+
+
+def get_blob_storage(config: Optional[Any] = None) -> Any:
+    """
+    Returns the process-wide blob storage, creating it from the app config on first use.
+
+    create_app calls it at startup, so requests never pay for creating the client. The
+    background uploader, the direct uploads, the image derivatives and the dog routes all
+    store through it.
+    """
+    global _storage
+    if _storage is None:
+        config = config if config is not None else current_app.config
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_blob_storage(config)
+    return _storage
+
+
+def blob_storage_stats() -> Optional[Dict[str, Any]]:
+    """
+    Returns the transfer counters of every Azure client, keyed by account, or None if none was created.
+    """
+    if not _azure_clients:
+        return None
+    return {storage.blob_service_client.account_name: storage.stats() for storage in list(_azure_clients.values())}
+
+
+register_stats_provider('blob_storage', blob_storage_stats)
@@ -0,0 +1,167 @@
+import threading
+import time
+from flask import current_app
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from typing import Any, Dict, Optional, Tuple
+from uuid import uuid4
+from werkzeug.utils import secure_filename
+from src.models.entities.dogs import Dog
+from src.services.blob_storage import get_blob_storage
+from src.utils.stats import register_stats_provider
+
+ALLOWED_CONTENT_TYPES = ("image/jpeg", "image/jpg", "image/png")
+
+
+def dog_image_blob_name(breed: str, filename: str) -> str:
+    """
+    Returns a new '<breed>/<uuid>_<filename>' blob name for a dog's image, safe to use as a path.
+    """
+    folder = secure_filename(breed) or 'unknown'
+    return f"{folder}/{uuid4()}_{secure_filename(filename) or 'image'}"
+
+
+class DirectUploadError(Exception):
+    """
+    Raised when an upload URL cannot be issued or a finished upload cannot be accepted.
+    """
+
+
+class DirectUploads:
+    """
+    Issues short-lived upload URLs so dog images go straight from the client to blob storage.
+
+    The client asks for a URL, PUTs the image to it, then calls back with the signed upload
+    token it was given. The token ties the blob name to the dog it was issued for, so the
+    callback can only attach a blob this service named. The image bytes never pass through
+    the app servers; only the blob's properties are read when the upload is completed.
+    """
+
+    def __init__(self, storage: Any, container_name: str, secret: str, expires_in: float = 600,
+                 max_bytes: Optional[int] = None) -> None:
+        """
+        Args:
+            storage: An AzureBlobStorage, or a LocalBlobStorage to work offline.
+            container_name (str): The container images are uploaded to.
+            secret (str): Key the upload tokens are signed with.
+            expires_in (float): Seconds an upload URL stays valid.
+            max_bytes (int, optional): Largest image accepted when the upload is completed.
+        """
+        self.storage = storage
+        self.container_name = container_name
+        self.expires_in = expires_in
+        self.max_bytes = max_bytes
+        self._tokens = URLSafeTimedSerializer(secret, salt='dog-image-upload')
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def issue(self, dog: Dog, filename: str, content_type: str) -> Dict[str, Any]:
+        """
+        Issues an upload URL scoped to a new '<breed>/<uuid>_<filename>' blob for a dog's image.
+
+        Returns:
+            dict: The URL, the method and headers to upload with, the blob name and the
+                token to send back once the upload has finished.
+
+        Raises:
+            DirectUploadError: If the content type is not a supported image type.
+        """
+        if content_type not in ALLOWED_CONTENT_TYPES:
+            self._count('rejected')
+            raise DirectUploadError(f"Unsupported file type: {content_type}")
+        blob_name = dog_image_blob_name(dog.breed, filename)
+        upload_url = self.storage.generate_upload_url(self.container_name, blob_name, content_type, self.expires_in)
+        self._count('issued')
+        return {
+            "upload_url": upload_url,
+            "method": "PUT",
+            "headers": {"Content-Type": content_type, "x-ms-blob-type": "BlockBlob"},
+            "blob_name": blob_name,
+            "upload_token": self._tokens.dumps({"dogid": dog.dogid, "blob": blob_name, "type": content_type}),
+            "expires_at": int(time.time() + self.expires_in),
+        }
+
+    def complete(self, dog: Dog, upload_token: str) -> Tuple[str, str]:
+        """
+        Checks a finished upload and returns its blob name and the URL to record as the dog's image.
+
+        Raises:
+            DirectUploadError: If the token is invalid, expired or issued for another dog,
+                or the blob is missing, too large or of another content type. An oversized
+                or mistyped blob is deleted.
+        """
+        try:
+            # The upload may start just before the URL expires, so allow it time to finish.
+            grant = self._tokens.loads(upload_token, max_age=self.expires_in * 2)
+        except SignatureExpired:
+            self._count('rejected')
+            raise DirectUploadError("Upload token expired")
+        except BadSignature:
+            self._count('rejected')
+            raise DirectUploadError("Invalid upload token")
+        if grant.get("dogid") != dog.dogid:
+            self._count('rejected')
+            raise DirectUploadError("Upload token was issued for another dog")
+
+        blob_name = grant["blob"]
+        properties = self.storage.blob_properties(self.container_name, blob_name)
+        if properties is None:
+            self._count('rejected')
+            raise DirectUploadError("Image has not been uploaded")
+        if self.max_bytes is not None and properties["size"] > self.max_bytes:
+            self.storage.delete_blob(self.container_name, blob_name)
+            self._count('rejected')
+            raise DirectUploadError(f"Image is larger than {self.max_bytes} bytes")
+        if properties["content_type"] != grant["type"]:
+            self.storage.delete_blob(self.container_name, blob_name)
+            self._count('rejected')
+            raise DirectUploadError(f"Image was uploaded as {properties['content_type']}, expected {grant['type']}")
+
+        self._count('completed')
+        return blob_name, self.storage.blob_url(self.container_name, blob_name)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.storage).__name__,
+            "issued": self.issued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+_direct_uploads: Optional[DirectUploads] = None
+_direct_uploads_lock = threading.Lock()
+
+
+def get_direct_uploads(config: Optional[Any] = None) -> DirectUploads:
+    """
+    Returns the process-wide direct upload service, creating it from the app config on first use.
+    """
+    global _direct_uploads
+    if _direct_uploads is None:
+        config = config if config is not None else current_app.config
+        with _direct_uploads_lock:
+            if _direct_uploads is None:
+                _direct_uploads = DirectUploads(
+                    get_blob_storage(config),
+                    config['CONTAINER_NAME'],
+                    config['SECRET_KEY'],
+                    expires_in=config.get('UPLOAD_URL_TTL', 600),
+                    max_bytes=config.get('UPLOAD_MAX_BYTES')
+                )
+    return _direct_uploads
+
+
+def direct_upload_stats() -> Optional[Dict[str, Any]]:
+    """
+    Returns the direct upload counters, or None if no upload URL has been requested yet.
+    """
+    return _direct_uploads.stats() if _direct_uploads is not None else None
+
+
+register_stats_provider('direct_uploads', direct_upload_stats)
@@ -0,0 +1,139 @@
+import threading
+from flask import current_app
+from typing import Any, Callable, Dict, Optional
+from src.services.prediction_cache import LRUCache, create_shared_cache
+from src.utils.stats import register_stats_provider
+
+
+class EntityCache:
+    """
+    A read-through cache for database records, invalidated by the model methods that write them.
+
+    Entries live in an in-process LRU, or in a shared tier (SQLite or Redis) when one is
+    configured, so that a write in one worker is seen by the others immediately instead of
+    after the TTL. Values must be JSON-serializable when a shared tier is used.
+    """
+
+    def __init__(self, ttl: float = 60, max_entries: int = 10000, shared: Optional[Any] = None) -> None:
+        self.store = shared if shared is not None else LRUCache(max_entries, ttl)
+        self._lock = threading.Lock()
+        self._invalidations = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value for key, calling loader and caching its result on a miss.
+
+        A value loaded while an invalidation happened is returned but not cached, so a read
+        racing with a write cannot put the old record back.
+        """
+        try:
+            entry = self.store.get(key)
+        except Exception:
+            self._count('errors')
+            entry = None
+        if entry is not None:
+            self._count('hits')
+            return entry['value']
+
+        self._count('misses')
+        invalidations = self._invalidations
+        value = loader()
+        if invalidations == self._invalidations:
+            try:
+                self.store.set(key, {'value': value})
+            except Exception:
+                self._count('errors')
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Replaces the cached value for key with a record a write has just returned.
+        """
+        with self._lock:
+            self._invalidations += 1
+        try:
+            self.store.set(key, {'value': value})
+        except Exception:
+            self._count('errors')
+
+    def invalidate(self, *keys: str) -> None:
+        """
+        Drops the given keys, after the write that changed them has been committed.
+        """
+        with self._lock:
+            self._invalidations += 1
+        for key in keys:
+            try:
+                self.store.delete(key)
+            except Exception:
+                self._count('errors')
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the hit/miss counters and the hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "shared": not isinstance(self.store, LRUCache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self._invalidations,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# ENTITY_CACHE_SHARED_URL for an in-process LRU in each worker.
+MEMORY_URL = 'memory://'
+
+_entity_caches: Dict[str, EntityCache] = {}
+_entity_caches_lock = threading.Lock()
+
+
+def get_entity_cache(name: str) -> Optional[EntityCache]:
+    """
+    Returns the process-wide cache for one kind of record, or None if ENTITY_CACHE is disabled.
+
+    The records are kept in the shared tier at ENTITY_CACHE_SHARED_URL if one is set, and
+    otherwise in a SQLite file at ENTITY_CACHE_SQLITE_PATH shared by the workers of the host: an
+    invalidation in one worker's LRU would leave the others serving the old record until the TTL
+    expires, and how many workers the server started cannot be told from here. 'memory://' keeps
+    them in an in-process LRU instead, for a single web worker.
+
+    Args:
+        name (str): The kind of record, e.g. 'dogs'. Its TTL is read from <NAME>_CACHE_TTL.
+    """
+    config = current_app.config
+    if not config.get('ENTITY_CACHE', False):
+        return None
+    cache = _entity_caches.get(name)
+    if cache is None:
+        with _entity_caches_lock:
+            cache = _entity_caches.get(name)
+            if cache is None:
+                ttl = config.get(f'{name.upper()}_CACHE_TTL', 60)
+                shared_url = config.get('ENTITY_CACHE_SHARED_URL') or f"sqlite:///{config['ENTITY_CACHE_SQLITE_PATH']}"
+                cache = EntityCache(
+                    ttl=ttl,
+                    max_entries=config.get('ENTITY_CACHE_MAX_ENTRIES', 10000),
+                    shared=create_shared_cache(shared_url, ttl, name) if shared_url != MEMORY_URL else None
+                )
+                _entity_caches[name] = cache
+    return cache
+
+
+def entity_cache_stats() -> Dict[str, Any]:
+    """
+    Returns the metrics of every record cache in use, keyed by name.
+    """
+    return {name: cache.stats() for name, cache in _entity_caches.items()}
+
+
+register_stats_provider('entity_cache', entity_cache_stats)
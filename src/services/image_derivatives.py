@@ -0,0 +1,292 @@
+import json
+import logging
+import os
+import posixpath
+import queue
+import threading
+import time
+from flask import current_app
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from src.services.blob_storage import get_blob_storage
+from src.utils.metrics import record_stage, timed
+from src.utils.stats import register_stats_provider
+from src.utils.upload_spool import BufferReader
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', 'webp'),
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg'),
+}
+
+
+def derivative_name(name: str, size: int, image_format: str) -> str:
+    """
+    Returns the name of a derivative, stored next to its original:
+    'breed/<uuid>_photo.png' -> 'breed/<uuid>_photo_256.webp'.
+
+    Works on blob names and on blob URLs alike.
+    """
+    stem, _ = posixpath.splitext(name)
+    return f"{stem}_{size}.{FORMATS[image_format][2]}"
+
+
+def derivative_urls(image_url: str, sizes: Sequence[int], formats: Sequence[str]) -> Dict[str, Dict[str, str]]:
+    """
+    Returns the URLs of an image's derivatives, keyed by size and then by format.
+    """
+    if not image_url:
+        return {}
+    return {str(size): {f: derivative_name(image_url, size, f) for f in formats} for size in sizes}
+
+
+def derivatives_record(sizes: Sequence[int], formats: Sequence[str]) -> str:
+    """
+    Describes the derivatives stored for an image, to keep with the record of that image.
+    """
+    return json.dumps({"sizes": list(sizes), "formats": list(formats)})
+
+
+def recorded_derivative_urls(image_url: str, record: Optional[str]) -> Dict[str, Dict[str, str]]:
+    """
+    Returns the URLs of the derivatives a record says are stored, or an empty map if there is
+    no record: for images stored before derivatives existed, and ones still queued or that
+    failed to render.
+    """
+    if not record:
+        return {}
+    recorded = json.loads(record)
+    return derivative_urls(image_url, recorded["sizes"], recorded["formats"])
+
+
+def render_derivatives(data: Any, sizes: Sequence[int], formats: Sequence[str],
+                       quality: int = 80) -> List[Tuple[int, str, bytes]]:
+    """
+    Decodes an image once and encodes it at every size and format, without its metadata.
+
+    The EXIF orientation is applied to the pixels before the metadata is dropped, so the
+    derivatives are upright without carrying the camera's EXIF block (location included).
+    JPEGs are decoded in draft mode, downscaled by the decoder to just above the largest
+    size, and each size is resized from the previous, larger one.
+
+    Args:
+        data (bytes | memoryview): The encoded original image.
+        sizes (Sequence[int]): The bounds of the longest side, in pixels.
+        formats (Sequence[str]): 'webp' and/or 'jpeg'.
+        quality (int): The encoder quality.
+
+    Returns:
+        list: One (size, format, encoded bytes) tuple per derivative.
+    """
+    # Imported here so api-role workers, which only queue renders, do not load Pillow at startup.
+    from PIL import Image, ImageOps
+    image = Image.open(BufferReader(memoryview(data)))
+    largest = max(sizes)
+    if image.format == 'JPEG':
+        image.draft('RGB', (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    derivatives = []
+    for size in sorted(sizes, reverse=True):
+        if max(image.size) > size:
+            image = image.copy()
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for image_format in formats:
+            buffer = BytesIO()
+            image.save(buffer, format=FORMATS[image_format][0], quality=quality)
+            derivatives.append((size, image_format, buffer.getvalue()))
+    return derivatives
+
+
+class DerivativePipeline:
+    """
+    Generates thumbnails of stored dog images from a pool of worker threads, off the request path.
+
+    Requests submit the blob name of a new original (and its bytes when they are at hand, so
+    it is not downloaded back). The workers render every configured size and format and store
+    the derivatives next to the original, under names that derivative_urls can compute from
+    the original's URL, then call the job's callback so the caller can record that they exist. Pillow releases the GIL while resizing and encoding, so threads scale
+    across cores (see benchmarks/derivative_benchmark.py).
+    """
+
+    def __init__(self, storage: Any, container_name: str, sizes: Sequence[int] = (128, 512),
+                 formats: Sequence[str] = ('webp', 'jpeg'), quality: int = 80, workers: int = 2,
+                 queue_size: int = 100) -> None:
+        """
+        Args:
+            storage: An AzureBlobStorage, or a LocalBlobStorage to work offline.
+            container_name (str): The container the originals and derivatives are stored in.
+            sizes (Sequence[int]): The bounds of the longest side of each derivative, in pixels.
+            formats (Sequence[str]): 'webp' and/or 'jpeg'.
+            quality (int): The encoder quality.
+            workers (int): Number of rendering threads.
+            queue_size (int): Number of originals waiting to be rendered before submit() rejects.
+
+        Raises:
+            ValueError: If a format is not supported.
+        """
+        unsupported = [f for f in formats if f not in FORMATS]
+        if unsupported:
+            raise ValueError(f"Unsupported derivative formats: {unsupported}")
+        self.storage = storage
+        self.container_name = container_name
+        self.sizes = list(sizes)
+        self.formats = list(formats)
+        self.quality = quality
+        self._queue: "queue.Queue[Tuple[str, Any, Optional[Callable[[], None]]]]" = queue.Queue(maxsize=queue_size)
+        self._closed = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._rendered = 0
+        self._failed = 0
+        self._rejected = 0
+        self._derivatives = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._render_seconds = 0.0
+        self._threads = [threading.Thread(target=self._run, name=f"image-derivatives-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def urls(self, image_url: str) -> Dict[str, Dict[str, str]]:
+        return derivative_urls(image_url, self.sizes, self.formats)
+
+    def record(self) -> str:
+        """
+        Returns the record of the derivatives this pipeline stores for an image.
+        """
+        return derivatives_record(self.sizes, self.formats)
+
+    def submit(self, blob_name: str, data: Optional[Any] = None,
+               on_rendered: Optional[Callable[[], None]] = None) -> bool:
+        """
+        Queues an original for rendering.
+
+        Args:
+            blob_name (str): The name of the stored original.
+            data (bytes | memoryview, optional): Its content, if already in memory.
+            on_rendered (Callable, optional): Called from the worker once every derivative is stored.
+
+        Returns:
+            bool: False if the queue is full or the pipeline is shut down.
+        """
+        if self._closed.is_set():
+            return False
+        try:
+            self._queue.put_nowait((blob_name, data, on_rendered))
+            return True
+        except queue.Full:
+            self._count('_rejected')
+            logger.warning("Derivative queue full, not rendering '%s'", blob_name)
+            return False
+
+    def _run(self) -> None:
+        while True:
+            try:
+                blob_name, data, on_rendered = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._closed.is_set():
+                    return
+                continue
+            self._render(blob_name, data, on_rendered)
+
+    def _render(self, blob_name: str, data: Optional[Any], on_rendered: Optional[Callable[[], None]]) -> None:
+        try:
+            if data is None:
+                data = self.storage.download_bytes(self.container_name, blob_name)
+            start = time.perf_counter()
+            derivatives = render_derivatives(data, self.sizes, self.formats, self.quality)
+            elapsed = time.perf_counter() - start
+            record_stage('thumbnail_render', elapsed)
+            with timed('thumbnail_upload'):
+                for size, image_format, encoded in derivatives:
+                    self.storage.upload_blob(self.container_name, derivative_name(blob_name, size, image_format),
+                                             encoded, FORMATS[image_format][1])
+            if on_rendered is not None:
+                on_rendered()
+        except Exception as e:
+            self._count('_failed')
+            logger.error("Could not render derivatives of '%s': %s", blob_name, e)
+            return
+
+        with self._stats_lock:
+            self._rendered += 1
+            self._derivatives += len(derivatives)
+            self._bytes_in += len(data)
+            self._bytes_out += sum(len(encoded) for _, _, encoded in derivatives)
+            self._render_seconds += elapsed
+
+    def _count(self, counter: str) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def shutdown(self, timeout: Optional[float] = 30.0) -> None:
+        """
+        Stops accepting originals and waits for the queued ones to be rendered.
+        """
+        self._closed.set()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the queue depth, render time and how much smaller the derivatives are than the originals.
+        """
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "rendered": self._rendered,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "derivatives": self._derivatives,
+                "avg_render_ms": 1000.0 * self._render_seconds / self._rendered if self._rendered else 0.0,
+                "bytes_in": self._bytes_in,
+                "bytes_out": self._bytes_out,
+            }
+
+
+_pipeline: Optional[DerivativePipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_derivative_pipeline(config: Optional[Any] = None) -> DerivativePipeline:
+    """
+    Returns the process-wide derivative pipeline, creating it from the app config on first use.
+    """
+    global _pipeline
+    if _pipeline is None:
+        config = config if config is not None else current_app.config
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = DerivativePipeline(
+                    get_blob_storage(config),
+                    config['CONTAINER_NAME'],
+                    sizes=config.get('IMAGE_DERIVATIVE_SIZES', [128, 512]),
+                    formats=config.get('IMAGE_DERIVATIVE_FORMATS', ['webp', 'jpeg']),
+                    quality=config.get('IMAGE_DERIVATIVE_QUALITY', 80),
+                    workers=config.get('IMAGE_DERIVATIVE_WORKERS', min(2, os.cpu_count() or 1)),
+                    queue_size=config.get('IMAGE_DERIVATIVE_QUEUE_SIZE', 100)
+                )
+    return _pipeline
+
+
+def derivative_pipeline_stats() -> Optional[Dict[str, Any]]:
+    """
+    Returns the derivative pipeline metrics, or None if no image has been submitted yet.
+    """
+    return _pipeline.stats() if _pipeline is not None else None
+
+
+def shutdown_derivative_pipeline() -> None:
+    """
+    Drains the derivative pipeline, if one was started. Registered to run at process exit.
+    """
+    if _pipeline is not None:
+        _pipeline.shutdown()
+
+
+register_stats_provider('image_derivatives', derivative_pipeline_stats)
@@ -0,0 +1,466 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import numpy as np
+from concurrent.futures import Future
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from src.services.preprocess_model import IMAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SHAPE = (IMAGE_SIZE[1], IMAGE_SIZE[0], 3)
+
+
+class InferenceError(Exception):
+    """
+    Raised when an inference worker fails to run a batch or dies while running it.
+    """
+
+
+def _pin_cpus(index: int, threads: int) -> Optional[List[int]]:
+    """
+    Pins the calling process to its own range of the available CPUs.
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    pinned = sorted({cpus[(index * threads + offset) % len(cpus)] for offset in range(threads)})
+    os.sched_setaffinity(0, pinned)
+    return pinned
+
+
+def _worker_main(worker_id: int, index: int, model_path: str, backend: str, intra_op_threads: int,
+                 inter_op_threads: int, pin_cpus: bool, reload_interval: float, slot_names: Sequence[str],
+                 slot_images: int, tasks: "multiprocessing.Queue", results: "multiprocessing.Queue") -> None:
+    """
+    Entry point of an inference worker process.
+
+    Loads one model instance with fixed thread counts, then runs the batches written to the
+    shared-memory slots until it receives None. Only the slot index and image count go through
+    the task queue; the predictions, which are small, are sent back through the result queue.
+    """
+    os.environ['OMP_NUM_THREADS'] = str(intra_op_threads)
+    cpus = _pin_cpus(index, intra_op_threads) if pin_cpus else None
+
+    from src.models.inference_backends import resolve_backend
+    from src.models.prediction_models import ModelRegistry
+
+    registry = ModelRegistry()
+    registry.configure(backend, intra_op_threads)
+    try:
+        if resolve_backend(model_path, backend) == 'keras':
+            import tensorflow as tf
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+        registry.get(model_path)
+    except Exception as e:
+        results.put(('failed', worker_id, repr(e)))
+        return
+
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    views = [np.ndarray((slot_images, *IMAGE_SHAPE), dtype=np.float32, buffer=slot.buf) for slot in slots]
+    results.put(('ready', worker_id, os.getpid(), registry.version, cpus))
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            request_id, slot, count = task
+            start = time.perf_counter()
+            try:
+                model = registry.get(model_path, reload_interval)
+                ok, payload = True, np.array(model.predict(views[slot][:count]), dtype=np.float32)
+            except Exception as e:
+                ok, payload = False, repr(e)
+            results.put(('result', worker_id, request_id, ok, payload, time.perf_counter() - start, registry.version))
+    finally:
+        del views
+        for slot in slots:
+            slot.close()
+
+
+class _Worker:
+    """
+    The parent's view of an inference worker process.
+    """
+
+    def __init__(self, worker_id: int, index: int, process: multiprocessing.Process,
+                 tasks: "multiprocessing.Queue") -> None:
+        self.worker_id = worker_id
+        self.index = index
+        self.process = process
+        self.tasks = tasks
+        self.ready = threading.Event()
+        self.draining = False
+        self.pid: Optional[int] = None
+        self.cpus: Optional[List[int]] = None
+        self.in_flight = 0
+        self.tasks_done = 0
+        self.busy_seconds = 0.0
+        self.started_at = time.monotonic()
+
+
+class InferenceSlot:
+    """
+    A reserved shared-memory buffer that images are preprocessed into before being submitted.
+    """
+
+    def __init__(self, pool: "InferencePool", index: int, count: int) -> None:
+        self._pool = pool
+        self.index = index
+        self.count = count
+        self.images = pool._views[index][:count]
+        self.submitted = False
+
+    def submit(self) -> Future:
+        """
+        Hands the slot to a worker. The images must not be written to after this call.
+
+        Returns:
+            Future: Resolves to the (N, classes) predictions for the slot's images.
+        """
+        self.submitted = True
+        return self._pool._dispatch(self.index, self.count)
+
+    def predict(self, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        Hands the slot to a worker and blocks until its predictions are ready.
+        """
+        return self.submit().result(timeout)
+
+
+class InferencePool:
+    """
+    A pool of worker processes that each hold one model instance.
+
+    Running the model outside the web workers means only these processes load TensorFlow, and
+    each one gets a fixed number of intra/inter-op threads (optionally pinned to its own CPUs)
+    instead of every web worker's thread pools competing for the same cores.
+
+    Callers reserve a slot, preprocess images straight into its shared-memory buffer and submit
+    it; a request goes to the ready worker with the fewest batches in flight. Workers that die
+    are replaced, and restart() swaps every worker for a fresh one without dropping requests.
+    """
+
+    def __init__(self, model_path: str, workers: int = 2, backend: str = 'auto', intra_op_threads: int = 1,
+                 inter_op_threads: int = 1, pin_cpus: bool = False, slots: Optional[int] = None,
+                 slot_images: int = 16, reload_interval: float = 0) -> None:
+        """
+        Args:
+            model_path (str): Path to the saved Keras, TFLite or ONNX model.
+            workers (int): Number of worker processes.
+            backend (str): 'keras', 'tflite', 'onnx', or 'auto' to pick one from the file extension.
+            intra_op_threads (int): Threads each worker uses inside an operation.
+            inter_op_threads (int): Threads each worker uses to run independent operations.
+            pin_cpus (bool): Pin each worker to intra_op_threads CPUs of its own.
+            slots (int, optional): Number of shared-memory buffers; defaults to two per worker.
+            slot_images (int): Number of images a buffer holds.
+            reload_interval (float): Seconds between checks of the model file for changes.
+        """
+        self.model_path = model_path
+        self.backend = backend
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.pin_cpus = pin_cpus
+        self.slot_images = slot_images
+        self.reload_interval = reload_interval
+        self.version: Optional[str] = None
+        self.restarts = 0
+        self.last_error: Optional[str] = None
+        self._context = multiprocessing.get_context('spawn')
+        self._results = self._context.Queue()
+        slot_bytes = slot_images * int(np.prod(IMAGE_SHAPE)) * np.dtype(np.float32).itemsize
+        self._slots = [shared_memory.SharedMemory(create=True, size=slot_bytes) for _ in range(slots or 2 * workers)]
+        self._views = [np.ndarray((slot_images, *IMAGE_SHAPE), dtype=np.float32, buffer=slot.buf)
+                       for slot in self._slots]
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        for index in range(len(self._slots)):
+            self._free_slots.put(index)
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._worker_ids = itertools.count()
+        self._pending: Dict[int, Any] = {}
+        self._workers: Dict[int, _Worker] = {}
+        self._active: List[_Worker] = [self._spawn(index) for index in range(workers)]
+        self._closed = False
+        self._collector = threading.Thread(target=self._collect, name="inference-pool", daemon=True)
+        self._collector.start()
+
+    def _spawn(self, index: int) -> _Worker:
+        worker_id = next(self._worker_ids)
+        tasks = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, index, self.model_path, self.backend, self.intra_op_threads, self.inter_op_threads,
+                  self.pin_cpus, self.reload_interval, [slot.name for slot in self._slots], self.slot_images,
+                  tasks, self._results),
+            name=f"inference-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        worker = _Worker(worker_id, index, process, tasks)
+        with self._lock:
+            self._workers[worker_id] = worker
+        return worker
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until at least one worker has loaded the model.
+
+        Returns:
+            bool: False if no worker became ready within the timeout.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                if any(worker.ready.is_set() for worker in self._active):
+                    return True
+                if not self._active:
+                    return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    @contextmanager
+    def slot(self, count: int, timeout: Optional[float] = None) -> Iterator[InferenceSlot]:
+        """
+        Reserves a shared-memory buffer for count images, waiting for one to be free.
+
+        The buffer is returned to the pool when its predictions arrive, or when the with-block
+        exits without submitting it.
+
+        Raises:
+            ValueError: If count is larger than the slot size.
+            InferenceError: If no slot becomes free within the timeout.
+        """
+        if count > self.slot_images:
+            raise ValueError(f"A slot holds at most {self.slot_images} images, got {count}")
+        try:
+            index = self._free_slots.get(timeout=timeout)
+        except queue.Empty:
+            raise InferenceError("No free inference slot")
+        slot = InferenceSlot(self, index, count)
+        try:
+            yield slot
+        finally:
+            if not slot.submitted:
+                self._free_slots.put(index)
+
+    def submit(self, images: np.ndarray, timeout: Optional[float] = None) -> Future:
+        """
+        Copies up to slot_images preprocessed images into a slot and queues them.
+
+        Args:
+            images (np.ndarray): The preprocessed images.
+            timeout (float, optional): Seconds to wait for a free slot.
+
+        Returns:
+            Future: Resolves to the (N, classes) predictions for the submitted images.
+        """
+        with self.slot(len(images), timeout) as slot:
+            slot.images[...] = images
+            return slot.submit()
+
+    def predict(self, images: np.ndarray, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        Runs the model on any number of preprocessed images, split across slots and workers.
+
+        The timeout applies to waiting for each slot and for each slot's predictions.
+        """
+        futures = [self.submit(images[start:start + self.slot_images], timeout)
+                   for start in range(0, len(images), self.slot_images)]
+        return np.concatenate([future.result(timeout) for future in futures])
+
+    def _dispatch(self, slot: int, count: int) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._closed or not self._active:
+                self._free_slots.put(slot)
+                raise InferenceError(f"No inference workers available: {self.last_error or 'pool is closed'}")
+            worker = min(self._active, key=lambda worker: (not worker.ready.is_set(), worker.in_flight))
+            request_id = next(self._request_ids)
+            self._pending[request_id] = (future, slot, worker)
+            worker.in_flight += 1
+        worker.tasks.put((request_id, slot, count))
+        return future
+
+    def _collect(self) -> None:
+        last_check = time.monotonic()
+        while True:
+            try:
+                message = self._results.get(timeout=0.5)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):
+                return
+
+            if message is not None:
+                self._handle(message)
+            if time.monotonic() - last_check >= 0.5:
+                last_check = time.monotonic()
+                if self._reap_workers():
+                    return
+
+    def _handle(self, message: tuple) -> None:
+        kind, worker_id = message[0], message[1]
+        with self._lock:
+            worker = self._workers.get(worker_id)
+        if worker is None:
+            return
+
+        if kind == 'ready':
+            _, _, worker.pid, version, worker.cpus = message
+            self.version = version
+            worker.ready.set()
+        elif kind == 'failed':
+            self.last_error = message[2]
+            logger.error("Inference worker %s could not load %s: %s", worker_id, self.model_path, message[2])
+            with self._lock:
+                if worker in self._active:
+                    self._active.remove(worker)
+            self._fail_pending(worker, message[2])
+        elif kind == 'result':
+            _, _, request_id, ok, payload, busy_seconds, version = message
+            with self._lock:
+                entry = self._pending.pop(request_id, None)
+                if entry is None:
+                    # Already failed, e.g. when the worker was presumed dead.
+                    return
+                future, slot, _ = entry
+                worker.in_flight -= 1
+                worker.tasks_done += 1
+                worker.busy_seconds += busy_seconds
+            self.version = version
+            self._free_slots.put(slot)
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(InferenceError(payload))
+
+    def _fail_pending(self, worker: _Worker, error: str) -> None:
+        with self._lock:
+            failed = [(request_id, entry) for request_id, entry in self._pending.items() if entry[2] is worker]
+            for request_id, _ in failed:
+                del self._pending[request_id]
+            worker.in_flight = 0
+        for _, (future, slot, _) in failed:
+            self._free_slots.put(slot)
+            future.set_exception(InferenceError(error))
+
+    def _reap_workers(self) -> bool:
+        """
+        Forgets workers that exited and replaces the ones that died while serving.
+
+        Returns:
+            bool: True once the pool is closed and every worker has exited.
+        """
+        with self._lock:
+            exited = [worker for worker in self._workers.values() if not worker.process.is_alive()]
+        for worker in exited:
+            # Results sent just before exiting may still be in the queue.
+            while worker.in_flight:
+                try:
+                    self._handle(self._results.get(timeout=0.1))
+                except queue.Empty:
+                    break
+            crashed = worker in self._active and not self._closed
+            if worker.in_flight:
+                self._fail_pending(worker, f"Inference worker exited with code {worker.process.exitcode}")
+            with self._lock:
+                del self._workers[worker.worker_id]
+                if worker in self._active:
+                    self._active.remove(worker)
+            if crashed and worker.ready.is_set():
+                logger.warning("Inference worker %s exited with code %s, restarting it",
+                               worker.worker_id, worker.process.exitcode)
+                replacement = self._spawn(worker.index)
+                with self._lock:
+                    self._active.append(replacement)
+                    self.restarts += 1
+            elif crashed:
+                self.last_error = f"Inference worker exited with code {worker.process.exitcode} before loading the model"
+                logger.error(self.last_error)
+        with self._lock:
+            return self._closed and not self._workers
+
+    def restart(self, timeout: Optional[float] = None) -> None:
+        """
+        Replaces every worker, one at a time, without dropping requests.
+
+        Each replacement loads the model before the worker it replaces stops taking requests;
+        the old worker then finishes the batches already queued to it and exits.
+        """
+        for worker in list(self._active):
+            replacement = self._spawn(worker.index)
+            replacement.ready.wait(timeout)
+            with self._lock:
+                if worker in self._active:
+                    self._active[self._active.index(worker)] = replacement
+                else:
+                    self._active.append(replacement)
+                worker.draining = True
+                self.restarts += 1
+            worker.tasks.put(None)
+
+    def close(self, timeout: float = 10) -> None:
+        """
+        Stops the workers after their queued batches and releases the shared memory.
+        """
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers.values())
+            self._active = []
+        for worker in workers:
+            worker.tasks.put(None)
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self._collector.join(timeout)
+
+        self._views = []
+        for slot in self._slots:
+            try:
+                slot.close()
+            except BufferError:
+                # A caller still holds a view of the slot; the memory is freed when it is dropped.
+                pass
+            slot.unlink()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the slot usage and, for each worker, its load and utilization since it started.
+        """
+        now = time.monotonic()
+        with self._lock:
+            workers = [{
+                "worker_id": worker.worker_id,
+                "pid": worker.pid,
+                "cpus": worker.cpus,
+                "ready": worker.ready.is_set(),
+                "draining": worker.draining,
+                "in_flight": worker.in_flight,
+                "batches": worker.tasks_done,
+                "busy_seconds": round(worker.busy_seconds, 3),
+                "utilization": round(worker.busy_seconds / max(now - worker.started_at, 1e-9), 4),
+            } for worker in self._workers.values()]
+            pending = len(self._pending)
+        return {
+            "model_version": self.version,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "slots": len(self._slots),
+            "free_slots": self._free_slots.qsize(),
+            "slot_images": self.slot_images,
+            "pending": pending,
+            "restarts": self.restarts,
+            "last_error": self.last_error,
+            "workers": workers,
+        }
@@ -0,0 +1,178 @@
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import time
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+from urllib.parse import quote, urlencode
+from src.utils.upload_spool import BufferReader
+
+
+class UploadTooLarge(Exception):
+    """
+    Raised when a body written to LocalBlobStorage exceeds the allowed size.
+    """
+
+
+class LocalBlobStorage:
+    """
+    A filesystem-backed stand-in for the AzureBlobStorage methods used by direct uploads and
+    image derivatives, for running and testing them offline.
+
+    Blobs are files under '<root>/<container>/<blob name>', with their content type in a
+    '.meta.json' sidecar. Upload URLs point at the app's own /local_blobs route and are signed
+    with an HMAC instead of a SAS token.
+    """
+
+    def __init__(self, root: str, base_url: str, secret: str) -> None:
+        """
+        Args:
+            root (str): Directory the blobs are stored under.
+            base_url (str): URL the app is reachable at, e.g. 'http://localhost:5000'.
+            secret (str): Key the upload URLs are signed with.
+        """
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip('/')
+        self._secret = secret.encode()
+
+    def path(self, container_name: str, blob_name: str) -> str:
+        """
+        Returns the file a blob is stored in.
+
+        Raises:
+            ValueError: If the name would resolve outside its container, or the container
+                outside the storage root.
+        """
+        container = os.path.abspath(os.path.join(self.root, container_name))
+        if os.path.dirname(container) != self.root:
+            raise ValueError(f"Invalid container name: {container_name}")
+        path = os.path.abspath(os.path.join(container, blob_name))
+        if not path.startswith(container + os.sep):
+            raise ValueError(f"Invalid blob name: {blob_name}")
+        return path
+
+    def blob_url(self, container_name: str, blob_name: str) -> str:
+        return f"{self.base_url}/local_blobs/{quote(container_name)}/{quote(blob_name)}"
+
+    def _signature(self, container_name: str, blob_name: str, expiry: int, content_type: str) -> str:
+        message = f"{container_name}/{blob_name}\n{expiry}\n{content_type}".encode()
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()
+
+    def generate_upload_url(self, container_name: str, blob_name: str, content_type: str, expires_in: float) -> str:
+        """
+        Builds a signed URL that accepts one PUT of the blob with the given content type until it
+        expires. Like the create-only SAS of AzureBlobStorage, it cannot replace the blob once stored.
+        """
+        expiry = int(time.time() + expires_in)
+        query = urlencode({'se': expiry, 'sig': self._signature(container_name, blob_name, expiry, content_type)})
+        return f"{self.blob_url(container_name, blob_name)}?{query}"
+
+    def verify_upload(self, container_name: str, blob_name: str, expiry: str, signature: str,
+                      content_type: str) -> bool:
+        """
+        Tells whether a PUT carries a valid, unexpired signature for this blob and content type.
+        """
+        try:
+            expiry_time = int(expiry)
+        except (TypeError, ValueError):
+            return False
+        if expiry_time < time.time():
+            return False
+        expected = self._signature(container_name, blob_name, expiry_time, content_type)
+        return hmac.compare_digest(expected, signature or '')
+
+    def write(self, container_name: str, blob_name: str, stream: BinaryIO, content_type: str,
+              max_bytes: Optional[int] = None, overwrite: bool = True) -> int:
+        """
+        Stores a blob from a stream, replacing it atomically if it exists and overwrite is set.
+
+        Returns:
+            int: The number of bytes written.
+
+        Raises:
+            UploadTooLarge: If the stream is longer than max_bytes; nothing is stored.
+            FileExistsError: If the blob exists and overwrite is not set; it is left unchanged.
+        """
+        path = self.path(container_name, blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = stream.read(64 * 1024)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise UploadTooLarge(f"Blob is larger than {max_bytes} bytes")
+                    f.write(chunk)
+            if overwrite:
+                with open(path + '.meta.json', 'w') as f:
+                    json.dump({'content_type': content_type}, f)
+                os.replace(temp_path, path)
+            else:
+                # Linking fails if the blob exists, so of two racing writers only one stores it.
+                os.link(temp_path, path)
+                os.unlink(temp_path)
+                with open(path + '.meta.json', 'w') as f:
+                    json.dump({'content_type': content_type}, f)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return size
+
+    def upload_blob(self, container_name: str, blob_name: str, data: Any, content_type: str) -> str:
+        """
+        Stores bytes, a memoryview or a file-like object as a blob, like AzureBlobStorage.upload_blob.
+
+        Returns:
+            str: The URL of the stored blob.
+        """
+        stream = data if hasattr(data, 'read') else BufferReader(memoryview(data))
+        self.write(container_name, blob_name, stream, content_type)
+        return self.blob_url(container_name, blob_name)
+
+    def download_bytes(self, container_name: str, blob_name: str) -> bytes:
+        with open(self.path(container_name, blob_name), 'rb') as f:
+            return f.read()
+
+    def blob_properties(self, container_name: str, blob_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the size and content type of a blob, or None if it does not exist.
+        """
+        path = self.path(container_name, blob_name)
+        try:
+            size = os.path.getsize(path)
+            with open(path + '.meta.json', 'r') as f:
+                content_type = json.load(f).get('content_type')
+        except FileNotFoundError:
+            return None
+        return {"size": size, "content_type": content_type}
+
+    def list_blobs(self, container_name: str, prefix: str = '') -> Iterator[Dict[str, Any]]:
+        """
+        Lists the blobs whose names start with prefix, in name order, like AzureBlobStorage.list_blobs.
+        """
+        container = os.path.join(self.root, container_name)
+        names = []
+        for root, _, files in os.walk(container):
+            for file in files:
+                if file.endswith(('.meta.json', '.part')):
+                    continue
+                name = os.path.relpath(os.path.join(root, file), container).replace(os.sep, '/')
+                if name.startswith(prefix):
+                    names.append(name)
+        for name in sorted(names):
+            yield {"name": name, "size": os.path.getsize(os.path.join(container, name))}
+
+    def delete_blob(self, container_name: str, blob_name: str) -> None:
+        path = self.path(container_name, blob_name)
+        for file in (path, path + '.meta.json'):
+            try:
+                os.unlink(file)
+            except FileNotFoundError:
+                pass
+
@@ -0,0 +1,158 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from typing import Any, Callable, Dict, Optional
+from werkzeug.security import check_password_hash, generate_password_hash
+from src.utils.stats import register_stats_provider
+
+
+class HasherBusy(Exception):
+    """
+    Raised when the password hashing queue is full, so the request should be retried later.
+    """
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords on a small, bounded thread pool.
+
+    hashlib's scrypt and PBKDF2 release the GIL, so hashes run in parallel on the pool's
+    threads, but never on more than `workers` cores at once: a burst of logins queues up
+    (and is rejected once `queue_size` is reached) instead of starving the request threads
+    that serve predictions.
+    """
+
+    def __init__(self, method: str = 'scrypt', scrypt_n: int = 2 ** 15, scrypt_r: int = 8, scrypt_p: int = 1,
+                 pbkdf2_iterations: int = 600000, salt_length: int = 16, workers: int = 2,
+                 queue_size: int = 32) -> None:
+        """
+        Args:
+            method (str): 'scrypt' or 'pbkdf2'.
+            scrypt_n (int): scrypt CPU/memory cost, a power of two.
+            scrypt_r (int): scrypt block size.
+            scrypt_p (int): scrypt parallelization.
+            pbkdf2_iterations (int): Number of PBKDF2-SHA256 iterations.
+            salt_length (int): Length of the random salt.
+            workers (int): Number of hashes computed at the same time.
+            queue_size (int): Number of hashes allowed to wait for a worker.
+
+        Raises:
+            ValueError: If the method is not supported.
+        """
+        if method == 'scrypt':
+            self.method = f"scrypt:{scrypt_n}:{scrypt_r}:{scrypt_p}"
+        elif method == 'pbkdf2':
+            self.method = f"pbkdf2:sha256:{pbkdf2_iterations}"
+        else:
+            raise ValueError(f"Unsupported password hash method: {method}")
+        self.salt_length = salt_length
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._stats_lock = threading.Lock()
+        self._hashes = 0
+        self._verifications = 0
+        self._rehashes = 0
+        self._rejected = 0
+        self._busy_seconds = 0.0
+        self._dummy_hash: Optional[str] = None
+
+    def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            raise HasherBusy("Too many password hashes in progress")
+        try:
+            start = time.perf_counter()
+            result = self._executor.submit(fn, *args).result()
+            with self._stats_lock:
+                self._busy_seconds += time.perf_counter() - start
+            return result
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        """
+        Hashes a password with the configured method and cost.
+        """
+        hashed = self._run(generate_password_hash, password, self.method, self.salt_length)
+        with self._stats_lock:
+            self._hashes += 1
+        return hashed
+
+    def verify(self, hashed_password: Optional[str], password: str) -> bool:
+        """
+        Checks a password against a stored hash.
+
+        When there is no stored hash (unknown email), a hash with the current settings is
+        checked anyway, so the response time does not reveal which emails are registered.
+        """
+        if hashed_password is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = self._run(generate_password_hash, "dummy password", self.method, self.salt_length)
+            self._run(check_password_hash, self._dummy_hash, password)
+            return False
+        valid = self._run(check_password_hash, hashed_password, password)
+        with self._stats_lock:
+            self._verifications += 1
+        return valid
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """
+        Tells whether a stored hash was made with a different method or cost than the current one.
+        """
+        return hashed_password.split('$', 1)[0] != self.method
+
+    def count_rehash(self) -> None:
+        with self._stats_lock:
+            self._rehashes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the method, the hash counters and the average time a hash takes, queueing included.
+        """
+        with self._stats_lock:
+            operations = self._hashes + self._verifications
+            return {
+                "method": self.method,
+                "hashes": self._hashes,
+                "verifications": self._verifications,
+                "rehashes": self._rehashes,
+                "rejected": self._rejected,
+                "avg_ms": self._busy_seconds / operations * 1000 if operations else 0.0,
+            }
+
+
+_password_hasher: Optional[PasswordHasher] = None
+_password_hasher_lock = threading.Lock()
+
+
+def get_password_hasher(config: Optional[Any] = None) -> PasswordHasher:
+    """
+    Returns the process-wide password hasher, creating it from the app config on first use.
+    """
+    global _password_hasher
+    if _password_hasher is None:
+        config = config if config is not None else current_app.config
+        with _password_hasher_lock:
+            if _password_hasher is None:
+                _password_hasher = PasswordHasher(
+                    method=config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+                    scrypt_n=config.get('PASSWORD_SCRYPT_N', 2 ** 15),
+                    scrypt_r=config.get('PASSWORD_SCRYPT_R', 8),
+                    scrypt_p=config.get('PASSWORD_SCRYPT_P', 1),
+                    pbkdf2_iterations=config.get('PASSWORD_PBKDF2_ITERATIONS', 600000),
+                    workers=config.get('PASSWORD_HASH_WORKERS', 2),
+                    queue_size=config.get('PASSWORD_HASH_QUEUE_SIZE', 32)
+                )
+    return _password_hasher
+
+
+def password_hasher_stats() -> Optional[Dict[str, Any]]:
+    """
+    Returns the password hasher metrics, or None if no password has been hashed yet.
+    """
+    return _password_hasher.stats() if _password_hasher is not None else None
+
+
+register_stats_provider('password_hasher', password_hasher_stats)
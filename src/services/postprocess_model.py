@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+_EPSILON = 1e-12
+_calibration_lock = threading.Lock()
+_calibration: Dict[str, Tuple[float, float]] = {}
+
+
+def top_k(probabilities: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the k most likely classes of every row of a batch output.
+
+    np.argpartition selects the k best classes of all rows in one pass, and only those k
+    columns are sorted afterwards.
+
+    Args:
+        probabilities (np.ndarray): The (N, classes) model output.
+        k (int): The number of classes to keep per row.
+
+    Returns:
+        tuple: The (N, k) class indices and their (N, k) scores, best first.
+    """
+    k = max(1, min(k, probabilities.shape[1]))
+    rows = np.arange(len(probabilities))[:, None]
+    candidates = np.argpartition(probabilities, -k, axis=1)[:, -k:]
+    scores = probabilities[rows, candidates]
+    order = np.argsort(-scores, axis=1)
+    return candidates[rows, order], scores[rows, order]
+
+
+def apply_temperature(probabilities: np.ndarray, temperature: float) -> np.ndarray:
+    """
+    Rescales softmax outputs as if their logits had been divided by a temperature.
+
+    The model ends in a softmax, so log(p) recovers the logits up to a per-row constant,
+    which the softmax cancels out. A temperature above 1 softens overconfident outputs;
+    the ranking of the classes never changes.
+
+    Args:
+        probabilities (np.ndarray): The (N, classes) model output.
+        temperature (float): The fitted temperature; 1 leaves the output unchanged.
+
+    Returns:
+        np.ndarray: The calibrated (N, classes) probabilities.
+    """
+    if temperature == 1.0:
+        return probabilities
+    logits = np.log(np.maximum(probabilities, _EPSILON)) / temperature
+    logits -= logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def negative_log_likelihood(probabilities: np.ndarray, targets: np.ndarray) -> float:
+    """
+    Returns the mean negative log-likelihood of the true classes.
+    """
+    return float(-np.mean(np.log(np.maximum(probabilities[np.arange(len(targets)), targets], _EPSILON))))
+
+
+def expected_calibration_error(probabilities: np.ndarray, targets: np.ndarray, bins: int = 15) -> float:
+    """
+    Returns the gap between confidence and accuracy, averaged over equal-width confidence bins.
+    """
+    confidences = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == targets
+    bin_index = np.minimum((confidences * bins).astype(int), bins - 1)
+    error = 0.0
+    for b in range(bins):
+        in_bin = bin_index == b
+        if in_bin.any():
+            error += in_bin.mean() * abs(confidences[in_bin].mean() - correct[in_bin].mean())
+    return float(error)
+
+
+def fit_temperature(probabilities: np.ndarray, targets: np.ndarray, low: float = 0.05,
+                    high: float = 20.0, iterations: int = 60) -> float:
+    """
+    Fits the temperature that minimizes the negative log-likelihood on a labeled set.
+
+    The likelihood is convex in the inverse temperature, so a golden-section search over it
+    finds the optimum without an optimizer dependency.
+
+    Args:
+        probabilities (np.ndarray): The (N, classes) model output on the labeled images.
+        targets (np.ndarray): The (N,) true class indices.
+        low (float): The smallest temperature considered.
+        high (float): The largest temperature considered.
+        iterations (int): Number of search steps.
+
+    Returns:
+        float: The fitted temperature.
+    """
+    def loss(inverse: float) -> float:
+        return negative_log_likelihood(apply_temperature(probabilities, 1.0 / inverse), targets)
+
+    ratio = (np.sqrt(5) - 1) / 2
+    a, b = 1.0 / high, 1.0 / low
+    c, d = b - ratio * (b - a), a + ratio * (b - a)
+    loss_c, loss_d = loss(c), loss(d)
+    for _ in range(iterations):
+        # Very small temperatures push the true class of every wrong answer below _EPSILON, where
+        # the loss is flat; on a tie keep the half with the higher temperatures.
+        if loss_c <= loss_d:
+            b, d, loss_d = d, c, loss_c
+            c = b - ratio * (b - a)
+            loss_c = loss(c)
+        else:
+            a, c, loss_c = c, d, loss_d
+            d = a + ratio * (b - a)
+            loss_d = loss(d)
+    return float(2.0 / (a + b))
+
+
+def load_temperature(path: Optional[str]) -> float:
+    """
+    Returns the temperature stored in a calibration file, or 1 if no file is configured.
+
+    The file is re-read only when its modification time changes.
+
+    Args:
+        path (str, optional): Path to the JSON file written by scripts.fit_calibration.
+    """
+    if not path:
+        return 1.0
+    mtime = os.path.getmtime(path)
+    cached = _calibration.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _calibration_lock:
+        with open(path, 'r') as f:
+            temperature = float(json.load(f)['temperature'])
+        _calibration[path] = (mtime, temperature)
+    return temperature
+
+
+def format_predictions(predictions: np.ndarray, labels: Sequence[str], k: int,
+                       temperature: float = 1.0) -> List[Dict[str, Any]]:
+    """
+    Turns a batch output into the breed, confidence and top-k alternatives of every image.
+
+    Args:
+        predictions (np.ndarray): The (N, classes) model output.
+        labels (Sequence[str]): The label of each class index.
+        k (int): The number of alternatives to return per image.
+        temperature (float): The calibration temperature applied before ranking.
+
+    Returns:
+        list: One {'breed', 'confidence', 'top_k'} dict per image, with confidences in percent.
+    """
+    classes, scores = top_k(apply_temperature(predictions, temperature), k)
+    percentages = np.round(scores.astype(np.float64) * 100, 2).tolist()
+    results = []
+    for row_classes, row_percentages in zip(classes.tolist(), percentages):
+        alternatives = [{'breed': labels[c], 'confidence': p} for c, p in zip(row_classes, row_percentages)]
+        results.append({
+            'breed': alternatives[0]['breed'],
+            'confidence': alternatives[0]['confidence'],
+            'top_k': alternatives
+        })
+    return results
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+from src.utils.stats import register_stats_provider
+
+
+class LRUCache:
+    """
+    A thread-safe in-process LRU cache whose entries also expire after a TTL.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    A cache stored in a SQLite file, shared by every worker process on the same host.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600, table: str = "prediction_cache") -> None:
+        self.path = path
+        self.ttl = ttl
+        self.table = table
+        self._local = threading.local()
+        self._writes = 0
+        with self._connection() as connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connection().execute(
+            f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any) -> None:
+        with self._connection() as connection:
+            connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + self.ttl)
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                connection.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, key: str) -> None:
+        with self._connection() as connection:
+            connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+
+class RedisCache:
+    """
+    A cache stored in a Redis-compatible server, shared by every worker that can reach it.
+    """
+
+    def __init__(self, url: str, ttl: float = 3600, prefix: str = "prediction:") -> None:
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any) -> None:
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(self.ttl))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+
+def create_shared_cache(url: str, ttl: float, namespace: str = "prediction") -> Any:
+    """
+    Builds the shared cache tier from a 'sqlite:///<path>' or 'redis://...' URL.
+
+    The namespace keeps caches sharing a URL apart: it names the SQLite table and
+    prefixes the Redis keys.
+
+    Raises:
+        ValueError: If the URL scheme is not supported.
+    """
+    scheme = urlparse(url).scheme
+    if scheme == 'sqlite':
+        return SQLiteCache(url[len('sqlite:///'):], ttl, f"{namespace}_cache")
+    if scheme in ('redis', 'rediss'):
+        return RedisCache(url, ttl, f"{namespace}:")
+    raise ValueError(f"Unsupported prediction cache URL: {url}")
+
+
+class PredictionCache:
+    """
+    Caches prediction results by a hash of the uploaded image bytes and the model version.
+
+    Lookups go to an in-process LRU first and then, if configured, to a shared tier so
+    that every worker benefits from a prediction made by any of them.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600, shared: Optional[Any] = None) -> None:
+        self.memory = LRUCache(max_entries, ttl)
+        self.shared = shared
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared_errors = 0
+
+    @staticmethod
+    def make_key(data: bytes, model_version: str, top_k: int, temperature: float = 1.0) -> str:
+        """
+        Builds the cache key for an image under a given model version.
+
+        The cached value is the calibrated top-k output, so the calibration temperature and k
+        are part of the key: a new calibration or PREDICT_TOP_K never serves stale confidences.
+        """
+        return f"{model_version}:t={temperature!r}:k={top_k}:{hashlib.sha256(data).hexdigest()}"
+
+    def get(self, key: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Looks up a prediction.
+
+        Returns:
+            tuple: The cached prediction (or None) and where it was found: 'memory', 'shared' or 'miss'.
+        """
+        value = self.memory.get(key)
+        if value is not None:
+            self._count('memory_hits')
+            return value, 'memory'
+
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception:
+                self._count('shared_errors')
+                value = None
+            if value is not None:
+                self.memory.set(key, value)
+                self._count('shared_hits')
+                return value, 'shared'
+
+        self._count('misses')
+        return None, 'miss'
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Stores a prediction in every tier.
+        """
+        self.memory.set(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value)
+            except Exception:
+                self._count('shared_errors')
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the hit/miss counters of each tier.
+        """
+        lookups = self.memory_hits + self.shared_hits + self.misses
+        return {
+            "entries": len(self.memory),
+            "shared": type(self.shared).__name__ if self.shared is not None else None,
+            "memory_hits": self.memory_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "shared_errors": self.shared_errors,
+            "hit_rate": (self.memory_hits + self.shared_hits) / lookups if lookups else 0.0,
+        }
+
+
+_prediction_cache: Optional[PredictionCache] = None
+_prediction_cache_lock = threading.Lock()
+
+
+def get_prediction_cache() -> Optional[PredictionCache]:
+    """
+    Returns the process-wide prediction cache, or None if PREDICTION_CACHE is disabled.
+    """
+    global _prediction_cache
+    config = current_app.config
+    if not config.get('PREDICTION_CACHE', False):
+        return None
+    if _prediction_cache is None:
+        with _prediction_cache_lock:
+            if _prediction_cache is None:
+                ttl = config.get('PREDICTION_CACHE_TTL', 3600)
+                shared_url = config.get('PREDICTION_CACHE_SHARED_URL')
+                _prediction_cache = PredictionCache(
+                    max_entries=config.get('PREDICTION_CACHE_MAX_ENTRIES', 10000),
+                    ttl=ttl,
+                    shared=create_shared_cache(shared_url, ttl) if shared_url else None
+                )
+    return _prediction_cache
+
+
+def prediction_cache_stats() -> Optional[Dict[str, Any]]:
+    """
+    Returns the prediction cache metrics, or None if the cache has not been used.
+    """
+    return _prediction_cache.stats() if _prediction_cache is not None else None
+
+
+register_stats_provider('prediction_cache', prediction_cache_stats)
@@ -1,24 +1,126 @@
 import numpy as np
+import threading
 from PIL import Image
+from typing import Optional, Sequence
 
-def preprocess_image(image: Image) -> np.ndarray:
+IMAGE_SIZE = (224, 224)
+_SCALE = np.float32(1.0 / 255.0)
+_buffers = threading.local()
+
+
+def decode_image(image: Image.Image) -> Image.Image:
+    """
+    Decodes an opened image, at reduced size for JPEGs (see prepare_image).
+
+    Calling it before prepare_image is optional; it lets the decode be timed on its own.
+    """
+    if image.format == 'JPEG':
+        image.draft('RGB', IMAGE_SIZE)
+    image.load()
+    return image
+
+
+def prepare_image(image: Image.Image) -> Image.Image:
+    """
+    Decodes, converts and resizes an image to the model's input size.
+
+    For JPEGs, PIL's draft mode is used so the decoder itself downscales by 1/2, 1/4 or 1/8
+    (while staying above the target size), which avoids decoding every pixel of large photos.
+    The image is converted to RGB once, so RGBA, grayscale, palette and CMYK inputs all end
+    up with three channels.
+
+    Args:
+        image (PIL.Image.Image): The input image, ideally not loaded yet.
+
+    Returns:
+        PIL.Image.Image: A 224x224 RGB image.
+    """
+    image = decode_image(image)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    if image.size != IMAGE_SIZE:
+        image = image.resize(IMAGE_SIZE)
+    return image
+
+
+def preprocess_into(image: Image.Image, out: np.ndarray) -> None:
+    """
+    Preprocesses an image and writes the normalized pixels into an existing float32 array.
+
+    Args:
+        image (PIL.Image.Image): The input image to be preprocessed.
+        out (np.ndarray): A float32 array of shape (224, 224, 3), e.g. one slot of a batch buffer.
+    """
+    normalize_into(np.asarray(prepare_image(image), dtype=np.uint8), out)
+
+
+def normalize_into(pixels: np.ndarray, out: np.ndarray) -> None:
+    """
+    Writes prepared uint8 pixels into a float32 array, normalized to the range [0, 1].
+
+    Lets the decoding and resizing (prepare_image) run elsewhere, e.g. in a process pool,
+    and only the cheap normalization happen where the batch is assembled.
+
+    Args:
+        pixels (np.ndarray): A uint8 array of shape (224, 224, 3).
+        out (np.ndarray): A float32 array of the same shape, e.g. one slot of a batch buffer.
+    """
+    np.multiply(pixels, _SCALE, out=out)
+
+
+def get_batch_buffer(size: int) -> np.ndarray:
+    """
+    Returns a float32 batch buffer owned by the calling thread, reused across requests.
+
+    The buffer is only grown when a larger batch is requested. Its content is overwritten by
+    the next call from the same thread, so it must be consumed before the thread moves on.
+
+    Args:
+        size (int): The number of images the buffer must hold.
+
+    Returns:
+        np.ndarray: A view of shape (size, 224, 224, 3).
+    """
+    buffer = getattr(_buffers, 'batch', None)
+    if buffer is None or len(buffer) < size:
+        buffer = np.empty((size, IMAGE_SIZE[1], IMAGE_SIZE[0], 3), dtype=np.float32)
+        _buffers.batch = buffer
+    return buffer[:size]
+
+
+def preprocess_batch(images: Sequence[Image.Image], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Preprocesses several images into a single model input batch.
+
+    Args:
+        images (Sequence[PIL.Image.Image]): The input images to be preprocessed.
+        out (np.ndarray, optional): A float32 array of shape (N, 224, 224, 3) to write into.
+            A new array is allocated if omitted.
+
+    Returns:
+        np.ndarray: The preprocessed images as a float32 array with shape (N, 224, 224, 3).
+    """
+    if out is None:
+        out = np.empty((len(images), IMAGE_SIZE[1], IMAGE_SIZE[0], 3), dtype=np.float32)
+    for index, image in enumerate(images):
+        preprocess_into(image, out[index])
+    return out
+
+
+def preprocess_image(image: Image.Image, out: Optional[np.ndarray] = None) -> np.ndarray:
     """
     Preprocesses an input image for model input.
-    
-    This function resizes the image, converts it to a NumPy array, 
-    adds an extra dimension to match the model's expected input shape, 
-    and normalizes the pixel values to the range [0, 1].
+
+    This function converts the image to RGB, resizes it, and writes the pixel values
+    normalized to the range [0, 1] into a float32 array with an extra batch dimension
+    to match the model's expected input shape.
 
     Args:
         image (PIL.Image.Image): The input image to be preprocessed.
+        out (np.ndarray, optional): A float32 array of shape (1, 224, 224, 3) to write into,
+            such as get_batch_buffer(1). A new array is allocated if omitted.
 
     Returns:
         np.ndarray: The preprocessed image as a NumPy array with shape (1, 224, 224, 3).
     """
-    
-    img = image.resize((224, 224))
-    img_array = np.array(img)
-    img_array = np.expand_dims(img_array, axis=0)
-    img_array = img_array / 255.0
-    
-    return img_array
+    return preprocess_batch([image], out)
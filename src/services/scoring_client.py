@@ -0,0 +1,175 @@
+import base64
+import io
+import json
+import random
+import threading
+import time
+import requests
+from PIL import Image
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from src.services.preprocess_model import prepare_image
+from src.utils.stats import register_stats_provider
+from src.utils.upload_spool import BufferReader
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class ScoringError(Exception):
+    """
+    Raised when the Azure ML endpoint cannot score a request after all retries.
+    """
+
+
+class AzureMLScoringClient:
+    """
+    Client for the Azure ML scoring endpoint that keeps its connections alive between requests.
+
+    A single requests.Session with a sized connection pool is shared by every request, so
+    TCP and TLS handshakes are only paid when the pool grows. Failed calls are retried with
+    jittered exponential backoff, images can be downscaled to the model's input size before
+    upload, and several images can be scored in one call.
+    """
+
+    def __init__(self, url: str, token: str, connect_timeout: float = 5, read_timeout: float = 30,
+                 max_retries: int = 3, retry_backoff: float = 0.2, pool_size: int = 20,
+                 resize: bool = False) -> None:
+        """
+        Args:
+            url (str): The scoring URL.
+            token (str): The bearer token for the endpoint.
+            connect_timeout (float): Seconds to wait for a connection.
+            read_timeout (float): Seconds to wait for the scoring response.
+            max_retries (int): Number of retries after a failed call.
+            retry_backoff (float): Base delay in seconds, doubled after every failed call.
+            pool_size (int): Maximum number of kept-alive connections.
+            resize (bool): Downscale images to 224x224 JPEGs before upload.
+        """
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.resize = resize
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {token}"
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._stats_lock = threading.Lock()
+        self._calls = 0
+        self._retries = 0
+        self._failures = 0
+        self._bytes_sent = 0
+
+    def encode_image(self, data: Any) -> str:
+        """
+        Base64-encodes an image (bytes or a memoryview) for the JSON payload, downscaling it
+        first if resize is enabled.
+        """
+        if self.resize:
+            buffer = io.BytesIO()
+            prepare_image(Image.open(BufferReader(memoryview(data)))).save(buffer, format='JPEG', quality=90)
+            data = buffer.getvalue()
+        return base64.b64encode(data).decode('utf-8')
+
+    def _post(self, payload: Dict[str, Any]) -> Any:
+        body = json.dumps(payload)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(self.url, data=body, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    with self._stats_lock:
+                        self._calls += 1
+                        self._bytes_sent += len(body)
+                    result = response.json()
+                    # The scoring script returns its result as a JSON-encoded string.
+                    return json.loads(result) if isinstance(result, str) else result
+                error = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            except requests.HTTPError as e:
+                with self._stats_lock:
+                    self._failures += 1
+                raise ScoringError(str(e))
+
+            if attempt < self.max_retries:
+                with self._stats_lock:
+                    self._retries += 1
+                time.sleep(self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+        with self._stats_lock:
+            self._failures += 1
+        raise ScoringError(f"Scoring failed after {self.max_retries + 1} attempts: {error}")
+
+    def score(self, data: Any) -> Tuple[str, float]:
+        """
+        Scores one image.
+
+        Returns:
+            tuple: The predicted breed and its confidence.
+        """
+        prediction = self._post({"data": self.encode_image(data)})
+        return prediction.get('breed'), prediction.get('confidence')
+
+    def score_batch(self, images: Sequence[Any]) -> List[Tuple[str, float]]:
+        """
+        Scores several images in a single call. The endpoint receives a list under "data"
+        and answers with a list of predictions in the same order.
+
+        Returns:
+            list: The predicted breed and confidence of each image.
+        """
+        predictions = self._post({"data": [self.encode_image(data) for data in images]})
+        return [(prediction.get('breed'), prediction.get('confidence')) for prediction in predictions]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the call, retry and failure counters and the bytes sent.
+        """
+        with self._stats_lock:
+            return {
+                "calls": self._calls,
+                "retries": self._retries,
+                "failures": self._failures,
+                "bytes_sent": self._bytes_sent,
+            }
+
+
+_scoring_client: Optional[AzureMLScoringClient] = None
+_scoring_client_lock = threading.Lock()
+
+
+def get_scoring_client(config: Optional[Any] = None) -> AzureMLScoringClient:
+    """
+    Returns the process-wide scoring client, creating it from the app config on first use.
+    """
+    global _scoring_client
+    if _scoring_client is None:
+        config = config if config is not None else current_app.config
+        with _scoring_client_lock:
+            if _scoring_client is None:
+                _scoring_client = AzureMLScoringClient(
+                    config['AZURE_ML_URL'],
+                    config['AZURE_ML_TOKEN'],
+                    connect_timeout=config.get('AZURE_ML_CONNECT_TIMEOUT', 5),
+                    read_timeout=config.get('AZURE_ML_TIMEOUT', 30),
+                    max_retries=config.get('AZURE_ML_MAX_RETRIES', 3),
+                    pool_size=config.get('AZURE_ML_POOL_SIZE', 20),
+                    resize=config.get('AZURE_ML_RESIZE', False)
+                )
+    return _scoring_client
+
+
+def scoring_client_stats() -> Optional[Dict[str, Any]]:
+    """
+    Returns the scoring client metrics, or None if no scoring call has been made.
+    """
+    return _scoring_client.stats() if _scoring_client is not None else None
+
+
+register_stats_provider('scoring_client', scoring_client_stats)
@@ -0,0 +1,306 @@
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from uuid import uuid4
+from azure.core.exceptions import AzureError
+from flask import current_app
+from src.services.azure_storage_connection import AzureBlobStorage
+from src.services.blob_storage import get_blob_storage
+from src.utils.metrics import timed
+from src.utils.stats import register_stats_provider
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _UploadJob:
+    """
+    Image bytes and the metadata needed to store them under '<folder>/<uuid>_<name>.<ext>'.
+    """
+
+    __slots__ = ("data", "folder_name", "blob_name", "content_type", "enqueued_at")
+
+    def __init__(self, data: bytes, folder_name: str, blob_name: str, content_type: str,
+                 enqueued_at: Optional[float] = None) -> None:
+        self.data = data
+        self.folder_name = folder_name
+        self.blob_name = blob_name
+        self.content_type = content_type
+        self.enqueued_at = enqueued_at if enqueued_at is not None else time.time()
+
+
+class BackgroundUploader:
+    """
+    Uploads images to Blob Storage from a pool of worker threads, off the request path.
+
+    Requests enqueue the image bytes and return immediately. The workers share one
+    long-lived AzureBlobStorage client and retry failed uploads with exponential backoff.
+    When the in-memory queue is full, jobs are spilled to a directory on disk and picked up
+    once the workers catch up, so a burst never blocks a request or drops an image. Jobs
+    still on disk when the process exits are uploaded by the next process.
+    """
+
+    def __init__(self, blob_storage: AzureBlobStorage, container_name: str, workers: int = 2,
+                 queue_size: int = 100, max_retries: int = 3, retry_backoff: float = 0.5,
+                 spill_dir: Optional[str] = None) -> None:
+        """
+        Args:
+            blob_storage (AzureBlobStorage): The client shared by every worker, or a
+                LocalBlobStorage to work offline.
+            container_name (str): The container images are uploaded to.
+            workers (int): Number of upload threads.
+            queue_size (int): Number of jobs held in memory before spilling to disk.
+            max_retries (int): Number of retries after a failed upload attempt.
+            retry_backoff (float): Base delay in seconds, doubled after every failed attempt.
+            spill_dir (str, optional): Directory for jobs that do not fit in memory.
+                If omitted, enqueue() rejects jobs when the queue is full.
+        """
+        self.blob_storage = blob_storage
+        self.container_name = container_name
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._queue: "queue.Queue[_UploadJob]" = queue.Queue(maxsize=queue_size)
+        self._closed = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._uploaded = 0
+        self._failed = 0
+        self._retries = 0
+        self._spilled = 0
+        self._rejected = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"blob-uploader-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def enqueue(self, data: bytes, folder_name: str, blob_name: str, content_type: str) -> bool:
+        """
+        Schedules an image upload without waiting for it.
+
+        Returns:
+            bool: False if the job could neither be queued nor spilled to disk.
+        """
+        job = _UploadJob(data, folder_name, blob_name, content_type)
+        if not self._closed.is_set():
+            try:
+                self._queue.put_nowait(job)
+                return True
+            except queue.Full:
+                pass
+
+        if self.spill_dir and self._spill(job):
+            return True
+
+        self._count('_rejected')
+        logger.warning("Upload queue full, dropping image for '%s'", folder_name)
+        return False
+
+    def enqueue_many(self, uploads: Sequence[Tuple[bytes, str, str, str]]) -> List[bool]:
+        """
+        Schedules the uploads of a batch of images at once, so the workers store them in parallel.
+
+        Args:
+            uploads (Sequence[tuple]): (data, folder_name, blob_name, content_type) for each image.
+
+        Returns:
+            List[bool]: For each image, False if it could neither be queued nor spilled to disk.
+        """
+        return [self.enqueue(*upload) for upload in uploads]
+
+    def _spill(self, job: _UploadJob) -> bool:
+        name = f"{time.time():.6f}_{uuid4().hex}"
+        data_path = os.path.join(self.spill_dir, f"{name}.bin")
+        meta_path = os.path.join(self.spill_dir, f"{name}.json")
+        try:
+            with open(data_path, 'wb') as f:
+                f.write(job.data)
+            # The metadata file is renamed into place last, so workers never see a partial job.
+            with open(meta_path + '.tmp', 'w') as f:
+                json.dump({
+                    "folder_name": job.folder_name,
+                    "blob_name": job.blob_name,
+                    "content_type": job.content_type,
+                    "enqueued_at": job.enqueued_at,
+                }, f)
+            os.replace(meta_path + '.tmp', meta_path)
+        except OSError:
+            logger.exception("Could not spill upload job to '%s'", self.spill_dir)
+            return False
+        self._count('_spilled')
+        return True
+
+    def _spilled_jobs(self) -> List[str]:
+        if not self.spill_dir:
+            return []
+        try:
+            return sorted(name for name in os.listdir(self.spill_dir) if name.endswith('.json'))
+        except OSError:
+            return []
+
+    def _take_spilled(self) -> Optional[_UploadJob]:
+        for name in self._spilled_jobs():
+            meta_path = os.path.join(self.spill_dir, name)
+            claimed_path = meta_path + '.claimed'
+            try:
+                # Renaming claims the job atomically when several workers look at once.
+                os.rename(meta_path, claimed_path)
+            except OSError:
+                continue
+            data_path = meta_path[:-len('.json')] + '.bin'
+            try:
+                with open(claimed_path) as f:
+                    meta = json.load(f)
+                with open(data_path, 'rb') as f:
+                    data = f.read()
+            except (OSError, ValueError):
+                logger.exception("Discarding unreadable spilled upload '%s'", name)
+                continue
+            finally:
+                for path in (claimed_path, data_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            return _UploadJob(data, meta['folder_name'], meta['blob_name'], meta['content_type'], meta['enqueued_at'])
+        return None
+
+    def _run(self) -> None:
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                job = self._take_spilled()
+                if job is None:
+                    if self._closed.is_set():
+                        return
+                    try:
+                        job = self._queue.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+            try:
+                self._upload(job)
+            except Exception:
+                self._count('_failed')
+                logger.exception("Upload job for '%s' failed", job.folder_name)
+
+    def _upload(self, job: _UploadJob) -> None:
+        try:
+            blob_name = AzureBlobStorage.image_blob_name(job.folder_name, job.blob_name, job.content_type)
+        except ValueError as e:
+            self._count('_failed')
+            logger.warning("Not uploading image for '%s': %s", job.folder_name, e)
+            return
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                with timed('blob_upload'):
+                    self.blob_storage.upload_blob(self.container_name, blob_name, job.data, job.content_type)
+            except (AzureError, OSError) as e:
+                if attempt == self.max_retries:
+                    self._count('_failed')
+                    logger.error("Giving up on upload of '%s' after %d attempts: %s", blob_name, attempt + 1, e)
+                    return
+                self._count('_retries')
+                time.sleep(self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+                continue
+            except Exception:
+                # Not worth retrying (e.g. an invalid blob name), but must not kill the worker thread.
+                self._count('_failed')
+                logger.exception("Upload of '%s' failed", blob_name)
+                return
+
+            latency = time.time() - job.enqueued_at
+            with self._stats_lock:
+                self._uploaded += 1
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+            return
+
+    def _count(self, counter: str) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def shutdown(self, timeout: Optional[float] = 30.0) -> None:
+        """
+        Stops accepting jobs into memory and waits for the queued and spilled jobs to finish.
+
+        Jobs enqueued after shutdown are spilled to disk for the next process.
+        """
+        self._closed.set()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the queue depth, upload latency and failure counts.
+        """
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "spilled_depth": len(self._spilled_jobs()),
+                "uploaded": self._uploaded,
+                "failed": self._failed,
+                "retries": self._retries,
+                "spilled": self._spilled,
+                "rejected": self._rejected,
+                "avg_latency_ms": 1000.0 * self._latency_total / self._uploaded if self._uploaded else 0.0,
+                "max_latency_ms": 1000.0 * self._latency_max,
+            }
+
+
+_uploader: Optional[BackgroundUploader] = None
+_uploader_lock = threading.Lock()
+
+
+def get_uploader(config: Optional[Any] = None) -> BackgroundUploader:
+    """
+    Returns the process-wide background uploader, creating it from the app config on first use.
+
+    Args:
+        config (Mapping, optional): Settings to use instead of the Flask app's config.
+
+    Returns:
+        BackgroundUploader: The uploader serving this process.
+    """
+    global _uploader
+    if _uploader is None:
+        config = config if config is not None else current_app.config
+        with _uploader_lock:
+            if _uploader is None:
+                _uploader = BackgroundUploader(
+                    get_blob_storage(config),
+                    config['CONTAINER_NAME'],
+                    workers=config.get('UPLOAD_WORKERS', 2),
+                    queue_size=config.get('UPLOAD_QUEUE_SIZE', 100),
+                    max_retries=config.get('UPLOAD_MAX_RETRIES', 3),
+                    spill_dir=config.get('UPLOAD_SPILL_DIR')
+                )
+    return _uploader
+
+
+def uploader_stats() -> Optional[Dict[str, Any]]:
+    """
+    Returns the background uploader metrics, or None if nothing has been uploaded yet.
+    """
+    return _uploader.stats() if _uploader is not None else None
+
+
+def shutdown_uploader() -> None:
+    """
+    Drains the background uploader, if one was started. Registered to run at process exit.
+    """
+    if _uploader is not None:
+        _uploader.shutdown()
+
+
+register_stats_provider('uploads', uploader_stats)
@@ -0,0 +1,85 @@
+import logging
+import random
+import time
+from flask import Flask, Response, g, request
+from flask_jwt_extended import JWTManager
+from flask_jwt_extended.default_callbacks import default_decode_key_callback, default_token_verification_callback
+from typing import Any
+from src.utils.metrics import record_stage, request_seconds, server_timing_header
+
+request_logger = logging.getLogger('src.requests')
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through a random fraction of the records below WARNING, and every record at or above it.
+    """
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+def configure_logging(config: Any) -> None:
+    """
+    Sets the log level and format, unless the server (e.g. gunicorn) already configured logging.
+
+    Per-request log lines are sampled at LOG_SAMPLE_RATE; slow and failed requests are
+    always logged, at WARNING.
+    """
+    root = logging.getLogger()
+    if not root.handlers:
+        logging.basicConfig(format="%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s")
+    root.setLevel(config.get('LOG_LEVEL', 'INFO'))
+    for existing in [f for f in request_logger.filters if isinstance(f, SamplingFilter)]:
+        request_logger.removeFilter(existing)
+    request_logger.addFilter(SamplingFilter(config.get('LOG_SAMPLE_RATE', 0.01)))
+
+
+def instrument_app(app: Flask, jwt: JWTManager) -> None:
+    """
+    Times every request and its JWT verification, logs a sampled line per request and, when
+    SERVER_TIMING is enabled (the default in debug), returns the stage timings in a
+    Server-Timing header.
+    """
+    server_timing = app.config.get('SERVER_TIMING', app.config.get('DEBUG', False))
+    slow_seconds = app.config.get('LOG_SLOW_REQUEST_MS', 1000) / 1000.0
+
+    @jwt.decode_key_loader
+    def decode_key(jwt_header: dict, jwt_data: dict) -> str:
+        g.jwt_started = time.perf_counter()
+        return default_decode_key_callback(jwt_header, jwt_data)
+
+    @jwt.token_verification_loader
+    def verify_token(jwt_header: dict, jwt_data: dict) -> bool:
+        started = g.pop('jwt_started', None)
+        if started is not None:
+            record_stage('jwt', time.perf_counter() - started)
+        return default_token_verification_callback(jwt_header, jwt_data)
+
+    @app.before_request
+    def start_timer() -> None:
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response: Response) -> Response:
+        started = g.get('request_started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or 'unmatched'
+        request_seconds.observe(elapsed, request.method, endpoint, str(response.status_code))
+
+        if server_timing:
+            header = server_timing_header(elapsed)
+            if header:
+                response.headers['Server-Timing'] = header
+
+        level = logging.WARNING if elapsed > slow_seconds or response.status_code >= 500 else logging.INFO
+        if request_logger.isEnabledFor(level):
+            request_logger.log(level, "%s %s %s %.1fms %s", request.method, request.path, response.status_code,
+                               elapsed * 1000, server_timing_header() or '')
+        return response
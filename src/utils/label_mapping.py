@@ -1,8 +1,143 @@
 from flask import current_app
 import json
+import os
+import threading
+import time
 from urllib.parse import urlparse
 from src.services.azure_storage_connection import AzureBlobStorage
-from typing import Dict
+from src.services.blob_storage import get_azure_blob_storage
+from src.utils.stats import register_stats_provider
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _parse_blob_url(url: str) -> Tuple[str, str]:
+    """
+    Splits a blob URL into its container name and blob name.
+    """
+    parsed_url = urlparse(url)
+    path_parts = parsed_url.path.lstrip('/').split('/', 1)
+    container_name = path_parts[0]
+    blob_name = path_parts[1] if len(path_parts) > 1 else ''
+    return container_name, blob_name
+
+
+def _to_label_array(label_mapping: Dict[str, str]) -> List[str]:
+    """
+    Converts a {"<class index>": "<label>"} mapping into a list indexed by class index.
+    """
+    labels = [''] * (max(int(key) for key in label_mapping) + 1) if label_mapping else []
+    for key, label in label_mapping.items():
+        labels[int(key)] = label
+    return labels
+
+
+class LabelMappingCache:
+    """
+    Caches the label mapping in memory and revalidates it against its source on a TTL.
+
+    The mapping is kept as a list indexed by class index so the output of np.argmax can be
+    used directly. Once the TTL expires, the blob's ETag (or the local file's mtime) is
+    checked and the mapping is only downloaded again if it changed.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._source: Optional[str] = None
+        self._version: Optional[Any] = None
+        self._labels: List[str] = []
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def get_labels(self, source: str, ttl: float, connection_string: Optional[str] = None) -> List[str]:
+        """
+        Returns the labels indexed by class index, loading or revalidating them if needed.
+
+        Args:
+            source (str): Local path or https:// blob URL of the label mapping JSON.
+            ttl (float): Number of seconds a loaded mapping is trusted before revalidation.
+            connection_string (str, optional): Azure Storage connection string for blob sources.
+
+        Returns:
+            list: The label for each class index.
+        """
+        if source == self._source and time.monotonic() - self._checked_at < ttl:
+            self.hits += 1
+            return self._labels
+
+        with self._lock:
+            if source == self._source and time.monotonic() - self._checked_at < ttl:
+                self.hits += 1
+                return self._labels
+
+            if source == self._source:
+                self.revalidations += 1
+                version = self._read_version(source, connection_string)
+                if version == self._version:
+                    self._checked_at = time.monotonic()
+                    self.hits += 1
+                    return self._labels
+            else:
+                version = self._read_version(source, connection_string)
+
+            self.misses += 1
+            self._labels = _to_label_array(self._read_mapping(source, connection_string))
+            self._source = source
+            self._version = version
+            self._checked_at = time.monotonic()
+            return self._labels
+
+    def _get_blob_storage(self, connection_string: str) -> AzureBlobStorage:
+        return get_azure_blob_storage(connection_string)
+
+    def _read_version(self, source: str, connection_string: Optional[str]) -> Any:
+        if source.startswith('https://'):
+            container_name, blob_name = _parse_blob_url(source)
+            return self._get_blob_storage(connection_string).get_blob_etag(container_name, blob_name)
+        return os.path.getmtime(source)
+
+    def _read_mapping(self, source: str, connection_string: Optional[str]) -> Dict[str, str]:
+        if source.startswith('https://'):
+            container_name, blob_name = _parse_blob_url(source)
+            return self._get_blob_storage(connection_string).download_json(container_name, blob_name)
+
+        # Local file path
+        with open(source, 'r') as f:
+            return json.load(f)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the cache hit/miss counters and the version of the cached mapping.
+        """
+        return {
+            "source": self._source,
+            "version": str(self._version) if self._version is not None else None,
+            "labels": len(self._labels),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+        }
+
+
+label_mapping_cache = LabelMappingCache()
+
+
+def get_labels() -> List[str]:
+    """
+    Returns the cached labels for the LABEL_MAPPING_PATH in the Flask app's config.
+
+    Returns:
+        list: The label for each class index, so labels[np.argmax(predictions)] is the predicted label.
+    """
+    config = current_app.config
+
+    return label_mapping_cache.get_labels(
+        config['LABEL_MAPPING_PATH'],
+        config.get('LABEL_MAPPING_TTL', 300),
+        config['AZURE_STORAGE_CONNECTION_STRING']
+    )
+
 
 def get_label_mapping() -> Dict[str, str]:
     """
@@ -11,20 +146,7 @@ def get_label_mapping() -> Dict[str, str]:
     Returns:
         dict: A dictionary with label mappings, where the key is the label (str) and the value is its corresponding mapping (str).
     """
-    config = current_app.config
+    return {str(index): label for index, label in enumerate(get_labels())}
 
 
-    if config['LABEL_MAPPING_PATH'].startswith('https://'):
-        parsed_url = urlparse(config['LABEL_MAPPING_PATH'])
-        path_parts = parsed_url.path.lstrip('/').split('/', 1)
-        container_name = path_parts[0]
-        blob_name = path_parts[1] if len(path_parts) > 1 else ''
-        
-        azure_blob_storage = AzureBlobStorage(config['AZURE_STORAGE_CONNECTION_STRING'])
-        label_mapping = azure_blob_storage.download_json(container_name, blob_name)
-    else:
-        # Local file path
-        with open(config['LABEL_MAPPING_PATH'], 'r') as f:
-            label_mapping = json.load(f)
-
-    return label_mapping
+register_stats_provider('label_mapping', label_mapping_cache.stats)
@@ -0,0 +1,159 @@
+import bisect
+import re
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_request_context
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from src.utils.stats import collect_stats
+
+PREFIX = "dog_breed"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    A Prometheus-style histogram: cumulative bucket counts, a sum and a count per label set.
+    """
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        Records a value for the given label values, in the order of label_names.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One count per bucket, then +Inf, sum and count.
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            label_text = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, labels))
+            separator = "," if label_text else ""
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{{{label_text}{separator}le="{le}"}} {cumulative:g}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {values[-2]!r}")
+            lines.append(f"{self.name}_count{{{label_text}}} {values[-1]:g}")
+        return lines
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+stage_seconds = Histogram(f"{PREFIX}_stage_seconds", "Time spent in each stage of request handling.", ["stage"])
+db_query_seconds = Histogram(f"{PREFIX}_db_query_seconds", "Time spent executing each kind of database query.", ["query"])
+request_seconds = Histogram(f"{PREFIX}_request_seconds", "Time from the start of a request to its response.",
+                            ["method", "endpoint", "status"])
+_histograms = [request_seconds, stage_seconds, db_query_seconds]
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """
+    Records a stage timing, and adds it to the current request's Server-Timing entries.
+    """
+    stage_seconds.observe(seconds, stage)
+    if has_request_context():
+        timings = g.setdefault('stage_timings', {})
+        total, count = timings.get(stage, (0.0, 0))
+        timings[stage] = (total + seconds, count + 1)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    Times the body of a with block as one stage, e.g. 'decode' or 'inference'.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+_QUERY_LABEL = re.compile(r"^\s*(\w+)(?:.*?\b(?:FROM|INTO|UPDATE|JOIN)\s+(\w+))?", re.IGNORECASE | re.DOTALL)
+
+
+@lru_cache(maxsize=256)
+def query_label(query: str) -> str:
+    """
+    Returns a low-cardinality label for a query, its verb and table: 'select users'.
+    """
+    match = _QUERY_LABEL.match(query)
+    if match is None:
+        return "other"
+    verb = match.group(1).lower()
+    table = match.group(2)
+    if verb == "update" and table is None:
+        table_match = re.match(r"^\s*update\s+(\w+)", query, re.IGNORECASE)
+        table = table_match.group(1) if table_match else None
+    return f"{verb} {table.lower()}" if table else verb
+
+
+def record_query(query: str, seconds: float) -> None:
+    db_query_seconds.observe(seconds, query_label(query))
+    record_stage("db", seconds)
+
+
+def server_timing_header(total_seconds: Optional[float] = None) -> Optional[str]:
+    """
+    Builds the Server-Timing header of the current request from the stages it went through.
+    """
+    timings = g.get('stage_timings', {})
+    entries = []
+    for stage, (seconds, count) in timings.items():
+        entry = f"{stage};dur={seconds * 1000:.2f}"
+        if count > 1:
+            entry += f';desc="{count}x"'
+        entries.append(entry)
+    if total_seconds is not None:
+        entries.append(f"total;dur={total_seconds * 1000:.2f}")
+    return ", ".join(entries) or None
+
+
+def _flatten(prefix: str, value: Any, out: Dict[str, float]) -> None:
+    if isinstance(value, (int, float)):
+        out[prefix] = float(value)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else str(key), item, out)
+
+
+def render_prometheus() -> str:
+    """
+    Renders the histograms and every numeric /status value in the Prometheus text format.
+
+    The /status values are exported as one gauge family, labelled by service and stat name.
+    """
+    lines: List[str] = []
+    for histogram in _histograms:
+        lines.extend(histogram.render())
+
+    gauge = f"{PREFIX}_service_stat"
+    lines += [f"# HELP {gauge} Numeric values reported by the services on /status.", f"# TYPE {gauge} gauge"]
+    for service, stats in collect_stats().items():
+        values: Dict[str, float] = {}
+        _flatten("", stats, values)
+        for stat, value in values.items():
+            lines.append(f'{gauge}{{service="{_escape(service)}",stat="{_escape(stat)}"}} {value!r}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict
+from src.utils.stats import register_stats_provider
+
+
+class RateLimiter:
+    """
+    An in-process sliding-window rate limiter: at most `limit` hits per key in any `window` seconds.
+
+    Only the most recently used `max_keys` keys are tracked, so a flood of distinct keys
+    cannot grow it without bound.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int = 100000) -> None:
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._hits: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def _recent(self, key: str, now: float) -> Deque[float]:
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = self._hits[key] = deque()
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+        else:
+            self._hits.move_to_end(key)
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        return hits
+
+    def retry_after(self, key: str) -> float:
+        """
+        Returns how many seconds to wait before the key may be hit again, 0 if it may be hit now.
+        """
+        if self.limit <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            hits = self._recent(key, now)
+            if len(hits) < self.limit:
+                return 0.0
+            self.limited += 1
+            return hits[0] + self.window - now
+
+    def hit(self, key: str) -> None:
+        """
+        Records a hit for the key.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._recent(key, now).append(now)
+
+    def acquire(self, key: str) -> float:
+        """
+        Records a hit for the key if it is under its limit.
+
+        Returns:
+            float: 0 if the hit was recorded, otherwise the seconds to wait before retrying.
+        """
+        if self.limit <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            hits = self._recent(key, now)
+            if len(hits) >= self.limit:
+                self.limited += 1
+                return hits[0] + self.window - now
+            hits.append(now)
+            return 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limit": self.limit, "window": self.window, "keys": len(self._hits), "limited": self.limited}
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, limit: int, window: float) -> RateLimiter:
+    """
+    Returns the process-wide rate limiter registered under name, creating it on first use.
+    """
+    limiter = _rate_limiters.get(name)
+    if limiter is None:
+        with _rate_limiters_lock:
+            limiter = _rate_limiters.setdefault(name, RateLimiter(limit, window))
+    return limiter
+
+
+def rate_limit_stats() -> Dict[str, Any]:
+    """
+    Returns the metrics of every rate limiter in use, keyed by name.
+    """
+    return {name: limiter.stats() for name, limiter in _rate_limiters.items()}
+
+
+register_stats_provider('rate_limits', rate_limit_stats)
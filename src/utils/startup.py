@@ -0,0 +1,51 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from src.utils.stats import register_stats_provider
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """
+    Records how long each import and initialization phase of the app startup takes.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.phases: List[Dict[str, Any]] = []
+        self.role: Optional[str] = None
+        self.total_seconds: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Times the body of the with-block as the given phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({"phase": name, "seconds": round(time.perf_counter() - start, 4)})
+
+    def finish(self, role: str) -> None:
+        """
+        Closes the report and logs it, slowest phase first.
+        """
+        self.role = role
+        self.total_seconds = round(time.perf_counter() - self.started_at, 4)
+        slowest = ", ".join(f"{phase['phase']}={phase['seconds']:.3f}s"
+                            for phase in sorted(self.phases, key=lambda phase: -phase['seconds']))
+        logger.info("Started %s role in %.3fs: %s", role, self.total_seconds, slowest)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Returns the process role, the total startup time and the time of each phase.
+        """
+        return {"role": self.role, "total_seconds": self.total_seconds, "phases": self.phases}
+
+
+startup_timer = StartupTimer()
+
+register_stats_provider('startup', startup_timer.report)
@@ -0,0 +1,27 @@
+from typing import Any, Callable, Dict
+
+_providers: Dict[str, Callable[[], Any]] = {}
+
+
+def register_stats_provider(name: str, provider: Callable[[], Any]) -> None:
+    """
+    Registers a function reporting the runtime stats of a service under the given name.
+
+    Services register themselves when their module is imported, so /status only reports
+    (and only imports) what the current process actually loaded.
+
+    Args:
+        name (str): The key the stats are reported under.
+        provider (callable): Returns a JSON-serializable value, or None if the service is idle.
+    """
+    _providers[name] = provider
+
+
+def collect_stats() -> Dict[str, Any]:
+    """
+    Calls every registered stats provider.
+
+    Returns:
+        dict: The stats of each service, keyed by the name it was registered under.
+    """
+    return {name: provider() for name, provider in _providers.items()}
@@ -0,0 +1,169 @@
+import io
+import mmap
+import os
+import tempfile
+import threading
+from flask import Request, current_app
+from typing import Any, Dict, IO, Optional
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+from src.utils.stats import register_stats_provider
+
+
+class SpoolingRequest(Request):
+    """
+    Flask request class that spools uploaded files in memory up to UPLOAD_SPOOL_MEMORY_LIMIT
+    and in an anonymous temporary file above it (or when the size is not known up front).
+    """
+
+    def _get_file_stream(self, total_content_length: Optional[int], content_type: Optional[str],
+                         filename: Optional[str] = None, content_length: Optional[int] = None) -> IO[bytes]:
+        memory_limit = current_app.config.get('UPLOAD_SPOOL_MEMORY_LIMIT', 1024 * 1024)
+        if total_content_length is not None and total_content_length <= memory_limit:
+            return io.BytesIO()
+        return tempfile.TemporaryFile('wb+')
+
+
+class BufferReader(io.RawIOBase):
+    """
+    A read-only, seekable file object over a memoryview, for consumers that need a stream
+    (PIL, the blob client) without copying the whole buffer into a new bytes object.
+    """
+
+    def __init__(self, view: memoryview) -> None:
+        self._view = view.cast('B') if view.format != 'B' or view.ndim != 1 else view
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        count = min(len(buffer), len(self._view) - self._position)
+        if count <= 0:
+            return 0
+        memoryview(buffer).cast('B')[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return position
+
+    def tell(self) -> int:
+        return self._position
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+
+class SpooledUpload:
+    """
+    An uploaded file, held once and shared as zero-copy views.
+
+    Small uploads stay in the BytesIO they were parsed into, whose bytes are taken over without
+    copying; larger ones stay in their temporary file, which is memory-mapped. Either way the
+    view stays valid after the request ends, so it can be handed to the background uploader.
+    """
+
+    def __init__(self, view: memoryview, filename: Optional[str], content_type: Optional[str],
+                 on_disk: bool) -> None:
+        self.view = view
+        self.filename = filename
+        self.content_type = content_type
+        self.on_disk = on_disk
+        # The only copy: the request body parsed into the spool.
+        self.bytes_copied = len(view)
+
+    @classmethod
+    def from_file(cls, file: FileStorage, max_size: Optional[int] = None) -> "SpooledUpload":
+        """
+        Takes over the spooled stream of an uploaded file.
+
+        Raises:
+            RequestEntityTooLarge: If the file is larger than max_size.
+        """
+        stream = file.stream
+        if isinstance(stream, io.BytesIO):
+            view, on_disk = memoryview(stream.getvalue()), False
+        else:
+            stream.flush()
+            size = os.fstat(stream.fileno()).st_size
+            if size:
+                view, on_disk = memoryview(mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)), True
+            else:
+                view, on_disk = memoryview(b''), False
+
+        upload = cls(view, file.filename, file.content_type, on_disk)
+        record_upload(upload)
+        if max_size is not None and len(view) > max_size:
+            raise RequestEntityTooLarge(f"Image is larger than {max_size} bytes")
+        return upload
+
+    def open(self) -> BufferReader:
+        """
+        Returns a new file object reading the upload from the start.
+        """
+        return BufferReader(self.view)
+
+    def tobytes(self) -> bytes:
+        """
+        Copies the upload into a bytes object, for consumers that cannot take a view.
+        """
+        self.bytes_copied += len(self.view)
+        record_copy(len(self.view))
+        return self.view.tobytes()
+
+    def __len__(self) -> int:
+        return len(self.view)
+
+
+_stats_lock = threading.Lock()
+_uploads = 0
+_bytes_received = 0
+_bytes_copied = 0
+_on_disk = 0
+
+
+def record_upload(upload: SpooledUpload) -> None:
+    global _uploads, _bytes_received, _bytes_copied, _on_disk
+    with _stats_lock:
+        _uploads += 1
+        _bytes_received += len(upload)
+        _bytes_copied += upload.bytes_copied
+        _on_disk += int(upload.on_disk)
+
+
+def record_copy(size: int) -> None:
+    global _bytes_copied
+    with _stats_lock:
+        _bytes_copied += size
+
+
+def upload_spool_stats() -> Dict[str, Any]:
+    """
+    Returns how many uploads were spooled, how many went to disk, and the bytes copied per upload.
+    """
+    with _stats_lock:
+        return {
+            "uploads": _uploads,
+            "on_disk": _on_disk,
+            "bytes_received": _bytes_received,
+            "bytes_copied": _bytes_copied,
+            "bytes_copied_per_upload": _bytes_copied / _uploads if _uploads else 0.0,
+        }
+
+
+register_stats_provider('upload_spool', upload_spool_stats)
@@ -0,0 +1,91 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.upload_spool import SpoolingRequest  # noqa: E402
+
+# The tables the models read and write, as created by scripts.seed_users --create-tables.
+CREATE_TABLES = [
+    "CREATE TABLE users (userid TEXT PRIMARY KEY, email TEXT NOT NULL, upassword TEXT NOT NULL, "
+    "firstname TEXT, lastname TEXT, birthdate TEXT, country TEXT)",
+    "CREATE TABLE dogs (dogid TEXT NOT NULL, dogname TEXT, breed TEXT, age INTEGER, userid TEXT, imageurl TEXT)",
+]
+
+
+@pytest.fixture
+def make_app():
+    """
+    Builds a bare Flask app with JWT and the spooling request class, configured with the given settings.
+    """
+    def make(*blueprints, **config):
+        app = Flask(__name__)
+        app.request_class = SpoolingRequest
+        app.config.update(DEBUG=False, TESTING=True, JWT_SECRET_KEY='test-secret-key-that-is-long-enough', **config)
+        JWTManager(app)
+        for blueprint in blueprints:
+            app.register_blueprint(blueprint)
+        return app
+    return make
+
+
+@pytest.fixture
+def auth_header():
+    """
+    Returns the Authorization header of an access token for a user of an app.
+    """
+    def header(app, identity='user-1'):
+        with app.app_context():
+            return {'Authorization': f"Bearer {create_access_token(identity=identity)}"}
+    return header
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    """
+    A SQLite database with the users and dogs tables and no migrations applied.
+    """
+    path = str(tmp_path / 'app.db')
+    connection = sqlite3.connect(path)
+    for statement in CREATE_TABLES:
+        connection.execute(statement)
+    connection.commit()
+    connection.close()
+    return path
+
+
+@pytest.fixture
+def db_config(sqlite_path, tmp_path, monkeypatch):
+    """
+    Settings for the models to run on the SQLite database, with fresh process-wide services.
+    """
+    from src.models.dog_model import DogModel
+    from src.models.user_model import UserModel
+    from src.database.schema import MigrationProbe
+    import src.services.entity_cache as entity_cache
+    import src.services.password_hasher as password_hasher
+    import src.utils.rate_limit as rate_limit
+
+    monkeypatch.setattr(entity_cache, '_entity_caches', {})
+    monkeypatch.setattr(password_hasher, '_password_hasher', None)
+    monkeypatch.setattr(rate_limit, '_rate_limiters', {})
+    # Recheck the migrations on every call, so a test can apply one halfway through.
+    monkeypatch.setattr(UserModel, '_unique_email_index', MigrationProbe(UserModel._unique_email_index.version, 0))
+    monkeypatch.setattr(DogModel, '_thumbnails_column', MigrationProbe(DogModel._thumbnails_column.version, 0))
+    return {
+        'DB_ENGINE': 'sqlite',
+        'DB_HOST': '',
+        'DB_USER': '',
+        'DB_PASSWORD': '',
+        'DB_NAME': sqlite_path,
+        'ENTITY_CACHE': True,
+        'ENTITY_CACHE_SHARED_URL': '',
+        'ENTITY_CACHE_SQLITE_PATH': str(tmp_path / 'entity-cache.db'),
+        'PASSWORD_HASH_METHOD': 'pbkdf2',
+        'PASSWORD_PBKDF2_ITERATIONS': 1000,
+    }
@@ -0,0 +1,13 @@
+import pytest
+
+from src.database.async_database import _to_numbered_params
+
+
+@pytest.mark.parametrize('query, numbered', [
+    ("SELECT * FROM dogs", "SELECT * FROM dogs"),
+    ("SELECT * FROM dogs WHERE dogid = ?", "SELECT * FROM dogs WHERE dogid = $1"),
+    ("UPDATE users SET firstname = COALESCE(?, firstname), country = COALESCE(?, country) WHERE userid = ?",
+     "UPDATE users SET firstname = COALESCE($1, firstname), country = COALESCE($2, country) WHERE userid = $3"),
+])
+def test_to_numbered_params(query, numbered):
+    assert _to_numbered_params(query) == numbered
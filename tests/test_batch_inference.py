@@ -0,0 +1,114 @@
+import threading
+
+import numpy as np
+import pytest
+
+import src.models.prediction_models as prediction_models
+from src.services.batch_inference import MicroBatcher
+
+
+def _identity_model(calls):
+    def predict(images):
+        calls.append(len(images))
+        return images.reshape(len(images), -1)[:, :2] * 1.0
+    return predict
+
+
+def _images(count, value=0.0):
+    return np.full((count, 2, 1, 1), value, dtype=np.float32)
+
+
+def test_micro_batcher_splits_predictions_back_per_request():
+    calls = []
+    gate = threading.Event()
+
+    def predict(images):
+        gate.wait(5)
+        return _identity_model(calls)(images)
+
+    batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=200)
+    try:
+        # The first request is taken at once and blocks the model, so the next three queue up.
+        first = batcher.submit(_images(1, 0))
+        futures = [batcher.submit(_images(count, value)) for count, value in ((2, 1), (3, 2), (1, 3))]
+        gate.set()
+        assert first.result(5).shape == (1, 2)
+        for future, (count, value) in zip(futures, ((2, 1), (3, 2), (1, 3))):
+            result = future.result(5)
+            assert result.shape == (count, 2)
+            assert np.all(result == value)
+    finally:
+        batcher.close()
+    assert sum(calls) == 7
+    assert batcher.stats()['requests'] == 4
+
+
+def test_micro_batcher_keeps_requests_whole_and_carries_the_overflow():
+    calls = []
+    batcher = MicroBatcher(_identity_model(calls), max_batch_size=4, max_wait_ms=500)
+    try:
+        futures = [batcher.submit(_images(1)), batcher.submit(_images(3, 1)), batcher.submit(_images(3, 2))]
+        assert [future.result(5).shape[0] for future in futures] == [1, 3, 3]
+    finally:
+        batcher.close()
+    # The last request would overflow the first batch, so it starts the next one.
+    assert calls == [4, 3]
+
+
+def test_micro_batcher_fails_every_request_of_a_failed_batch():
+    def predict(images):
+        raise ValueError("model failed")
+
+    batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=1)
+    try:
+        with pytest.raises(ValueError, match="model failed"):
+            batcher.predict(_images(2), timeout=5)
+    finally:
+        batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(_images(1))
+
+
+class _FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, images):
+        self.calls += 1
+        return np.ones((len(images), 3))
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    model = _FakeModel()
+    monkeypatch.setattr(prediction_models.model_registry, 'get', lambda path, reload_interval=0: model)
+    monkeypatch.setattr(prediction_models, '_batcher', None)
+    monkeypatch.setattr(prediction_models, '_inference_pool', None)
+    yield model
+    if prediction_models._batcher is not None:
+        prediction_models._batcher.close()
+
+
+def test_submit_images_runs_inline_without_batching(fake_model):
+    future = prediction_models.submit_images(_images(2), {'MODEL_PATH': 'model.keras'})
+    assert future.done()
+    assert future.result().shape == (2, 3)
+    assert prediction_models._batcher is None
+    assert fake_model.calls == 1
+
+
+def test_submit_images_uses_the_batcher_when_enabled(fake_model):
+    config = {'MODEL_PATH': 'model.keras', 'INFERENCE_BATCHING': True, 'INFERENCE_MAX_WAIT_MS': 1}
+    assert prediction_models.submit_images(_images(2), config).result(5).shape == (2, 3)
+    assert prediction_models._batcher is not None
+    assert prediction_models._batcher.stats()['requests'] == 1
+
+
+def test_submit_images_reports_model_errors_on_the_future(monkeypatch, fake_model):
+    def fail(images):
+        raise RuntimeError("no model")
+
+    monkeypatch.setattr(fake_model, 'predict', fail)
+    future = prediction_models.submit_images(_images(1), {'MODEL_PATH': 'model.keras'})
+    with pytest.raises(RuntimeError, match="no model"):
+        future.result()
@@ -0,0 +1,155 @@
+import io
+from urllib.parse import urlsplit
+
+import pytest
+
+import src.services.direct_uploads as direct_uploads
+from src.models.entities.dogs import Dog
+from src.routes.local_blob_routes import local_blob_bp
+from src.services.direct_uploads import DirectUploadError, DirectUploads, dog_image_blob_name
+from src.services.local_blob_storage import LocalBlobStorage, UploadTooLarge
+
+DOG = Dog('dog-1', 'Rex', 'beagle', 3, 'user-1', None)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalBlobStorage(str(tmp_path / 'blobs'), 'http://localhost:5000/', 'blob-secret')
+
+
+@pytest.fixture
+def uploads(storage):
+    return DirectUploads(storage, 'dogs', 'token-secret', expires_in=600, max_bytes=1024)
+
+
+@pytest.mark.parametrize('container_name, blob_name', [
+    ('dogs', '../other/a.jpg'),
+    ('dogs', 'beagle/../../outside.jpg'),
+    ('dogs', '/etc/passwd'),
+    ('dogs', ''),
+    ('..', 'outside.jpg'),
+    ('.', 'dogs/a.jpg'),
+])
+def test_local_blob_paths_stay_in_their_container(storage, container_name, blob_name):
+    with pytest.raises(ValueError):
+        storage.path(container_name, blob_name)
+    assert storage.path('dogs', 'beagle/./a.jpg') == f"{storage.root}/dogs/beagle/a.jpg"
+
+
+def test_dog_image_blob_names_are_safe_paths():
+    name = dog_image_blob_name('../../etc', '../passwd.jpg')
+    folder, file = name.split('/')
+    assert folder == 'etc'
+    assert file.endswith('_passwd.jpg')
+    assert dog_image_blob_name('', '').startswith('unknown/')
+
+
+def test_upload_signatures_are_bound_to_blob_content_type_and_expiry(storage, monkeypatch):
+    query = dict(pair.split('=') for pair in
+                 urlsplit(storage.generate_upload_url('dogs', 'beagle/a.jpg', 'image/jpeg', 60)).query.split('&'))
+    assert storage.verify_upload('dogs', 'beagle/a.jpg', query['se'], query['sig'], 'image/jpeg')
+    assert not storage.verify_upload('dogs', 'beagle/b.jpg', query['se'], query['sig'], 'image/jpeg')
+    assert not storage.verify_upload('dogs', 'beagle/a.jpg', query['se'], query['sig'], 'image/png')
+    assert not storage.verify_upload('dogs', 'beagle/a.jpg', str(int(query['se']) + 1), query['sig'], 'image/jpeg')
+    assert not storage.verify_upload('dogs', 'beagle/a.jpg', 'soon', query['sig'], 'image/jpeg')
+    monkeypatch.setattr('src.services.local_blob_storage.time.time', lambda: int(query['se']) + 1)
+    assert not storage.verify_upload('dogs', 'beagle/a.jpg', query['se'], query['sig'], 'image/jpeg')
+
+
+def test_write_is_create_only_without_overwrite(storage):
+    assert storage.write('dogs', 'beagle/a.jpg', io.BytesIO(b'first'), 'image/jpeg', overwrite=False) == 5
+    with pytest.raises(FileExistsError):
+        storage.write('dogs', 'beagle/a.jpg', io.BytesIO(b'second'), 'image/jpeg', overwrite=False)
+    assert storage.download_bytes('dogs', 'beagle/a.jpg') == b'first'
+    storage.write('dogs', 'beagle/a.jpg', io.BytesIO(b'second'), 'image/png')
+    assert storage.blob_properties('dogs', 'beagle/a.jpg') == {'size': 6, 'content_type': 'image/png'}
+
+
+def test_write_rejects_oversized_bodies_without_storing_them(storage):
+    with pytest.raises(UploadTooLarge):
+        storage.write('dogs', 'beagle/a.jpg', io.BytesIO(b'x' * 100), 'image/jpeg', max_bytes=99)
+    assert storage.blob_properties('dogs', 'beagle/a.jpg') is None
+    assert list(storage.list_blobs('dogs')) == []
+
+
+def test_list_and_delete_blobs(storage):
+    for name in ('pug/b.jpg', 'beagle/a.jpg', 'beagle/c.jpg'):
+        storage.upload_blob('dogs', name, b'data', 'image/jpeg')
+    assert [blob['name'] for blob in storage.list_blobs('dogs')] == ['beagle/a.jpg', 'beagle/c.jpg', 'pug/b.jpg']
+    assert [blob['name'] for blob in storage.list_blobs('dogs', 'beagle/')] == ['beagle/a.jpg', 'beagle/c.jpg']
+    storage.delete_blob('dogs', 'beagle/a.jpg')
+    storage.delete_blob('dogs', 'beagle/a.jpg')
+    assert storage.blob_properties('dogs', 'beagle/a.jpg') is None
+
+
+def test_issue_and_complete_an_upload(uploads, storage):
+    grant = uploads.issue(DOG, 'rex.jpg', 'image/jpeg')
+    assert grant['blob_name'].startswith('beagle/')
+    with pytest.raises(DirectUploadError, match="not been uploaded"):
+        uploads.complete(DOG, grant['upload_token'])
+
+    storage.upload_blob('dogs', grant['blob_name'], b'jpeg bytes', 'image/jpeg')
+    blob_name, url = uploads.complete(DOG, grant['upload_token'])
+    assert blob_name == grant['blob_name']
+    assert url == f"http://localhost:5000/local_blobs/dogs/{blob_name}"
+    assert uploads.stats()['completed'] == 1
+
+
+def test_complete_rejects_tokens_for_other_dogs_and_forged_tokens(uploads, storage):
+    grant = uploads.issue(DOG, 'rex.jpg', 'image/jpeg')
+    storage.upload_blob('dogs', grant['blob_name'], b'jpeg bytes', 'image/jpeg')
+    with pytest.raises(DirectUploadError, match="another dog"):
+        uploads.complete(Dog('dog-2', 'Bella', 'pug', 2, 'user-1', None), grant['upload_token'])
+    with pytest.raises(DirectUploadError, match="Invalid upload token"):
+        uploads.complete(DOG, grant['upload_token'] + 'x')
+    with pytest.raises(DirectUploadError, match="Unsupported file type"):
+        uploads.issue(DOG, 'rex.gif', 'image/gif')
+
+
+@pytest.mark.parametrize('data, content_type, error', [
+    (b'x' * 2048, 'image/jpeg', 'larger than 1024 bytes'),
+    (b'png bytes', 'image/png', 'expected image/jpeg'),
+])
+def test_complete_deletes_oversized_or_mistyped_blobs(uploads, storage, data, content_type, error):
+    grant = uploads.issue(DOG, 'rex.jpg', 'image/jpeg')
+    storage.upload_blob('dogs', grant['blob_name'], data, content_type)
+    with pytest.raises(DirectUploadError, match=error):
+        uploads.complete(DOG, grant['upload_token'])
+    assert storage.blob_properties('dogs', grant['blob_name']) is None
+
+
+@pytest.fixture
+def blob_client(make_app, uploads, monkeypatch):
+    monkeypatch.setattr(direct_uploads, '_direct_uploads', uploads)
+    return make_app(local_blob_bp, UPLOAD_MAX_BYTES=1024).test_client()
+
+
+def _put(client, upload_url, data, content_type='image/jpeg'):
+    parts = urlsplit(upload_url)
+    return client.put(parts.path, query_string=parts.query, data=data, content_type=content_type)
+
+
+def test_put_to_a_signed_url_stores_the_blob_once(blob_client, uploads, storage):
+    grant = uploads.issue(DOG, 'rex.jpg', 'image/jpeg')
+    response = _put(blob_client, grant['upload_url'], b'jpeg bytes')
+    assert response.status_code == 201
+    assert response.get_json()['size'] == 10
+    assert _put(blob_client, grant['upload_url'], b'other bytes').status_code == 409
+    assert storage.download_bytes('dogs', grant['blob_name']) == b'jpeg bytes'
+
+    response = blob_client.get(urlsplit(grant['upload_url']).path)
+    assert response.status_code == 200
+    assert response.data == b'jpeg bytes'
+    assert response.mimetype == 'image/jpeg'
+
+
+def test_put_rejects_bad_signatures_and_oversized_bodies(blob_client, uploads, storage):
+    grant = uploads.issue(DOG, 'rex.jpg', 'image/jpeg')
+    assert _put(blob_client, grant['upload_url'], b'png bytes', 'image/png').status_code == 403
+    assert _put(blob_client, grant['upload_url'].replace('sig=', 'sig=0'), b'jpeg bytes').status_code == 403
+    assert _put(blob_client, grant['upload_url'], b'x' * 2048).status_code == 413
+    assert storage.blob_properties('dogs', grant['blob_name']) is None
+
+
+def test_get_outside_the_root_is_not_found(blob_client):
+    assert blob_client.get('/local_blobs/dogs/..%2F..%2Fsecret').status_code == 404
@@ -0,0 +1,82 @@
+import pytest
+
+from src.models.dog_model import DogModel
+from src.models.entities.dogs import Dog
+from src.services.entity_cache import EntityCache, get_entity_cache
+from src.services.prediction_cache import LRUCache, SQLiteCache
+
+
+def test_entity_cache_reads_through_once():
+    cache = EntityCache()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return {'name': 'Rex'}
+
+    assert cache.get('dog:1', load) == {'name': 'Rex'}
+    assert cache.get('dog:1', load) == {'name': 'Rex'}
+    assert len(loads) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entity_cache_does_not_cache_a_value_loaded_during_an_invalidation():
+    cache = EntityCache()
+
+    def stale_load():
+        # A write commits and invalidates while this read is still running.
+        cache.invalidate('dog:1')
+        return 'old'
+
+    assert cache.get('dog:1', stale_load) == 'old'
+    assert cache.get('dog:1', lambda: 'new') == 'new'
+
+
+def test_entity_cache_put_replaces_the_cached_value():
+    cache = EntityCache()
+    cache.get('user:1', lambda: 'old')
+    cache.put('user:1', 'new')
+    assert cache.get('user:1', lambda: pytest.fail("should be cached")) == 'new'
+
+
+def test_entity_cache_sees_invalidations_from_other_workers(tmp_path):
+    path = str(tmp_path / 'entities.db')
+    worker_a = EntityCache(shared=SQLiteCache(path, table='dogs_cache'))
+    worker_b = EntityCache(shared=SQLiteCache(path, table='dogs_cache'))
+
+    assert worker_b.get('dog:1', lambda: 'old') == 'old'
+    assert worker_a.get('dog:1', lambda: pytest.fail("should be cached")) == 'old'
+    worker_a.invalidate('dog:1')
+    assert worker_b.get('dog:1', lambda: 'new') == 'new'
+
+
+def test_get_entity_cache_defaults_to_the_sqlite_tier(make_app, db_config):
+    with make_app(**db_config).app_context():
+        cache = get_entity_cache('dogs')
+        assert isinstance(cache.store, SQLiteCache)
+        assert cache.store.path == db_config['ENTITY_CACHE_SQLITE_PATH']
+        assert get_entity_cache('dogs') is cache
+
+
+def test_get_entity_cache_memory_url_uses_an_lru(make_app, db_config):
+    with make_app(**{**db_config, 'ENTITY_CACHE_SHARED_URL': 'memory://'}).app_context():
+        assert isinstance(get_entity_cache('dogs').store, LRUCache)
+
+
+def test_get_entity_cache_disabled(make_app, db_config):
+    with make_app(**{**db_config, 'ENTITY_CACHE': False}).app_context():
+        assert get_entity_cache('dogs') is None
+
+
+def test_dog_writes_invalidate_the_cached_lists(make_app, db_config):
+    with make_app(**db_config).app_context():
+        DogModel.save_dog(Dog('dog-1', 'Rex', 'beagle', 3, 'user-1', 'https://blobs/rex.jpg'))
+        assert [dog.dogname for dog in DogModel.get_dogs_by_user_id('user-1')] == ['Rex']
+        assert DogModel.get_dog_by_id('dog-1').thumbnails is None
+
+        DogModel.save_dog(Dog('dog-2', 'Bella', 'pug', 2, 'user-1', 'https://blobs/bella.jpg'))
+        assert sorted(dog.dogname for dog in DogModel.get_dogs_by_user_id('user-1')) == ['Bella', 'Rex']
+
+        DogModel.update_dog(Dog('dog-1', 'Max', 'beagle', 4, 'user-1', 'https://blobs/rex.jpg'))
+        assert DogModel.get_dog_by_id('dog-1').dogname == 'Max'
+        assert sorted(dog.dogname for dog in DogModel.get_dogs_by_user_id('user-1')) == ['Bella', 'Max']
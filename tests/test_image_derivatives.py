@@ -0,0 +1,66 @@
+import io
+import sqlite3
+
+import pytest
+from PIL import Image
+
+from src.database.schema import migrate
+from src.models.dog_model import DogModel
+from src.models.entities.dogs import Dog
+from src.services.image_derivatives import (
+    derivative_name, derivative_urls, derivatives_record, recorded_derivative_urls, render_derivatives
+)
+
+
+def test_derivative_names_sit_next_to_the_original():
+    assert derivative_name('beagle/1234_photo.png', 256, 'webp') == 'beagle/1234_photo_256.webp'
+    assert derivative_name('https://blobs/dogs/beagle/1234_photo.jpeg', 128, 'jpeg') == \
+        'https://blobs/dogs/beagle/1234_photo_128.jpg'
+
+
+def test_recorded_derivative_urls():
+    url = 'https://blobs/dogs/beagle/1234_photo.png'
+    assert recorded_derivative_urls(url, None) == {}
+    assert recorded_derivative_urls(url, derivatives_record([128], ['webp', 'jpeg'])) == {
+        '128': {'webp': 'https://blobs/dogs/beagle/1234_photo_128.webp',
+                'jpeg': 'https://blobs/dogs/beagle/1234_photo_128.jpg'}
+    }
+    assert derivative_urls('', [128], ['webp']) == {}
+
+
+def test_render_derivatives_bounds_the_longest_side_and_drops_metadata():
+    original = Image.new('RGBA', (800, 400), (200, 100, 50, 255))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees: the upright image is 400 x 800.
+    buffer = io.BytesIO()
+    original.convert('RGB').save(buffer, format='JPEG', exif=exif)
+
+    derivatives = render_derivatives(buffer.getvalue(), [128, 512], ['webp', 'jpeg'])
+    assert [(size, image_format) for size, image_format, _ in derivatives] == \
+        [(512, 'webp'), (512, 'jpeg'), (128, 'webp'), (128, 'jpeg')]
+    for size, image_format, data in derivatives:
+        image = Image.open(io.BytesIO(data))
+        assert image.size == (size // 2, size)
+        assert not image.getexif()
+
+
+@pytest.fixture
+def connection(sqlite_path):
+    connection = sqlite3.connect(sqlite_path)
+    yield connection
+    connection.close()
+
+
+def test_dogs_pick_up_the_thumbnails_column_once_migrated(make_app, db_config, connection):
+    with make_app(**db_config).app_context():
+        DogModel.save_dog(Dog('dog-1', 'Rex', 'beagle', 3, 'user-1', 'https://blobs/rex.jpg'))
+        assert not DogModel.set_thumbnails('dog-1', 'user-1', 'https://blobs/rex.jpg', 'https://blobs/rex_')
+        assert DogModel.get_dog_by_id('dog-1').thumbnails is None
+
+        migrate(connection, 'sqlite', 3)
+        assert DogModel.set_thumbnails('dog-1', 'user-1', 'https://blobs/rex.jpg', 'https://blobs/rex_')
+        assert DogModel.get_dog_by_id('dog-1').thumbnails == 'https://blobs/rex_'
+
+        # A new image clears the thumbnails of the old one.
+        DogModel.update_dog(Dog('dog-1', 'Rex', 'beagle', 3, 'user-1', 'https://blobs/rex2.jpg'))
+        assert DogModel.get_dog_by_id('dog-1').thumbnails is None
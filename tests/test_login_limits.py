@@ -0,0 +1,146 @@
+import sqlite3
+import threading
+
+import pytest
+
+import src.services.password_hasher as password_hasher
+import src.utils.rate_limit as rate_limit
+from src.models.entities.user import User
+from src.models.user_model import UserModel
+from src.routes.auth_routes import auth
+from src.services.password_hasher import HasherBusy, PasswordHasher, get_password_hasher
+from src.utils.rate_limit import RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_rate_limiter_allows_limit_hits_per_window(clock):
+    limiter = RateLimiter(limit=2, window=60)
+    assert limiter.acquire('1.2.3.4') == 0
+    clock[0] += 10
+    assert limiter.acquire('1.2.3.4') == 0
+    assert limiter.acquire('1.2.3.4') == pytest.approx(50)
+    assert limiter.acquire('5.6.7.8') == 0
+    clock[0] += 50
+    assert limiter.acquire('1.2.3.4') == 0
+    assert limiter.stats()['limited'] == 1
+
+
+def test_rate_limiter_retry_after_does_not_record_a_hit(clock):
+    limiter = RateLimiter(limit=1, window=30)
+    assert limiter.retry_after('a@example.com') == 0
+    assert limiter.retry_after('a@example.com') == 0
+    limiter.hit('a@example.com')
+    assert limiter.retry_after('a@example.com') == pytest.approx(30)
+
+
+def test_rate_limiter_is_off_without_a_limit():
+    limiter = RateLimiter(limit=0, window=60)
+    assert all(limiter.acquire('key') == 0 for _ in range(100))
+
+
+def test_rate_limiter_tracks_a_bounded_number_of_keys(clock):
+    limiter = RateLimiter(limit=1, window=60, max_keys=2)
+    for key in ('a', 'b', 'c'):
+        limiter.acquire(key)
+    assert limiter.stats()['keys'] == 2
+    # The oldest key was forgotten, so it may be hit again.
+    assert limiter.acquire('a') == 0
+
+
+def test_password_hasher_verifies_and_flags_outdated_hashes():
+    hasher = PasswordHasher(method='pbkdf2', pbkdf2_iterations=1000)
+    hashed = hasher.hash('secret')
+    assert hasher.verify(hashed, 'secret')
+    assert not hasher.verify(hashed, 'wrong')
+    assert not hasher.verify(None, 'secret')
+    assert not hasher.needs_rehash(hashed)
+    assert PasswordHasher(method='pbkdf2', pbkdf2_iterations=2000).needs_rehash(hashed)
+    with pytest.raises(ValueError):
+        PasswordHasher(method='md5')
+
+
+def test_password_hasher_rejects_hashes_beyond_its_queue(monkeypatch):
+    hasher = PasswordHasher(method='pbkdf2', pbkdf2_iterations=1000, workers=1, queue_size=0)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash(*args):
+        started.set()
+        release.wait(5)
+        return 'hash'
+
+    monkeypatch.setattr('src.services.password_hasher.generate_password_hash', slow_hash)
+    worker = threading.Thread(target=hasher.hash, args=('first',))
+    worker.start()
+    try:
+        assert started.wait(5)
+        with pytest.raises(HasherBusy):
+            hasher.hash('second')
+    finally:
+        release.set()
+        worker.join()
+    assert hasher.stats()['rejected'] == 1
+
+
+@pytest.fixture
+def auth_app(make_app, db_config):
+    app = make_app(auth, LOGIN_RATE_LIMIT_IP=5, LOGIN_RATE_LIMIT_EMAIL=2, LOGIN_RATE_LIMIT_WINDOW=60, **db_config)
+    with app.app_context():
+        UserModel.register(User('user-1', 'a@example.com', 'secret', 'Ann', 'Lee', '2001-02-03', 'NZ'))
+        assert get_password_hasher().method == 'pbkdf2:sha256:1000'
+    return app
+
+
+def _login(client, password, email='a@example.com', ip='10.0.0.1'):
+    return client.post('/login', data={'email': email, 'password': password},
+                       environ_base={'REMOTE_ADDR': ip})
+
+
+def test_login_succeeds_with_the_right_password(auth_app):
+    response = _login(auth_app.test_client(), 'secret')
+    assert response.status_code == 200
+    assert response.get_json()['access_token']
+
+
+def test_login_limits_failures_per_email(auth_app):
+    client = auth_app.test_client()
+    assert _login(client, 'wrong', ip='10.0.0.1').status_code == 401
+    assert _login(client, 'wrong', ip='10.0.0.2').status_code == 401
+    # Further attempts on the email are refused from any address, before the password is checked.
+    response = _login(client, 'secret', ip='10.0.0.3')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert _login(client, 'wrong', email='b@example.com', ip='10.0.0.3').status_code == 401
+
+
+def test_login_limits_attempts_per_address(auth_app):
+    client = auth_app.test_client()
+    for i in range(5):
+        assert _login(client, 'secret', ip='10.0.0.9').status_code == 200
+    assert _login(client, 'secret', ip='10.0.0.9').status_code == 429
+    assert _login(client, 'secret', ip='10.0.0.10').status_code == 200
+
+
+def test_login_reports_a_busy_hasher(auth_app, monkeypatch):
+    def busy(user):
+        raise HasherBusy("Too many password hashes in progress")
+
+    monkeypatch.setattr(UserModel, 'login', busy)
+    response = _login(auth_app.test_client(), 'secret')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_login_rehashes_outdated_passwords(auth_app, sqlite_path, monkeypatch):
+    monkeypatch.setattr(password_hasher, '_password_hasher', PasswordHasher(method='pbkdf2', pbkdf2_iterations=2000))
+    assert _login(auth_app.test_client(), 'secret').status_code == 200
+    connection = sqlite3.connect(sqlite_path)
+    [stored] = connection.execute("SELECT upassword FROM users WHERE userid = 'user-1'").fetchone()
+    connection.close()
+    assert stored.startswith('pbkdf2:sha256:2000$')
+    assert password_hasher._password_hasher.stats()['rehashes'] == 1
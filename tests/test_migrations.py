@@ -0,0 +1,87 @@
+import sqlite3
+
+import pytest
+
+import src.database.schema as schema
+from src.database.schema import MigrationProbe, applied_versions, migrate, migration_applied, rollback
+from src.models.entities.user import User
+from src.models.user_model import UserModel
+
+
+@pytest.fixture
+def connection(sqlite_path):
+    connection = sqlite3.connect(sqlite_path)
+    yield connection
+    connection.close()
+
+
+def _tables(connection):
+    return {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_migration_applied_never_creates_the_version_table(connection):
+    assert not migration_applied(connection, 'sqlite', 1)
+    assert 'schema_migrations' not in _tables(connection)
+
+    migrate(connection, 'sqlite', 1)
+    assert migration_applied(connection, 'sqlite', 1)
+    assert not migration_applied(connection, 'sqlite', 2)
+
+
+def test_migrate_and_rollback_selected_versions(connection):
+    assert [m.version for m in migrate(connection, 'sqlite')] == [1, 2, 3]
+    assert migrate(connection, 'sqlite') == []
+
+    assert [m.version for m in rollback(connection, 'sqlite', versions=(1, 2))] == [2, 1]
+    assert applied_versions(connection, 'sqlite') == [3]
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(dogs)")}
+    assert 'thumbnails' in columns
+
+
+def test_migrate_reports_duplicate_emails(connection):
+    connection.executemany("INSERT INTO users (userid, email, upassword) VALUES (?, ?, 'hash')",
+                           [('user-1', 'a@example.com'), ('user-2', 'a@example.com')])
+    connection.commit()
+    with pytest.raises(ValueError, match="a@example.com"):
+        migrate(connection, 'sqlite', 1)
+    assert applied_versions(connection, 'sqlite') == []
+
+
+def test_migration_probe_rechecks_a_missing_migration(connection, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(schema.time, 'monotonic', lambda: now[0])
+    probe = MigrationProbe(1, recheck_interval=60)
+
+    assert not probe.applied(connection, 'sqlite')
+    migrate(connection, 'sqlite', 1)
+    now[0] += 59
+    assert not probe.applied(connection, 'sqlite')
+    now[0] += 1
+    assert probe.applied(connection, 'sqlite')
+
+    # Once applied the answer is kept, without further queries.
+    rollback(connection, 'sqlite')
+    now[0] += 3600
+    assert probe.applied(connection, 'sqlite')
+
+
+def test_migration_probe_logs_a_missing_migration_once(connection, caplog):
+    probe = MigrationProbe(1, recheck_interval=0)
+    probe.applied(connection, 'sqlite')
+    probe.applied(connection, 'sqlite')
+    messages = [r.getMessage() for r in caplog.records if 'scripts.migrate' in r.getMessage()]
+    assert messages == ["Migration 1 (unique users.email) is not applied; run python -m scripts.migrate."]
+
+
+@pytest.mark.parametrize('migrated', [False, True])
+def test_register_rejects_duplicate_emails(make_app, db_config, connection, migrated):
+    if migrated:
+        migrate(connection, 'sqlite', 1)
+    with make_app(**db_config).app_context():
+        assert UserModel.register(User('user-1', 'a@example.com', 'secret'))
+        with pytest.raises(Exception, match="Email already registered"):
+            UserModel.register(User('user-2', 'a@example.com', 'secret'))
+        assert UserModel._unique_email_index.cached() is (True if migrated else None)
+    assert connection.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 1
+    assert ('schema_migrations' in _tables(connection)) == migrated
+
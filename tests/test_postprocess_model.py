@@ -0,0 +1,77 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.services.postprocess_model import (
+    apply_temperature, fit_temperature, format_predictions, load_temperature, top_k
+)
+from src.services.prediction_cache import PredictionCache
+
+LABELS = ['beagle', 'boxer', 'collie', 'pug']
+
+
+def test_top_k_returns_the_best_classes_of_every_row_in_order():
+    probabilities = np.array([[0.1, 0.5, 0.3, 0.1], [0.6, 0.05, 0.05, 0.3]])
+    classes, scores = top_k(probabilities, 2)
+    assert classes.tolist() == [[1, 2], [0, 3]]
+    assert np.allclose(scores, [[0.5, 0.3], [0.6, 0.3]])
+
+
+def test_top_k_clamps_k_to_the_number_of_classes():
+    probabilities = np.array([[0.1, 0.2, 0.3, 0.4]])
+    assert top_k(probabilities, 10)[0].tolist() == [[3, 2, 1, 0]]
+    assert top_k(probabilities, 0)[0].tolist() == [[3]]
+
+
+def test_apply_temperature_softens_without_changing_the_ranking():
+    probabilities = np.array([[0.9, 0.05, 0.03, 0.02]])
+    assert apply_temperature(probabilities, 1.0) is probabilities
+    softened = apply_temperature(probabilities, 2.0)
+    assert np.allclose(softened.sum(axis=1), 1.0)
+    assert softened[0, 0] < 0.9
+    assert np.argsort(softened[0]).tolist() == np.argsort(probabilities[0]).tolist()
+
+
+def test_fit_temperature_softens_an_overconfident_model():
+    rng = np.random.default_rng(0)
+    targets = rng.integers(0, 4, 400)
+    # The model always puts 97% on its answer but is right only 70% of the time.
+    answers = np.where(rng.random(400) < 0.7, targets, (targets + 1) % 4)
+    probabilities = np.full((400, 4), 0.01)
+    probabilities[np.arange(400), answers] = 0.97
+    assert fit_temperature(probabilities, targets) > 1.5
+
+
+def test_format_predictions_reports_percentages_and_alternatives():
+    predictions = np.array([[0.1, 0.6, 0.2, 0.1]], dtype=np.float32)
+    [result] = format_predictions(predictions, LABELS, 2)
+    assert result['breed'] == 'boxer'
+    assert result['confidence'] == 60.0
+    assert result['top_k'] == [{'breed': 'boxer', 'confidence': 60.0}, {'breed': 'collie', 'confidence': 20.0}]
+    # float64 rounding keeps the JSON free of float32 artifacts like 60.000003814697266.
+    assert json.dumps(result['confidence']) == '60.0'
+
+
+def test_format_predictions_applies_the_temperature():
+    predictions = np.array([[0.01, 0.97, 0.01, 0.01]])
+    assert format_predictions(predictions, LABELS, 1, 3.0)[0]['confidence'] < 97.0
+
+
+def test_load_temperature(tmp_path):
+    assert load_temperature(None) == 1.0
+    path = tmp_path / 'calibration.json'
+    path.write_text(json.dumps({'temperature': 1.7}))
+    assert load_temperature(str(path)) == pytest.approx(1.7)
+
+
+def test_cache_keys_change_with_calibration_and_top_k():
+    key = PredictionCache.make_key(b'image', 'v1', 3, 1.0)
+    assert key == PredictionCache.make_key(b'image', 'v1', 3, 1.0)
+    assert len({
+        key,
+        PredictionCache.make_key(b'other image', 'v1', 3, 1.0),
+        PredictionCache.make_key(b'image', 'v2', 3, 1.0),
+        PredictionCache.make_key(b'image', 'v1', 5, 1.0),
+        PredictionCache.make_key(b'image', 'v1', 3, 1.5),
+    }) == 5
@@ -0,0 +1,149 @@
+import io
+
+import pytest
+
+import src.routes.predict_routes as predict_routes
+import src.services.prediction_cache as prediction_cache
+from src.services.prediction_cache import LRUCache, PredictionCache, SQLiteCache, create_shared_cache
+
+
+def test_lru_cache_evicts_the_least_recently_used_entry():
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+
+def test_lru_cache_expires_entries_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache.time, 'monotonic', lambda: now[0])
+    cache = LRUCache(ttl=10)
+    cache.set('a', 1)
+    now[0] += 9
+    assert cache.get('a') == 1
+    now[0] += 1
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    first = SQLiteCache(path, ttl=60)
+    second = SQLiteCache(path, ttl=60)
+    first.set('key', {'breed': 'beagle'})
+    assert second.get('key') == {'breed': 'beagle'}
+    second.delete('key')
+    assert first.get('key') is None
+
+
+def test_create_shared_cache_keeps_namespaces_apart(tmp_path):
+    url = f"sqlite:///{tmp_path / 'cache.db'}"
+    predictions = create_shared_cache(url, 60)
+    users = create_shared_cache(url, 60, 'user')
+    predictions.set('key', 1)
+    assert users.get('key') is None
+    with pytest.raises(ValueError):
+        create_shared_cache('memcached://localhost', 60)
+
+
+def test_prediction_cache_fills_memory_from_the_shared_tier(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    worker_a = PredictionCache(shared=SQLiteCache(path))
+    worker_b = PredictionCache(shared=SQLiteCache(path))
+
+    assert worker_b.get('key') == (None, 'miss')
+    worker_a.set('key', {'breed': 'pug'})
+    assert worker_b.get('key') == ({'breed': 'pug'}, 'shared')
+    assert worker_b.get('key') == ({'breed': 'pug'}, 'memory')
+    stats = worker_b.stats()
+    assert (stats['misses'], stats['shared_hits'], stats['memory_hits']) == (1, 1, 1)
+
+
+def test_prediction_cache_survives_shared_tier_errors():
+    class Broken:
+        def get(self, key):
+            raise ConnectionError
+
+        def set(self, key, value):
+            raise ConnectionError
+
+    cache = PredictionCache(shared=Broken())
+    cache.set('key', {'breed': 'pug'})
+    assert cache.get('key') == ({'breed': 'pug'}, 'memory')
+    assert cache.get('other') == (None, 'miss')
+    assert cache.stats()['shared_errors'] == 2
+
+
+class _Uploader:
+    def __init__(self, accept):
+        self.accept = accept
+        self.uploads = []
+
+    def enqueue(self, data, folder_name, blob_name, content_type):
+        self.uploads.append(bytes(data))
+        return self.accept
+
+
+@pytest.fixture
+def predict_app(make_app, monkeypatch):
+    monkeypatch.setattr(prediction_cache, '_prediction_cache', None)
+    calls = []
+
+    def predict_azure(upload, config):
+        calls.append(upload.tobytes())
+        return predict_routes.azure_prediction('beagle', 99.0)
+
+    monkeypatch.setattr(predict_routes, 'predict_azure', predict_azure)
+    app = make_app(
+        predict_routes.predict_bp,
+        AZURE_ML_URL='https://scoring.example/score',
+        PREDICTION_CACHE=True,
+    )
+    app.azure_calls = calls
+    return app
+
+
+def _post(client, headers, data=b'image bytes'):
+    return client.post(
+        '/predict', headers=headers, content_type='multipart/form-data',
+        data={'file': (io.BytesIO(data), 'dog.jpg', 'image/jpeg')}
+    )
+
+
+def test_predict_serves_repeated_images_from_the_cache(predict_app, auth_header, monkeypatch):
+    uploader = _Uploader(accept=True)
+    monkeypatch.setattr(predict_routes, 'get_uploader', lambda: uploader)
+    client = predict_app.test_client()
+    headers = auth_header(predict_app)
+
+    first = _post(client, headers)
+    second = _post(client, headers)
+    assert first.status_code == second.status_code == 200
+    assert first.headers['X-Prediction-Cache'] == 'miss'
+    assert second.headers['X-Prediction-Cache'] == 'memory'
+    assert second.get_json() == first.get_json()
+    assert len(predict_app.azure_calls) == 1
+    assert uploader.uploads == [b'image bytes']
+
+
+def test_predict_does_not_cache_a_prediction_whose_upload_was_rejected(predict_app, auth_header, monkeypatch):
+    uploader = _Uploader(accept=False)
+    monkeypatch.setattr(predict_routes, 'get_uploader', lambda: uploader)
+    client = predict_app.test_client()
+    headers = auth_header(predict_app)
+
+    first = _post(client, headers)
+    assert first.status_code == 500
+    assert 'upload queue is full' in first.get_json()['message']
+
+    uploader.accept = True
+    second = _post(client, headers)
+    assert second.status_code == 200
+    assert second.headers['X-Prediction-Cache'] == 'miss'
+    assert len(predict_app.azure_calls) == 2
+    assert len(uploader.uploads) == 2
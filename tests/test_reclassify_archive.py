@@ -0,0 +1,52 @@
+import csv
+
+import pytest
+
+from scripts.reclassify_archive import REPORT_COLUMNS, is_archived_prediction, load_checkpoint, relabeled_name
+
+UUID = '0f8c2b7e-3d4a-4b5c-9e6f-7a8b9c0d1e2f'
+
+
+@pytest.mark.parametrize('blob_name, archived', [
+    (f'beagle/{UUID}_beagle.jpg', True),
+    (f'Old_English_Sheepdog/{UUID}_Old_English_Sheepdog.png', True),
+    (f'2024/beagle/{UUID}_beagle.jpeg', True),
+    # Dog images keep the uploaded file name, and thumbnails add a size suffix.
+    (f'beagle/{UUID}_rex.jpg', False),
+    (f'beagle/{UUID}_beagle_256.webp', False),
+    (f'beagle/{UUID}_beagle_256.jpg', False),
+    (f'pug/{UUID}_beagle.jpg', False),
+    ('beagle/not-a-uuid_beagle.jpg', False),
+])
+def test_is_archived_prediction(blob_name, archived):
+    assert is_archived_prediction(blob_name) is archived
+
+
+@pytest.mark.parametrize('blob_name, breed, moved_to', [
+    (f'beagle/{UUID}_beagle.jpg', 'basset', f'basset/{UUID}_basset.jpg'),
+    (f'2024/beagle/{UUID}_beagle.png', 'basset', f'2024/basset/{UUID}_basset.png'),
+    (f'beagle/{UUID}_photo.jpg', 'basset', f'basset/{UUID}_photo.jpg'),
+])
+def test_relabeled_name(blob_name, breed, moved_to):
+    assert relabeled_name(blob_name, breed) == moved_to
+
+
+def test_load_checkpoint_retries_failed_downloads_and_moves(tmp_path):
+    path = tmp_path / 'report.csv'
+    assert load_checkpoint(str(path)) == set()
+
+    rows = [
+        {'blob': 'a', 'error': ''},
+        {'blob': 'b', 'error': 'download failed: timeout'},
+        {'blob': 'c', 'relabeled': 'True', 'moved_to': 'x/c', 'error': ''},
+        {'blob': 'd', 'relabeled': 'True', 'error': 'move failed: 403'},
+        {'blob': 'e', 'relabeled': 'True', 'moved_to': 'x/e', 'error': 'move failed: delete denied'},
+        {'blob': 'f', 'error': 'cannot identify image file'},
+    ]
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, REPORT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    # A copy that was stored before its delete failed is not scored again under its new name.
+    assert load_checkpoint(str(path)) == {'a', 'c', 'x/c', 'x/e', 'f'}
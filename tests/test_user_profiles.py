@@ -0,0 +1,38 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from src.models.user_model import UserModel
+from src.services.prediction_cache import SQLiteCache
+
+
+@pytest.mark.parametrize('birthdate', [date(2001, 2, 3), '2001-02-03', None])
+def test_cached_profiles_round_trip_through_json(tmp_path, birthdate):
+    store = SQLiteCache(str(tmp_path / 'profiles.db'))
+    entry = UserModel._profile_entry(('user-1', 'a@example.com', 'Ann', 'Lee', birthdate, 'NZ'), 123.0)
+    store.set('user:1', entry)
+    user = UserModel._profile_user(store.get('user:1'))
+    assert user.birthdate == birthdate
+    assert type(user.birthdate) is type(birthdate)
+    assert (user.userid, user.email, user.upassword, user.country) == ('user-1', 'a@example.com', None, 'NZ')
+
+
+def test_profile_updates_replace_the_cached_profile(make_app, db_config, sqlite_path):
+    connection = sqlite3.connect(sqlite_path)
+    connection.execute(
+        "INSERT INTO users (userid, email, upassword, firstname, lastname, birthdate, country) "
+        "VALUES ('user-1', 'a@example.com', 'hash', 'Ann', 'Lee', '2001-02-03', 'NZ')"
+    )
+    connection.commit()
+    connection.close()
+
+    with make_app(**db_config).app_context():
+        user, modified_at = UserModel.get_profile('user-1')
+        assert user.firstname == 'Ann'
+        updated = UserModel.update_profile('user-1', firstname='Anna')
+        assert updated.firstname == 'Anna'
+        user, updated_at = UserModel.get_profile('user-1')
+        assert (user.firstname, user.lastname) == ('Anna', 'Lee')
+        assert updated_at >= modified_at
+        assert UserModel.update_profile('missing', firstname='Bob') is None